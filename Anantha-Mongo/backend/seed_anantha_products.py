@@ -7,6 +7,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from utils.seeding import seed_mongodb
 
 load_dotenv()
 
@@ -1056,18 +1057,23 @@ PRODUCTS = [
     }
 ]
 
+# Live stock fields - set when a product is first created, never reset by a re-seed
+PRODUCT_INSERT_ONLY_FIELDS = ("inventory_count", "out_of_stock", "discount_active")
+
 async def seed_products():
-    """Seed all Anantha Lakshmi traditional products"""
+    """Seed all Anantha Lakshmi traditional products (idempotent, keeps live inventory)"""
     try:
-        # Clear existing products
-        print("🗑️  Clearing existing products...")
-        delete_result = await db.products.delete_many({})
-        print(f"   Deleted {delete_result.deleted_count} existing products")
-        
-        # Insert new products
-        print(f"\n📦 Inserting {len(PRODUCTS)} new products...")
-        result = await db.products.insert_many(PRODUCTS)
-        print(f"   Successfully inserted {len(result.inserted_ids)} products")
+        # Diff against existing catalog and upsert only what changed
+        print(f"📦 Syncing {len(PRODUCTS)} products...")
+        summary = await seed_mongodb(
+            db.products,
+            PRODUCTS,
+            key_fields=("id",),
+            insert_only_fields=PRODUCT_INSERT_ONLY_FIELDS
+        )
+        print(f"   Inserted {summary['inserted']} new products")
+        print(f"   Updated {summary['updated']} changed products")
+        print(f"   {summary['unchanged']} products already up to date")
         
         # Print summary by category
         print("\n📊 Products by Category:")
@@ -0,0 +1,172 @@
+"""Admission control - per-route concurrency limits with bounded wait queues and load shedding
+
+Requests are sorted into classes (catalog reads, checkout, admin, analytics...). Each class
+has its own concurrency limit and bounded queue; when both are full, or the request waits
+too long, it gets 503 with Retry-After instead of piling onto the database pool.
+Lower-priority classes are also shed early once the server as a whole gets busy, so
+cheap catalog reads keep flowing while analytics and exports back off first.
+"""
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AdmissionClass:
+    name: str
+    limit: int  # concurrent requests
+    max_queue: int  # requests allowed to wait for a slot
+    queue_timeout: float  # seconds a request may wait before being shed
+    shed_at: float = 1.0  # shed once total in-flight reaches this fraction of the global limit
+    retry_after: int = 2
+    in_flight: int = 0
+    queued: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    shed: int = 0
+    peak_queue: int = 0
+    _semaphore: Optional[asyncio.Semaphore] = field(default=None, repr=False)
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "peak_queue": self.peak_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected,
+            "rejected_timeout": self.timed_out,
+            "shed_overload": self.shed,
+        }
+
+
+def default_classes() -> List[AdmissionClass]:
+    return [
+        AdmissionClass("catalog", limit=128, max_queue=256, queue_timeout=2.0, shed_at=1.0, retry_after=1),
+        AdmissionClass("checkout", limit=32, max_queue=64, queue_timeout=5.0, shed_at=0.95, retry_after=3),
+        AdmissionClass("default", limit=64, max_queue=128, queue_timeout=3.0, shed_at=0.9),
+        AdmissionClass("admin", limit=16, max_queue=32, queue_timeout=5.0, shed_at=0.8, retry_after=5),
+        AdmissionClass("analytics", limit=4, max_queue=8, queue_timeout=10.0, shed_at=0.5, retry_after=15),
+    ]
+
+
+# (method or None for any, path prefix, class) - first match wins
+DEFAULT_ROUTE_RULES: List[Tuple[Optional[str], str, str]] = [
+    ("GET", "/api/orders/analytics", "analytics"),
+    (None, "/api/admin/orders/export", "analytics"),
+    (None, "/api/admin/products/export", "analytics"),
+    (None, "/api/admin/products/import", "analytics"),
+    (None, "/api/admin/newsletter/send", "analytics"),
+    (None, "/api/admin", "admin"),
+    ("POST", "/api/orders", "checkout"),
+    # Priced from the in-memory catalog, as cheap as a catalog read
+    ("POST", "/api/cart/quote", "catalog"),
+    (None, "/api/payment", "checkout"),
+    ("GET", "/api/products", "catalog"),
+    ("GET", "/api/locations", "catalog"),
+    ("GET", "/api/states", "catalog"),
+    ("GET", "/api/settings", "catalog"),
+    ("GET", "/api/payment-settings", "catalog"),
+    ("GET", "/api/whatsapp-numbers", "catalog"),
+]
+
+
+class AdmissionController:
+    """Tracks per-class and global concurrency; acquire()/release() around each request"""
+
+    def __init__(self, classes: Optional[List[AdmissionClass]] = None,
+                 rules: Optional[List[Tuple[Optional[str], str, str]]] = None,
+                 global_limit: int = 256):
+        self.classes = {admission_class.name: admission_class for admission_class in (classes or default_classes())}
+        self.rules = rules if rules is not None else DEFAULT_ROUTE_RULES
+        self.global_limit = global_limit
+        self.total_in_flight = 0
+
+    def classify(self, method: str, path: str) -> AdmissionClass:
+        for rule_method, prefix, name in self.rules:
+            if (rule_method is None or rule_method == method) and path.startswith(prefix):
+                return self.classes[name]
+        return self.classes["default"]
+
+    async def acquire(self, admission_class: AdmissionClass) -> bool:
+        """Wait for a slot; False means the request must be rejected"""
+        if admission_class._semaphore is None:
+            admission_class._semaphore = asyncio.Semaphore(admission_class.limit)
+
+        if self.total_in_flight >= admission_class.shed_at * self.global_limit:
+            admission_class.shed += 1
+            return False
+
+        semaphore = admission_class._semaphore
+        if semaphore.locked():
+            if admission_class.queued >= admission_class.max_queue:
+                admission_class.rejected += 1
+                return False
+            admission_class.queued += 1
+            admission_class.peak_queue = max(admission_class.peak_queue, admission_class.queued)
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=admission_class.queue_timeout)
+            except asyncio.TimeoutError:
+                admission_class.timed_out += 1
+                return False
+            finally:
+                admission_class.queued -= 1
+        else:
+            await semaphore.acquire()
+
+        admission_class.in_flight += 1
+        admission_class.admitted += 1
+        self.total_in_flight += 1
+        return True
+
+    def release(self, admission_class: AdmissionClass):
+        admission_class.in_flight -= 1
+        self.total_in_flight -= 1
+        admission_class._semaphore.release()
+
+    def metrics(self) -> dict:
+        return {
+            "global_limit": self.global_limit,
+            "total_in_flight": self.total_in_flight,
+            "classes": {name: admission_class.snapshot() for name, admission_class in self.classes.items()},
+        }
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware - holds a slot for the whole request, including streamed response bodies"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        admission_class = self.controller.classify(scope["method"], scope["path"])
+        if not await self.controller.acquire(admission_class):
+            logger.warning(f"Shedding {scope['method']} {scope['path']} ({admission_class.name} saturated)")
+            body = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(admission_class.retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(admission_class)
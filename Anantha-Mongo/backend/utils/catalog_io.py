@@ -0,0 +1,152 @@
+"""Catalog import/export helpers - streaming CSV/JSONL (de)serialization for products"""
+import csv
+import io
+import json
+from typing import Iterable, Iterator, Optional, Tuple
+
+CATALOG_FORMATS = ("csv", "jsonl")
+
+# Column order for CSV exports (matches the Product model)
+CATALOG_CSV_COLUMNS = [
+    "id",
+    "name",
+    "name_telugu",
+    "category",
+    "description",
+    "description_telugu",
+    "image",
+    "prices",
+    "isBestSeller",
+    "isNew",
+    "tag",
+    "discount_percentage",
+    "discount_expiry_date",
+    "inventory_count",
+    "out_of_stock",
+    "available_cities",
+]
+
+# Columns holding lists - JSON in exports, JSON or compact text in imports
+_LIST_COLUMNS = ("prices", "available_cities")
+
+
+def detect_catalog_format(filename: Optional[str], explicit: Optional[str] = None) -> str:
+    """Work out whether an upload is CSV or JSONL from an explicit format or the file name"""
+    fmt = (explicit or "").lower()
+    if not fmt and filename:
+        extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        fmt = {"ndjson": "jsonl", "json": "jsonl"}.get(extension, extension)
+
+    if fmt not in CATALOG_FORMATS:
+        raise ValueError(f"Unsupported catalog format '{fmt or filename}'. Use one of: {', '.join(CATALOG_FORMATS)}")
+    return fmt
+
+
+def parse_prices(value: str) -> list:
+    """
+    Parse a prices cell.
+    Accepts JSON ('[{"weight": "250g", "price": 250}]') or the compact form '250g:250;500g:500'.
+    """
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value)
+
+    prices = []
+    for tier in value.split(";"):
+        if not tier.strip():
+            continue
+        weight, _, price = tier.partition(":")
+        if not price:
+            raise ValueError(f"Invalid price tier '{tier}' (expected weight:price)")
+        amount = float(price)
+        prices.append({"weight": weight.strip(), "price": int(amount) if amount.is_integer() else amount})
+    return prices
+
+
+def parse_city_list(value: str) -> Optional[list]:
+    """Parse an available_cities cell - JSON list or 'City A|City B'"""
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value) or None
+    cities = [city.strip() for city in value.split("|") if city.strip()]
+    return cities or None
+
+
+def csv_row_to_product(row: dict) -> dict:
+    """
+    Convert a CSV row into a product dict.
+    Empty cells are left out so that a partial row only touches the columns it fills in.
+    Scalar type coercion (bools, numbers) is left to the Product model.
+    """
+    product = {}
+    for column, value in row.items():
+        if column is None or value is None:
+            continue
+        column = column.strip()
+        if value.strip() == "":
+            continue
+        if column == "prices":
+            product[column] = parse_prices(value)
+        elif column == "available_cities":
+            product[column] = parse_city_list(value)
+        else:
+            product[column] = value.strip()
+    return product
+
+
+def iter_catalog_records(stream: Iterable[str], fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Lazily parse catalog records from a text stream.
+    Yields (row_number, record, error) - exactly one of record/error is set.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # line_num is the physical line the row ended on (header is line 1)
+            row_number = reader.line_num
+            try:
+                yield row_number, csv_row_to_product(row), None
+            except (ValueError, json.JSONDecodeError) as e:
+                yield row_number, None, str(e)
+        return
+
+    for row_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, record, None
+
+
+def product_to_csv_row(product: dict) -> dict:
+    """Flatten a product document for CSV export (list columns become JSON)"""
+    row = {}
+    for column in CATALOG_CSV_COLUMNS:
+        value = product.get(column)
+        if column in _LIST_COLUMNS and value is not None:
+            value = json.dumps(value, ensure_ascii=False)
+        row[column] = "" if value is None else value
+    return row
+
+
+def encode_csv_rows(rows: Iterable[dict], include_header: bool = False) -> str:
+    """Render product rows as CSV text"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CATALOG_CSV_COLUMNS, extrasaction="ignore")
+    if include_header:
+        writer.writeheader()
+    for row in rows:
+        writer.writerow(product_to_csv_row(row))
+    return buffer.getvalue()
+
+
+def encode_jsonl_rows(rows: Iterable[dict]) -> str:
+    """Render product documents as JSON Lines text"""
+    return "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
@@ -0,0 +1,227 @@
+"""City typeahead - prefix trie with edit-distance fuzzy matching over delivery locations
+
+Each location is reachable through its name as typed and through its phonetic key (see
+utils/product_search.phonetic_key). So spelling variants such as "Sadashivpet"/"Sadasivpet"
+or "Zahirabad"/"Zaheerabad" land on the same trie path and behave as aliases. Every trie node
+keeps the few best locations below it, so a prefix lookup costs O(len(query)).
+Typos fall back to a bounded Levenshtein walk over the trie.
+
+resolve() is the strict variant used when a customer submits a city: it only accepts a single
+whole-name match that is the same spelling, the same phonetic key or one typo away.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .product_search import phonetic_key
+
+# Locations kept per trie node - enough for one page of suggestions
+NODE_BEST_SIZE = 10
+# resolve() accepts one typo only in names at least this long
+RESOLVE_MIN_TYPO_LENGTH = 6
+
+NON_LETTERS_RE = re.compile(r"[^a-z ]+")
+SPACES_RE = re.compile(r"\s+")
+
+MATCH_EXACT = "exact"
+MATCH_PREFIX = "prefix"
+MATCH_FUZZY = "fuzzy"
+MATCH_RANK = {MATCH_EXACT: 0, MATCH_PREFIX: 1, MATCH_FUZZY: 2}
+
+
+def normalize_city(name: Optional[str]) -> str:
+    """Lowercase letters and single spaces only"""
+    text = NON_LETTERS_RE.sub(" ", (name or "").lower())
+    return SPACES_RE.sub(" ", text).strip()
+
+
+def city_keys(name: Optional[str]) -> List[str]:
+    """Trie keys for a name: as written and its phonetic key (which ignores spaces)"""
+    normalized = normalize_city(name)
+    if not normalized:
+        return []
+    phonetic = phonetic_key(normalized.replace(" ", ""))
+    return [normalized] if phonetic == normalized else [normalized, phonetic]
+
+
+def city_match_key(name: Optional[str], state: Optional[str]) -> str:
+    """Names that sound the same in the same state share this key"""
+    keys = city_keys(name)
+    return f"{(state or '').strip().lower()}|{keys[-1] if keys else ''}"
+
+
+def max_typos(length: int) -> int:
+    """Edits tolerated for a query of this length"""
+    if length < 4:
+        return 0
+    return 1 if length < 8 else 2
+
+
+@dataclass
+class _Node:
+    children: Dict[str, "_Node"] = field(default_factory=dict)
+    terminal: List[int] = field(default_factory=list)  # entries whose key ends here
+    best: List[int] = field(default_factory=list)  # best entries anywhere below
+
+
+class CityIndex:
+    """Trie over location names and their phonetic keys; search() returns ranked locations"""
+
+    def __init__(self):
+        self._root = _Node()
+        self._entries: List[dict] = []
+        self._aliases: List[List[str]] = []
+        self._source = None
+
+    def build(self, locations: Iterable[dict], alias_names: Iterable[str] = ()):
+        """
+        Index locations (dicts with at least name/state). alias_names are other known spellings
+        (e.g. cities_data) - each is attached to the location sharing its phonetic key.
+        """
+        root = _Node()
+        entries, seen = [], set()
+        for location in locations:
+            key = (normalize_city(location.get("name")), (location.get("state") or "").lower())
+            if key[0] and key not in seen:
+                seen.add(key)
+                entries.append(location)
+        entries.sort(key=lambda location: (len(location["name"]), location["name"]))
+        by_phonetic: Dict[str, List[int]] = {}
+        for entry_id, location in enumerate(entries):
+            for key in city_keys(location["name"]):
+                node = root
+                for char in key:
+                    node = node.children.setdefault(char, _Node())
+                    if len(node.best) < NODE_BEST_SIZE and entry_id not in node.best:
+                        node.best.append(entry_id)  # entries arrive best first
+                if entry_id not in node.terminal:
+                    node.terminal.append(entry_id)
+            by_phonetic.setdefault(city_keys(location["name"])[-1], []).append(entry_id)
+
+        aliases: List[List[str]] = [[] for _ in entries]
+        for alias in set(alias_names):
+            keys = city_keys(alias)
+            for entry_id in by_phonetic.get(keys[-1], []) if keys else []:
+                if alias != entries[entry_id]["name"] and alias not in aliases[entry_id]:
+                    aliases[entry_id].append(alias)
+
+        self._root, self._entries, self._aliases = root, entries, aliases
+
+    def sync(self, source, locations_factory, alias_names: Iterable[str] = ()):
+        """Rebuild when the source object (e.g. a catalog snapshot's location map) changes"""
+        if source is not self._source:
+            self.build(locations_factory(), alias_names)
+            self._source = source
+
+    def _walk(self, key: str) -> Optional[_Node]:
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _fuzzy(self, key: str, max_distance: int, whole: bool = False) -> Dict[int, int]:
+        """entry -> edit distance for names whose prefix (or whole key, if whole) is within max_distance of key"""
+        found: Dict[int, int] = {}
+        first_row = list(range(len(key) + 1))
+
+        def visit(node: _Node, char: str, previous_row: List[int]):
+            row = [previous_row[0] + 1]
+            for column in range(1, len(key) + 1):
+                row.append(min(
+                    row[column - 1] + 1,
+                    previous_row[column] + 1,
+                    previous_row[column - 1] + (key[column - 1] != char)
+                ))
+            if row[-1] <= max_distance:
+                # The whole query is (approximately) a prefix of everything below
+                for entry_id in node.terminal if whole else node.best:
+                    if row[-1] < found.get(entry_id, max_distance + 1):
+                        found[entry_id] = row[-1]
+            if min(row) <= max_distance:
+                for next_char, child in node.children.items():
+                    visit(child, next_char, row)
+
+        for char, child in self._root.children.items():
+            visit(child, char, first_row)
+        return found
+
+    def search(self, query: str, limit: int = 8, state: Optional[str] = None) -> List[dict]:
+        """Top locations for a partly typed city name: exact, then prefix, then fuzzy matches"""
+        keys = city_keys(query)
+        if not keys:
+            return []
+
+        matches: Dict[int, Tuple[int, int]] = {}  # entry -> (match rank, distance)
+
+        def offer(entry_id: int, match: str, distance: int = 0):
+            candidate = (MATCH_RANK[match], distance)
+            if entry_id not in matches or candidate < matches[entry_id]:
+                matches[entry_id] = candidate
+
+        for key in keys:
+            node = self._walk(key)
+            if node is not None:
+                for entry_id in node.terminal:
+                    offer(entry_id, MATCH_EXACT)
+                for entry_id in node.best:
+                    offer(entry_id, MATCH_PREFIX)
+        if len(matches) < limit:
+            for key in keys:
+                for entry_id, distance in self._fuzzy(key, max_typos(len(key))).items():
+                    offer(entry_id, MATCH_FUZZY, distance)
+
+        wanted_state = (state or "").lower()
+        ranked = sorted(matches.items(), key=lambda item: (item[1], item[0]))
+        results = []
+        shown = set()
+        for entry_id, (rank, distance) in ranked:
+            location = self._entries[entry_id]
+            location_state = (location.get("state") or "").lower()
+            if wanted_state and location_state != wanted_state:
+                continue
+            # Two spellings of one town are listed once, the other spelling as an alias
+            town = (location_state, city_keys(location["name"])[-1])
+            if town in shown:
+                continue
+            shown.add(town)
+            match = next(name for name, value in MATCH_RANK.items() if value == rank)
+            results.append({**location, "match": match, "distance": distance, "aliases": self._aliases[entry_id]})
+            if len(results) >= limit:
+                break
+        return results
+
+    def resolve(self, name: str, state: Optional[str] = None) -> Optional[dict]:
+        """
+        The location a submitted city name almost certainly means, or None.
+        Same spelling or sound wins; otherwise exactly one town in the state may be one typo away.
+        """
+        keys = city_keys(name)
+        if not keys:
+            return None
+        wanted_state = (state or "").lower()
+
+        def in_state(entry_ids) -> List[int]:
+            return [
+                entry_id for entry_id in entry_ids
+                if not wanted_state or (self._entries[entry_id].get("state") or "").lower() == wanted_state
+            ]
+
+        for key in keys:
+            node = self._walk(key)
+            exact = in_state(node.terminal) if node is not None else []
+            if exact:
+                return self._entries[exact[0]]
+        if len(keys[0]) < RESOLVE_MIN_TYPO_LENGTH:
+            return None
+        # Distinct towns in one state (by sound) within a typo - too close to pick one
+        close = {
+            city_keys(self._entries[entry_id]["name"])[-1]: entry_id
+            for key in keys
+            for entry_id in in_state(self._fuzzy(key, 1, whole=True))
+        }
+        return self._entries[next(iter(close.values()))] if len(close) == 1 else None
+
+    def status(self) -> dict:
+        return {"locations": len(self._entries)}
@@ -0,0 +1,219 @@
+"""Response compression - gzip/brotli negotiated from Accept-Encoding
+
+CompressionMiddleware compresses text-like responses of at least minimum_size bytes on the fly
+(streamed responses chunk by chunk). Brotli is used when the brotli package is installed and the
+client accepts it, gzip otherwise.
+
+Responses built from cached data use ResponseBodyCache instead: the body is rendered once per
+data version and each encoding is compressed once, at a higher level than on-the-fly compression
+can afford, then served as is. The middleware leaves responses that already carry a
+Content-Encoding alone.
+"""
+import gzip
+import time
+import zlib
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Preference order when the client accepts several encodings equally
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "application/xml")
+# On the fly: fast levels; cached variants are compressed once, so take the best ratio
+DYNAMIC_LEVELS = {"br": 4, "gzip": 6}
+CACHED_LEVELS = {"br": 11, "gzip": 9}
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported encoding the client accepts (q > 0), or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    candidates = [
+        (accepted.get(encoding, accepted.get("*", 0.0)), -rank, encoding)
+        for rank, encoding in enumerate(SUPPORTED_ENCODINGS)
+    ]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    level = DYNAMIC_LEVELS[encoding] if level is None else level
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class _StreamCompressor:
+    """Incremental compressor that flushes every chunk, so streamed responses keep streaming"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=DYNAMIC_LEVELS["br"])
+        else:
+            self._compressor = zlib.compressobj(DYNAMIC_LEVELS["gzip"], zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish() if self.encoding == "br" else self._compressor.flush()
+
+
+def _is_compressible(content_type: str) -> bool:
+    return any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+def _add_vary(headers: list) -> list:
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[index] = (name, value + b", Accept-Encoding")
+            return headers
+    return headers + [(b"vary", b"Accept-Encoding")]
+
+
+class CompressionMiddleware:
+    """ASGI middleware - compress responses of at least minimum_size bytes for clients that accept it"""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"accept-encoding"), None)
+        encoding = negotiate_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = {name.lower(): value for name, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (b"content-encoding" in headers or message["status"] in (204, 304)
+                        or not _is_compressible(content_type)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message  # held until the first body chunk shows the size
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = list(start_message.get("headers", []))
+                if not more_body and len(body) < self.minimum_size:
+                    # Small single-chunk body: not worth the bytes of a compression header
+                    passthrough = True
+                    await send({**start_message, "headers": _add_vary(headers)})
+                    await send(message)
+                    return
+                headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    # Whole body at once: compress it in one go and keep the Content-Length
+                    data = compress(body, encoding)
+                    headers.append((b"content-length", str(len(data)).encode()))
+                    passthrough = True
+                    await send({**start_message, "headers": _add_vary(headers)})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                compressor = _StreamCompressor(encoding)
+                await send({**start_message, "headers": _add_vary(headers)})
+
+            data = compressor.chunk(body) if body else b""
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class CachedBody:
+    """A rendered response body and its compressed variants, each computed once (off the event loop)"""
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self._variants: Dict[str, bytes] = {}
+
+    async def variant(self, encoding: str) -> bytes:
+        if encoding not in self._variants:
+            # Brotli 11 on a catalog takes long enough to stall every other request if run inline
+            self._variants[encoding] = await run_in_threadpool(compress, self.body, encoding, CACHED_LEVELS[encoding])
+        return self._variants[encoding]
+
+
+class ResponseBodyCache:
+    """
+    Rendered response bodies keyed by request parameters, valid for one data version and at most
+    max_age seconds; responses are served in the best encoding the client accepts.
+    """
+
+    def __init__(self, max_age: float = 30.0, max_entries: int = 256, minimum_size: int = 1024):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.minimum_size = minimum_size
+        self._entries: Dict[Hashable, Tuple[Hashable, float, CachedBody]] = {}
+        self.stats = {"hits": 0, "renders": 0}
+
+    def invalidate(self):
+        self._entries.clear()
+
+    async def respond(self, request: Request, key: Hashable, version: Hashable,
+                      render: Callable, media_type: str = "application/json") -> Response:
+        """Serve the cached body for key/version, calling render() (async, returns bytes) on a miss"""
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry and entry[0] == version and now - entry[1] < self.max_age:
+            cached = entry[2]
+            self.stats["hits"] += 1
+        else:
+            cached = CachedBody(await render(), media_type)
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (version, now, cached)
+            self.stats["renders"] += 1
+
+        headers = {"Vary": "Accept-Encoding"}
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding and len(cached.body) >= self.minimum_size:
+            headers["Content-Encoding"] = encoding
+            return Response(await cached.variant(encoding), media_type=cached.media_type, headers=headers)
+        return Response(cached.body, media_type=cached.media_type, headers=headers)
+
+    def status(self) -> dict:
+        return {"entries": len(self._entries), **self.stats}
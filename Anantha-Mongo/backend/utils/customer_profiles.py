@@ -0,0 +1,195 @@
+"""Customer profiles - one document per customer, keyed by normalized phone (falls back to email)
+
+Checkout autofill used to read from saved_user_details (two copies per order, by phone and
+by email), customer_data and the orders collection. Everything now reads the single
+customer_profiles collection, and writes are batched off the request path by ProfileWriteBehind.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from .helpers import normalize_phone, normalize_identifier
+
+logger = logging.getLogger(__name__)
+
+# Address/contact fields stored on a profile (display values, as the customer typed them)
+PROFILE_FIELDS = (
+    "customer_name",
+    "email",
+    "phone",
+    "whatsapp_number",
+    "doorNo",
+    "building",
+    "street",
+    "city",
+    "state",
+    "pincode",
+    "location",
+)
+
+
+def build_profile(**fields) -> Optional[dict]:
+    """
+    Build a profile document from contact/address fields.
+    Empty values are dropped so a partial update never blanks out what is already stored.
+    Returns None when there is neither a usable phone nor an email to key it by.
+    """
+    profile = {field: fields[field] for field in PROFILE_FIELDS if fields.get(field) not in (None, "")}
+    phone_e164 = normalize_phone(profile["phone"]) if profile.get("phone") else None
+    email_lower = normalize_identifier(profile["email"]) if profile.get("email") else None
+
+    if not phone_e164 and not email_lower:
+        return None
+    if phone_e164:
+        profile["phone_e164"] = phone_e164
+    if email_lower:
+        profile["email_lower"] = email_lower
+    profile["updated_at"] = datetime.now(timezone.utc).isoformat()
+    return profile
+
+
+def profile_key(profile: dict) -> Tuple[str, str]:
+    """Primary key of a profile - the normalized phone, or the email when there is no phone"""
+    if profile.get("phone_e164"):
+        return "phone_e164", profile["phone_e164"]
+    return "email_lower", profile["email_lower"]
+
+
+def identifier_query(identifier: str) -> Optional[dict]:
+    """Exact-match profile query for a phone number or email"""
+    normalized = normalize_identifier(identifier)
+    if not normalized:
+        return None
+    if "@" in normalized:
+        return {"email_lower": normalized}
+    return {"phone_e164": normalized}
+
+
+def profile_to_saved_details(profile: dict, identifier: str) -> dict:
+    """Render a profile in the /user-details response shape"""
+    return {
+        "identifier": identifier,
+        "customer_name": profile.get("customer_name"),
+        "email": profile.get("email"),
+        "phone": profile.get("phone"),
+        "doorNo": profile.get("doorNo"),
+        "building": profile.get("building"),
+        "street": profile.get("street"),
+        "city": profile.get("city"),
+        "state": profile.get("state"),
+        "pincode": profile.get("pincode"),
+        "location": profile.get("location"),
+        "updated_at": profile.get("updated_at"),
+    }
+
+
+def profile_to_customer_data(profile: dict) -> dict:
+    """Render a profile in the /customer-data response shape"""
+    return {
+        "phone": profile.get("phone"),
+        "name": profile.get("customer_name"),
+        "email": profile.get("email"),
+        "whatsapp": profile.get("whatsapp_number"),
+        "door_no": profile.get("doorNo"),
+        "building": profile.get("building"),
+        "street": profile.get("street"),
+        "city": profile.get("city"),
+        "state": profile.get("state"),
+        "pincode": profile.get("pincode"),
+        "last_updated": profile.get("updated_at"),
+    }
+
+
+class ProfileWriteBehind:
+    """
+    Buffers profile writes and flushes them as one unordered bulk_write.
+    Writes for the same customer are coalesced (last value per field wins), and
+    lookups consult the buffer first so a profile is readable before it is flushed.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, max_pending: int = 500):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._collection = None
+        self._pending: Dict[Tuple[str, str], dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self, collection):
+        """Start the background flusher for the given collection"""
+        self._collection = collection
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out anything still buffered"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def enqueue(self, profile: Optional[dict]):
+        """Queue a profile write (no-op for profiles without a key)"""
+        if not profile:
+            return
+        key = profile_key(profile)
+        self._pending[key] = {**self._pending.get(key, {}), **profile}
+        if len(self._pending) >= self.max_pending and self._wakeup:
+            self._wakeup.set()
+
+    def get_pending(self, query: dict) -> Optional[dict]:
+        """Return a buffered profile matching an identifier_query() result"""
+        field, value = next(iter(query.items()))
+        for profile in reversed(list(self._pending.values())):
+            if profile.get(field) == value:
+                return profile
+        return None
+
+    async def flush(self) -> int:
+        """Write all buffered profiles; returns how many were sent"""
+        if not self._pending or self._collection is None:
+            return 0
+        batch, self._pending = self._pending, {}
+        operations = [
+            UpdateOne({field: value}, {"$set": profile}, upsert=True)
+            for (field, value), profile in batch.items()
+        ]
+        try:
+            await self._collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Put the batch back (newer buffered values win) and retry on the next tick
+            for key, profile in batch.items():
+                self._pending[key] = {**profile, **self._pending.get(key, {})}
+            logger.error(f"❌ Failed to flush {len(operations)} customer profiles: {e}")
+            return 0
+        return len(operations)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+async def find_profile(collection, writer: Optional[ProfileWriteBehind], identifier: str) -> Optional[dict]:
+    """Look up a profile by phone or email - one indexed read, overlaid with any buffered write"""
+    query = identifier_query(identifier)
+    if not query:
+        return None
+    pending = writer.get_pending(query) if writer else None
+    if pending:
+        # Buffered writes may be partial - overlay them on the stored copy of the same profile
+        field, value = profile_key(pending)
+        stored = await collection.find_one({field: value}, {"_id": 0})
+        return {**(stored or {}), **pending}
+    return await collection.find_one(query, {"_id": 0}, sort=[("updated_at", -1)])
@@ -1,8 +1,10 @@
 """Helper utility functions"""
 import random
+import re
 import string
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
+from pymongo import ReturnDocument
 
 def generate_order_id() -> str:
     """Generate unique order ID"""
@@ -12,6 +14,44 @@ def generate_tracking_code() -> str:
     """Generate unique tracking code"""
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
 
+# Country code assumed for local numbers (customers are in AP & Telangana)
+DEFAULT_COUNTRY_CODE = "91"
+
+def normalize_phone(phone: Optional[str], country_code: str = DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    """
+    Normalize a phone number to E.164 (e.g. "098765 43210" -> "+919876543210").
+    Local 10-digit numbers get the default country code. Returns None if there are no digits.
+    """
+    if not phone:
+        return None
+    
+    raw = str(phone).strip()
+    digits = re.sub(r"\D", "", raw)
+    if not digits:
+        return None
+    
+    if raw.startswith("+"):
+        return f"+{digits}"
+    if digits.startswith("00"):
+        return f"+{digits[2:]}"
+    
+    # Drop the domestic trunk prefix (0XXXXXXXXXX)
+    if len(digits) == 11 and digits.startswith("0"):
+        digits = digits[1:]
+    
+    if len(digits) == 10:
+        return f"+{country_code}{digits}"
+    return f"+{digits}"
+
+def normalize_identifier(identifier: Optional[str]) -> Optional[str]:
+    """Normalize a customer identifier - emails are lower-cased, anything else is treated as a phone"""
+    if not identifier:
+        return None
+    identifier = identifier.strip()
+    if "@" in identifier:
+        return identifier.lower()
+    return normalize_phone(identifier)
+
 def calculate_haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate the Haversine distance between two points on Earth (in kilometers)
@@ -32,3 +72,24 @@ def calculate_haversine_distance(lat1: float, lon1: float, lat2: float, lon2: fl
     
     distance = R * c
     return distance
+
+async def bump_settings_version(db, key: str) -> int:
+    """
+    Atomically increment a version counter stored in the settings collection.
+    Caches key on these counters to know when their source data changed.
+    """
+    setting = await db.settings.find_one_and_update(
+        {"key": key},
+        {
+            "$inc": {"version": 1},
+            "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return setting["version"]
+
+async def get_settings_version(db, key: str) -> int:
+    """Read a version counter from the settings collection (0 if never bumped)"""
+    setting = await db.settings.find_one({"key": key}, {"_id": 0, "version": 1})
+    return setting.get("version", 0) if setting else 0
@@ -0,0 +1,96 @@
+"""JSON responses rendered with orjson - the app's default response class
+
+orjson writes datetimes (as ISO 8601, like datetime.isoformat()), UUIDs and dataclasses natively
+and is several times faster than json.dumps. Endpoints that return a FastJSONResponse themselves
+also skip FastAPI's jsonable_encoder pass, which walks every value of a large listing in Python;
+only do that for plain dicts/lists straight from MongoDB (projected without _id).
+
+stream_json() writes a cursor out as a JSON array (optionally inside an object) or as NDJSON,
+one batch of documents per chunk, so memory does not grow with the collection.
+"""
+import logging
+from decimal import Decimal
+from typing import Any, AsyncIterator, Optional
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+# Documents per streamed chunk (and per cursor batch)
+STREAM_BATCH_SIZE = 500
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _default(value: Any) -> Any:
+    """Types orjson does not know - mirrors what jsonable_encoder would produce"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def _stream_chunks(cursor, batch_size: int, ndjson: bool, head: bytes, tail: bytes) -> AsyncIterator[bytes]:
+    separator = b"\n" if ndjson else b","
+    chunk = [head] if head else []
+    count = 0
+    try:
+        async for document in cursor:
+            if count and not ndjson:
+                chunk.append(separator)
+            chunk.append(dumps(document))
+            if ndjson:
+                chunk.append(separator)
+            count += 1
+            if count % batch_size == 0:
+                # The server sends this chunk before asking for more, so a slow client slows the cursor down
+                yield b"".join(chunk)
+                chunk = []
+        chunk.append(tail)
+        yield b"".join(chunk)
+    except Exception as e:
+        # Headers are already sent - the truncated body is all the client gets
+        logger.error(f"❌ JSON stream failed after {count} documents: {e}")
+        raise
+
+
+def stream_json(cursor, ndjson: bool = False, envelope: Optional[dict] = None, array_key: str = "items",
+                batch_size: int = STREAM_BATCH_SIZE, headers: Optional[dict] = None) -> StreamingResponse:
+    """
+    Stream cursor documents (project out _id) as a JSON array - or, with envelope, as
+    {**envelope, array_key: [...]} - or as NDJSON, one document per line.
+    """
+    cursor = cursor.batch_size(batch_size)
+    if ndjson:
+        head, tail = b"", b""
+    elif envelope is not None:
+        opening = dumps({**envelope, array_key: []})
+        head, tail = opening[:-2], b"]}"
+    else:
+        head, tail = b"[", b"]"
+    return StreamingResponse(
+        _stream_chunks(cursor, batch_size, ndjson, head, tail),
+        media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json",
+        headers=headers
+    )
@@ -0,0 +1,188 @@
+"""Order export helpers - flatten orders into one row per line item and encode as CSV or Parquet"""
+import csv
+import io
+from typing import Iterable, List
+
+ORDER_EXPORT_FORMATS = ("csv", "parquet")
+
+# (column, parquet type) - order-level columns repeat on every line item row
+ORDER_EXPORT_COLUMNS = [
+    ("order_id", "string"),
+    ("tracking_code", "string"),
+    ("created_at", "string"),
+    ("customer_name", "string"),
+    ("email", "string"),
+    ("phone", "string"),
+    ("city", "string"),
+    ("state", "string"),
+    ("pincode", "string"),
+    ("order_status", "string"),
+    ("payment_status", "string"),
+    ("payment_method", "string"),
+    ("payment_sub_method", "string"),
+    ("cancelled", "bool"),
+    ("custom_city_request", "bool"),
+    ("subtotal", "float64"),
+    ("delivery_charge", "float64"),
+    ("order_total", "float64"),
+    ("item_index", "int64"),
+    ("product_id", "string"),
+    ("item_name", "string"),
+    ("weight", "string"),
+    ("price", "float64"),
+    ("quantity", "int64"),
+    ("line_total", "float64"),
+]
+
+ORDER_EXPORT_FIELDNAMES = [name for name, _ in ORDER_EXPORT_COLUMNS]
+
+# Projection for the export cursor - only what the flattened rows need
+ORDER_EXPORT_PROJECTION = {
+    "_id": 0,
+    "order_id": 1,
+    "tracking_code": 1,
+    "created_at": 1,
+    "customer_name": 1,
+    "email": 1,
+    "phone": 1,
+    "city": 1,
+    "state": 1,
+    "pincode": 1,
+    "order_status": 1,
+    "payment_status": 1,
+    "payment_method": 1,
+    "payment_sub_method": 1,
+    "cancelled": 1,
+    "custom_city_request": 1,
+    "subtotal": 1,
+    "delivery_charge": 1,
+    "total": 1,
+    "items": 1,
+}
+
+
+def _as_float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_int(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def flatten_order(order: dict) -> List[dict]:
+    """Turn one order document into one row per line item (orders without items get one row)"""
+    created_at = order.get("created_at")
+    base = {
+        "order_id": order.get("order_id"),
+        "tracking_code": order.get("tracking_code"),
+        "created_at": created_at.isoformat() if hasattr(created_at, "isoformat") else created_at,
+        "customer_name": order.get("customer_name"),
+        "email": order.get("email"),
+        "phone": order.get("phone"),
+        "city": order.get("city"),
+        "state": order.get("state"),
+        "pincode": order.get("pincode"),
+        "order_status": order.get("order_status"),
+        "payment_status": order.get("payment_status"),
+        "payment_method": order.get("payment_method"),
+        "payment_sub_method": order.get("payment_sub_method"),
+        "cancelled": bool(order.get("cancelled", False)),
+        "custom_city_request": bool(order.get("custom_city_request", False)),
+        "subtotal": _as_float(order.get("subtotal")),
+        "delivery_charge": _as_float(order.get("delivery_charge")),
+        "order_total": _as_float(order.get("total")),
+    }
+
+    items = order.get("items") or []
+    if not items:
+        return [{**base, "item_index": None, "product_id": None, "item_name": None,
+                 "weight": None, "price": None, "quantity": None, "line_total": None}]
+
+    rows = []
+    for index, item in enumerate(items):
+        price = _as_float(item.get("price"))
+        quantity = _as_int(item.get("quantity"))
+        rows.append({
+            **base,
+            "item_index": index,
+            "product_id": item.get("product_id"),
+            "item_name": item.get("name"),
+            "weight": item.get("weight"),
+            "price": price,
+            "quantity": quantity,
+            "line_total": round(price * quantity, 2) if price is not None and quantity is not None else None,
+        })
+    return rows
+
+
+def encode_order_rows_csv(rows: Iterable[dict], include_header: bool = False) -> str:
+    """Render flattened order rows as CSV text"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=ORDER_EXPORT_FIELDNAMES, extrasaction="ignore")
+    if include_header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever bytes were written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ParquetStreamWriter:
+    """
+    Incremental Parquet encoder - each write_rows() call becomes one row group and
+    returns the bytes produced so far, so the file can be streamed as it is built.
+    Requires pyarrow.
+    """
+
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        arrow_types = {"string": pa.string(), "bool": pa.bool_(), "int64": pa.int64(), "float64": pa.float64()}
+        self._schema = pa.schema([(name, arrow_types[type_name]) for name, type_name in ORDER_EXPORT_COLUMNS])
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression="snappy")
+
+    def write_rows(self, rows: List[dict]) -> bytes:
+        if rows:
+            table = self._pa.Table.from_pylist(rows, schema=self._schema)
+            self._writer.write_table(table)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
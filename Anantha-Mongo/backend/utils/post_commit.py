@@ -0,0 +1,94 @@
+"""Post-commit pipeline - side effects that run after an order is stored, off the request path
+
+Each order submits a list of named steps. Steps run concurrently, are retried with
+exponential backoff, and record their outcome on the order document under
+post_commit.<step> so admins can see what happened (and what still needs a hand).
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A step is (name, zero-arg async callable). Returning False counts as a failure.
+PostCommitStep = Tuple[str, Callable[[], Awaitable[Optional[bool]]]]
+
+
+def pending_status(steps: List[PostCommitStep]) -> dict:
+    """Initial post_commit value to store on the order when it is inserted"""
+    return {name: {"status": "pending", "attempts": 0} for name, _ in steps}
+
+
+class PostCommitPipeline:
+    """Runs post-commit steps in the background with retry and per-order status tracking"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self._collection = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"succeeded": 0, "failed": 0, "retried": 0})
+
+    def start(self, collection):
+        """Attach the collection holding the documents whose status is tracked"""
+        self._collection = collection
+
+    def submit(self, order_id: str, steps: List[PostCommitStep]):
+        """Schedule the steps for an order and return immediately"""
+        if not steps:
+            return
+        task = asyncio.create_task(self._run_steps(order_id, steps))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self, timeout: float = 10.0):
+        """Give in-flight side effects a chance to finish before shutdown"""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+
+    def stats(self) -> dict:
+        """Counters per step plus the number of orders still being processed"""
+        return {"in_flight": len(self._tasks), "steps": {name: dict(counts) for name, counts in self._stats.items()}}
+
+    async def _run_steps(self, order_id: str, steps: List[PostCommitStep]):
+        await asyncio.gather(*(self._run_step(order_id, name, func) for name, func in steps))
+
+    async def _run_step(self, order_id: str, name: str, func):
+        error = None
+        attempt = 0
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                result = await func()
+                if result is not False:
+                    self._stats[name]["succeeded"] += 1
+                    await self._record(order_id, name, "done", attempt)
+                    return
+                error = "step reported failure"
+            except Exception as e:
+                error = str(e)
+
+            if attempt < self.max_attempts:
+                self._stats[name]["retried"] += 1
+                await asyncio.sleep(self.base_delay * 2 ** (attempt - 1))
+
+        self._stats[name]["failed"] += 1
+        logger.error(f"❌ Post-commit step '{name}' failed for order {order_id} after {attempt} attempts: {error}")
+        await self._record(order_id, name, "failed", attempt, error)
+
+    async def _record(self, order_id: str, name: str, status: str, attempts: int, error: Optional[str] = None):
+        if self._collection is None:
+            return
+        try:
+            await self._collection.update_one(
+                {"order_id": order_id},
+                {"$set": {f"post_commit.{name}": {
+                    "status": status,
+                    "attempts": attempts,
+                    "error": error,
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                }}}
+            )
+        except Exception as e:
+            logger.error(f"❌ Failed to record post-commit status for order {order_id}: {e}")
@@ -140,7 +140,22 @@ async def create_tables():
                 enabled BOOLEAN DEFAULT TRUE
             )
         ''')
-        
+
+        # One row per city/state - lets seeders and admin bulk updates upsert by name.
+        # Older seeders could insert a city twice; keep the first row of each before indexing.
+        if not await conn.fetchval("SELECT to_regclass('idx_locations_name_state')"):
+            removed = await conn.execute('''
+                DELETE FROM locations a
+                USING locations b
+                WHERE a.name = b.name AND a.state = b.state AND a.id > b.id
+            ''')
+            if removed != "DELETE 0":
+                print(f"🧹 Removed duplicate locations before indexing ({removed})")
+        await conn.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_locations_name_state
+            ON locations (name, state)
+        ''')
+
         # States table
         await conn.execute('''
             CREATE TABLE IF NOT EXISTS states (
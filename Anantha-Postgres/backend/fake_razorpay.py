@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Local fake Razorpay API for tests and load benchmarks
+
+Implements the subset of the Razorpay REST API the backend uses (orders and payments)
+with in-memory state, plus knobs for latency and failure injection:
+
+    FAKE_RAZORPAY_LATENCY_MS=50 FAKE_RAZORPAY_FAILURE_RATE=0.1 python fake_razorpay.py
+
+Then start the API server with RAZORPAY_API_BASE=http://localhost:8099/v1
+"""
+import asyncio
+import base64
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.environ.get("FAKE_RAZORPAY_LATENCY_MS", "0"))
+FAILURE_RATE = float(os.environ.get("FAKE_RAZORPAY_FAILURE_RATE", "0"))
+
+app = FastAPI(title="Fake Razorpay API")
+
+orders = {}
+payments = {}
+
+
+def razorpay_error(status_code: int, description: str, code: str = "BAD_REQUEST_ERROR"):
+    return JSONResponse(status_code=status_code, content={"error": {"code": code, "description": description}})
+
+
+@app.middleware("http")
+async def simulate_gateway(request: Request, call_next):
+    """Basic auth check, artificial latency and random 5xx failures"""
+    authorization = request.headers.get("authorization", "")
+    try:
+        key_id = base64.b64decode(authorization.removeprefix("Basic ")).decode().split(":", 1)[0]
+    except Exception:
+        key_id = ""
+    if not key_id:
+        return razorpay_error(401, "The api key provided is invalid")
+
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if FAILURE_RATE and random.random() < FAILURE_RATE:
+        return razorpay_error(503, "Service temporarily unavailable", "SERVER_ERROR")
+    return await call_next(request)
+
+
+@app.post("/v1/orders")
+async def create_order(data: dict):
+    amount = data.get("amount")
+    if not isinstance(amount, int) or amount < 100:
+        return razorpay_error(400, "The amount must be atleast INR 1.00")
+
+    order = {
+        "id": f"order_{uuid.uuid4().hex[:14]}",
+        "entity": "order",
+        "amount": amount,
+        "amount_paid": 0,
+        "amount_due": amount,
+        "currency": data.get("currency", "INR"),
+        "receipt": data.get("receipt"),
+        "status": "created",
+        "attempts": 0,
+        "notes": data.get("notes") or [],
+        "created_at": int(time.time()),
+    }
+    orders[order["id"]] = order
+    return order
+
+
+@app.get("/v1/orders/{order_id}")
+async def fetch_order(order_id: str):
+    if order_id not in orders:
+        return razorpay_error(400, "The id provided does not exist")
+    return orders[order_id]
+
+
+@app.post("/v1/orders/{order_id}/pay")
+async def pay_order(order_id: str):
+    """Test helper (not part of Razorpay) - mark an order paid and return the captured payment"""
+    order = orders.get(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    payment = {
+        "id": f"pay_{uuid.uuid4().hex[:14]}",
+        "entity": "payment",
+        "amount": order["amount"],
+        "currency": order["currency"],
+        "status": "captured",
+        "order_id": order_id,
+        "captured": True,
+        "created_at": int(time.time()),
+    }
+    payments[payment["id"]] = payment
+    order.update(status="paid", amount_paid=order["amount"], amount_due=0, attempts=order["attempts"] + 1)
+    return payment
+
+
+@app.get("/v1/payments/{payment_id}")
+async def fetch_payment(payment_id: str):
+    if payment_id not in payments:
+        return razorpay_error(400, "The id provided does not exist")
+    return payments[payment_id]
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("FAKE_RAZORPAY_PORT", "8099")))
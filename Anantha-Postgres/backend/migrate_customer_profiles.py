@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Merge legacy customer autofill data into the customer_profiles collection
+
+Reads customer_data (checkout form saves) and saved_user_details (per-order copies keyed
+by phone and by email) and writes one profile per customer. Newer records win field by
+field. Safe to re-run; the legacy collections are left untouched.
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from utils.customer_profiles import ProfileWriteBehind, build_profile
+from utils.index_manager import ensure_indexes_mongodb
+
+load_dotenv()
+
+BATCH_SIZE = 500
+
+def as_iso(value):
+    """Timestamps are datetimes in customer_data and ISO strings in saved_user_details"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def customer_data_to_profile(doc):
+    profile = build_profile(
+        customer_name=doc.get("name"),
+        email=doc.get("email"),
+        phone=doc.get("phone"),
+        whatsapp_number=doc.get("whatsapp"),
+        doorNo=doc.get("door_no"),
+        building=doc.get("building"),
+        street=doc.get("street"),
+        city=doc.get("city"),
+        state=doc.get("state"),
+        pincode=doc.get("pincode")
+    )
+    if profile and doc.get("last_updated"):
+        profile["updated_at"] = as_iso(doc["last_updated"])
+    return profile
+
+def saved_details_to_profile(doc):
+    profile = build_profile(**doc)
+    if profile and doc.get("updated_at"):
+        profile["updated_at"] = as_iso(doc["updated_at"])
+    return profile
+
+async def merge_by_time(sources):
+    """Yield profiles from every source as one stream, oldest record first"""
+    cursors = [collection.find({}, {"_id": 0}).sort(time_field, 1) for collection, time_field, _ in sources]
+    heads = {}
+
+    async def advance(index):
+        try:
+            heads[index] = await cursors[index].__anext__()
+        except StopAsyncIteration:
+            heads.pop(index, None)
+
+    for index in range(len(sources)):
+        await advance(index)
+    while heads:
+        # Records without a timestamp come first, as they do within each sorted source
+        index = min(heads, key=lambda i: as_iso(heads[i].get(sources[i][1])) or "")
+        yield sources[index][2](heads[index])
+        await advance(index)
+
+async def migrate_customer_profiles():
+    """Build customer_profiles from the legacy autofill collections"""
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ.get('DB_NAME', 'anantha_lakshmi_db')]
+
+    print("=" * 60)
+    print("MIGRATING CUSTOMER PROFILES")
+    print("=" * 60)
+
+    # Indexes first so the upserts below match on phone_e164/email_lower quickly
+    await ensure_indexes_mongodb(db)
+
+    writer = ProfileWriteBehind(max_pending=BATCH_SIZE)
+    writer.start(db.customer_profiles)
+    sources = (
+        (db.customer_data, "last_updated", customer_data_to_profile),
+        (db.saved_user_details, "updated_at", saved_details_to_profile),
+    )
+    try:
+        count = 0
+        # Both sources merged oldest first, so the latest record for a customer is applied last
+        async for profile in merge_by_time(sources):
+            writer.enqueue(profile)
+            count += 1
+            if count % BATCH_SIZE == 0:
+                await writer.flush()
+        print(f"  • {count} records read from {', '.join(c.name for c, _, _ in sources)}")
+    finally:
+        await writer.stop()
+
+    total = await db.customer_profiles.count_documents({})
+    print(f"\n✓ {total} customer profiles in database")
+
+    client.close()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(migrate_customer_profiles())
+    except Exception as e:
+        print(f"\n❌ Error migrating customer profiles: {str(e)}")
+        sys.exit(1)
@@ -1,32 +1,60 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, UploadFile, Header, Request, Form
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr, ConfigDict, ValidationError
 from typing import List, Optional
 import uuid
+from dataclasses import asdict
 from datetime import datetime, timezone, timedelta
 import aiofiles
 import base64
+import codecs
+import csv
+import itertools
 from auth import create_access_token, decode_token, get_password_hash, verify_password
 from email_service import send_order_confirmation_email
-from gmail_service import send_order_confirmation_email_gmail, send_order_status_update_email, send_city_approval_email, send_city_rejection_email
+from gmail_service import send_order_confirmation_email_gmail, send_order_status_update_email, send_city_approval_email, send_city_rejection_email, send_payment_completion_email
 from cities_data import ALL_CITIES, DEFAULT_DELIVERY_CHARGES, DEFAULT_OTHER_CITY_CHARGE, ANDHRA_PRADESH_CITIES, TELANGANA_CITIES
 import random
 import string
 from math import radians, sin, cos, sqrt, atan2
-import razorpay
-import hmac
-import hashlib
+import json
 
 # Import utility functions
-from utils.helpers import generate_order_id, generate_tracking_code, calculate_haversine_distance
+from utils.helpers import generate_order_id, generate_tracking_code, calculate_haversine_distance, bump_settings_version, get_settings_version, normalize_phone, normalize_identifier
 from utils.admin_manager import ensure_admin_exists_mongodb
+from utils.index_manager import ensure_indexes_mongodb
+from utils.customer_profiles import ProfileWriteBehind, build_profile, find_profile, profile_to_saved_details, profile_to_customer_data
+from utils.post_commit import PostCommitPipeline, pending_status
+from utils.admission import AdmissionController, AdmissionControlMiddleware
+from utils.flash_sale import FlashSaleInventory, FlashSaleSoldOut
+from utils.idempotency import IdempotencyStore, IdempotencyConflict, request_fingerprint
+from utils.jobs import JobScheduler
+from utils.cart_quote import CatalogCache, quote_cart, apply_discount, location_key, PRODUCTS_VERSION_KEY, NOT_IN_CITY, OUT_OF_STOCK, INSUFFICIENT_INVENTORY
+from utils.product_search import ProductSearchIndex
+from utils.city_index import CityIndex, city_match_key
+from utils.city_suggestions import CitySuggestionBook, requester_emails
+from utils.json_response import FastJSONResponse, stream_json, dumps as json_dumps
+from utils.compression import CompressionMiddleware, ResponseBodyCache
+from utils.pagination import fetch_page, date_range_filter
+from utils.pending_cities import PENDING_CITIES_COLLECTION, record_custom_city_order, remove_pending_city, mark_suggestion_status, list_pending_cities, rebuild_pending_cities
+from utils.order_archive import ARCHIVE_COLLECTION, archive_orders, archived_order_totals, find_archived_orders
+from utils.payment_gateway import RazorpayGateway, RAZORPAY_API_BASE, GatewayError, GatewayUnavailable
+from utils.structured_logging import configure_logging, stop_logging, log_sampled, RequestIdMiddleware, REQUEST_ID_HEADER
+from utils.seeding import plan_seed, build_mongodb_operations
+from utils.catalog_io import detect_catalog_format, iter_catalog_records, encode_csv_rows, encode_jsonl_rows
+from utils.order_export import ORDER_EXPORT_FORMATS, ORDER_EXPORT_PROJECTION, flatten_order, encode_order_rows_csv, ParquetStreamWriter
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -36,20 +64,55 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
-# Razorpay client initialization
-razorpay_client = razorpay.Client(auth=(os.environ.get('RAZORPAY_KEY_ID', ''), os.environ.get('RAZORPAY_KEY_SECRET', '')))
+# Razorpay gateway (async, pooled) - RAZORPAY_API_BASE can point at fake_razorpay.py for local testing
+payment_gateway = RazorpayGateway(
+    key_id=os.environ.get('RAZORPAY_KEY_ID', ''),
+    key_secret=os.environ.get('RAZORPAY_KEY_SECRET', ''),
+    base_url=os.environ.get('RAZORPAY_API_BASE', RAZORPAY_API_BASE),
+    timeout=float(os.environ.get('RAZORPAY_TIMEOUT_SECONDS', '10'))
+)
+
+# Delivery locations are unique per city name + state
+LOCATION_KEY_FIELDS = ("name", "state")
+# settings key of the location-table version counter
+LOCATIONS_VERSION_KEY = "locations_version"
+# Products and locations in memory for cart quotes and order pricing (see utils/cart_quote.py)
+catalog_cache = CatalogCache(LOCATIONS_VERSION_KEY)
+# Product search over the cached catalog (see utils/product_search.py)
+product_search = ProductSearchIndex()
+# City typeahead over the cached delivery locations (see utils/city_index.py)
+city_index = CityIndex()
+# Rendered /products and /locations bodies with their gzip/brotli variants, per catalog version
+catalog_responses = ResponseBodyCache(max_age=float(os.environ.get('CATALOG_RESPONSE_CACHE_SECONDS', '30')))
+# Custom city requests merged per town (see utils/city_suggestions.py)
+city_suggestions = CitySuggestionBook()
+
+# Customer profile writes are batched off the request path (see utils/customer_profiles.py)
+profile_writer = ProfileWriteBehind()
+# Order side effects (emails, suggestions, profile saves) run after the order is stored
+order_pipeline = PostCommitPipeline()
+# Stored responses for POST /orders retries that carry an Idempotency-Key
+idempotency_store = IdempotencyStore()
+# In-memory stock reservations for products in flash-sale mode
+flash_inventory = FlashSaleInventory(
+    check_interval=float(os.environ.get('FLASH_SALE_RESERVATION_CHECK_SECONDS', '60'))
+)
+# Periodic maintenance (stale order expiry, ...) run by the worker holding the scheduler lease;
+# jobs are registered next to their functions
+background_jobs = JobScheduler()
+# Unpaid online orders older than this are cancelled and their stock released
+PENDING_ORDER_EXPIRY_MINUTES = float(os.environ.get('PENDING_ORDER_EXPIRY_MINUTES', '30'))
+# Delivered/cancelled orders older than this move to the archive tier (see utils/order_archive.py)
+ORDER_ARCHIVE_AFTER_DAYS = float(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', '180'))
 
 # Create the main app
-app = FastAPI(title="Anantha Lakshmi Food Delivery API - MongoDB Version")
+app = FastAPI(title="Anantha Lakshmi Food Delivery API - MongoDB Version", default_response_class=FastJSONResponse)
 
 # Create API router
 api_router = APIRouter(prefix="/api")
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging - JSON lines written off the event loop (see utils/structured_logging.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Startup event - Auto-create admin from .env
@@ -60,16 +123,41 @@ async def startup_event():
     try:
         # Auto-create/update admin user from .env
         await ensure_admin_exists_mongodb(db)
+        # Indexes for exact-match phone/email lookups
+        await ensure_indexes_mongodb(db)
+        profile_writer.start(db.customer_profiles)
+        order_pipeline.start(db.orders)
+        idempotency_store.start(db.idempotency_keys)
+        catalog_cache.start(db)
+        city_suggestions.start(db)
+        await city_suggestions.backfill_match_keys()
+        # First start with the pending_cities collection: build it from the existing orders
+        if not await db[PENDING_CITIES_COLLECTION].find_one({}, {"_id": 1}):
+            await rebuild_pending_cities(db, await served_city_keys())
+        flash_inventory.start(db.products, db.orders)
+        background_jobs.start(db.scheduler_leases, db.job_runs)
         logger.info("✅ Server startup completed successfully")
     except Exception as e:
         logger.error(f"❌ Error during startup: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered writes before the process exits"""
+    await background_jobs.stop()
+    await order_pipeline.stop()
+    await flash_inventory.stop()
+    await profile_writer.stop()
+    await payment_gateway.close()
+    stop_logging()
+
 # Add validation error handler to log details
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    print(f"VALIDATION ERROR on {request.url.path}")
-    print(f"Request body: {await request.body()}")
-    print(f"Validation errors: {exc.errors()}")
+    # Log where validation failed but not the submitted values (they carry customer details)
+    logger.warning("Request validation failed", extra={
+        "path": request.url.path,
+        "errors": [{"loc": error.get("loc"), "type": error.get("type"), "msg": error.get("msg")} for error in exc.errors()]
+    })
     return JSONResponse(
         status_code=422,
         content={"detail": exc.errors()}
@@ -135,6 +223,17 @@ class OrderItem(BaseModel):
     quantity: int
     description: Optional[str] = None
 
+class CartQuoteItem(BaseModel):
+    product_id: str
+    weight: str
+    quantity: int = Field(gt=0)
+
+class CartQuoteRequest(BaseModel):
+    items: List[CartQuoteItem]
+    city: Optional[str] = ""
+    state: Optional[str] = ""
+    is_custom_location: bool = False
+
 class OrderCreate(BaseModel):
     user_id: Optional[str] = "guest"
     customer_name: str
@@ -430,6 +529,29 @@ async def get_current_user_optional(authorization: Optional[str] = Header(None))
             "is_admin": False
         }
 
+def detect_city_state(city_name: str) -> str:
+    """Best-guess state for a city name from cities_data (defaults to Andhra Pradesh)"""
+    if city_name in TELANGANA_CITIES and city_name not in ANDHRA_PRADESH_CITIES:
+        return "Telangana"
+    return "Andhra Pradesh"
+
+async def bump_locations_version() -> int:
+    """Mark the locations table as changed so location caches refresh"""
+    catalog_cache.invalidate()
+    return await bump_settings_version(db, LOCATIONS_VERSION_KEY)
+
+async def bump_products_version() -> int:
+    """Mark the products table as changed so catalog caches on every worker refresh"""
+    catalog_cache.invalidate()
+    return await bump_settings_version(db, PRODUCTS_VERSION_KEY)
+
+def build_contact_query(identifier: str) -> dict:
+    """Exact-match order query for a phone number or email (uses the phone_e164 index)"""
+    normalized = normalize_identifier(identifier)
+    if normalized and "@" in normalized:
+        return {"email": {"$in": list({identifier, normalized})}}
+    return {"phone_e164": normalized or identifier}
+
 # ============= AUTHENTICATION APIS =============
 
 @api_router.post("/auth/register")
@@ -449,6 +571,7 @@ async def register(user_data: UserRegister):
         "email": user_data.email,
         "name": user_data.name,
         "phone": user_data.phone,
+        "phone_e164": normalize_phone(user_data.phone),
         "password": hashed_password,
         "auth_provider": "email",
         "created_at": datetime.now(timezone.utc).isoformat()
@@ -530,7 +653,10 @@ async def phone_auth(auth_data: PhoneAuth):
     # For now, this is a mock implementation
     
     # Mock OTP verification (assume OTP is correct)
-    user = await db.users.find_one({"phone": auth_data.phone}, {"_id": 0})
+    phone_e164 = normalize_phone(auth_data.phone)
+    if not phone_e164:
+        raise HTTPException(status_code=400, detail="Invalid phone number")
+    user = await db.users.find_one({"phone_e164": phone_e164}, {"_id": 0})
     
     if not user:
         # Create new user
@@ -539,6 +665,7 @@ async def phone_auth(auth_data: PhoneAuth):
             "email": f"{auth_data.phone}@phone.user",
             "name": f"User {auth_data.phone}",
             "phone": auth_data.phone,
+            "phone_e164": phone_e164,
             "auth_provider": "phone",
             "created_at": datetime.now(timezone.utc).isoformat()
         }
@@ -606,18 +733,31 @@ async def admin_login(login_data: AdminLogin):
 @api_router.get("/user-details/{identifier}")
 async def get_saved_user_details(identifier: str):
     """Get saved user details by phone or email"""
-    details = await db.saved_user_details.find_one({"identifier": identifier}, {"_id": 0})
+    profile = await find_profile(db.customer_profiles, profile_writer, identifier)
     
-    if not details:
+    if not profile:
         return None
     
-    return details
+    return profile_to_saved_details(profile, normalize_identifier(identifier))
 
 # ============= PRODUCTS APIS =============
 
 @api_router.get("/products")
-async def get_products(city: Optional[str] = None, state: Optional[str] = None):
-    """Get all products with discount calculation, optionally filtered by city/state availability"""
+async def get_products(request: Request, city: Optional[str] = None, state: Optional[str] = None):
+    """
+    Get all products with discount calculation, optionally filtered by city/state availability
+    Served from catalog_responses: re-rendered when the catalog version moves, and at least every
+    30s so stock flags set by orders and discount expiries show up.
+    """
+    snapshot = await catalog_cache.snapshot()
+    
+    async def render():
+        return json_dumps(await load_products(city, state))
+    
+    return await catalog_responses.respond(request, ("products", city, state), snapshot.versions, render)
+
+async def load_products(city: Optional[str], state: Optional[str]) -> list:
+    """Products available in a city (or any city of a state), with discounts applied"""
     # Build query filter
     query_filter = {}
     if city:
@@ -644,48 +784,54 @@ async def get_products(city: Optional[str] = None, state: Optional[str] = None):
     products = await db.products.find(query_filter, {"_id": 0}).to_list(1000)
     
     # Calculate discounted prices for each product
+    now = datetime.now(timezone.utc)
     for product in products:
-        discount_percentage = product.get('discount_percentage')
-        discount_expiry = product.get('discount_expiry_date')
-        
-        # Check if discount is valid
-        discount_active = False
-        if discount_percentage and discount_expiry:
-            try:
-                # Parse the date string
-                expiry_date_str = discount_expiry.replace('Z', '+00:00')
-                if 'T' in expiry_date_str:
-                    expiry_date = datetime.fromisoformat(expiry_date_str)
-                else:
-                    # If only date is provided (YYYY-MM-DD), add time and timezone
-                    expiry_date = datetime.fromisoformat(expiry_date_str + "T23:59:59+00:00")
-                
-                # Ensure timezone awareness for comparison
-                if expiry_date.tzinfo is None:
-                    expiry_date = expiry_date.replace(tzinfo=timezone.utc)
-                
-                if expiry_date > datetime.now(timezone.utc):
-                    discount_active = True
-            except:
-                pass
-        
-        product['discount_active'] = discount_active
-        
-        # Calculate discounted prices if discount is active
-        if discount_active and discount_percentage:
-            discounted_prices = []
-            for price_item in product.get('prices', []):
-                original_price = price_item['price']
-                discounted_price = round(original_price * (1 - discount_percentage / 100), 2)
-                discounted_prices.append({
-                    **price_item,
-                    'original_price': original_price,
-                    'discounted_price': discounted_price
-                })
-            product['discounted_prices'] = discounted_prices
+        apply_discount(product, now)
     
     return products
 
+# Caps on search/autocomplete page sizes
+PRODUCT_SEARCH_MAX_LIMIT = 50
+
+async def search_catalog(q: str, limit: int, city: Optional[str] = None) -> list:
+    """Ranked products from the cached catalog, optionally only those deliverable to a city"""
+    snapshot = await catalog_cache.snapshot()
+    product_search.sync(snapshot.products_by_id)
+    limit = min(max(limit, 1), PRODUCT_SEARCH_MAX_LIMIT)
+    
+    products = []
+    for product_id, _ in product_search.search(q, limit=None):
+        product = snapshot.products_by_id.get(product_id)
+        if product is None:
+            continue
+        available_cities = product.get("available_cities")
+        if city and available_cities and city not in available_cities:
+            continue
+        products.append(product)
+        if len(products) >= limit:
+            break
+    return products
+
+@api_router.get("/products/search")
+async def search_products(q: str, limit: int = 20, city: Optional[str] = None):
+    """Search products by name, Telugu name, category, tag or description - the last word may be partial"""
+    now = datetime.now(timezone.utc)
+    return [apply_discount(dict(product), now) for product in await search_catalog(q, limit, city)]
+
+@api_router.get("/products/autocomplete")
+async def autocomplete_products(q: str, limit: int = 8, city: Optional[str] = None):
+    """Product name suggestions for a partly typed query (small payload for type-ahead)"""
+    return [
+        {
+            "id": product["id"],
+            "name": product.get("name"),
+            "name_telugu": product.get("name_telugu"),
+            "category": product.get("category"),
+            "image": product.get("image")
+        }
+        for product in await search_catalog(q, limit, city)
+    ]
+
 @api_router.get("/products/{product_id}")
 async def get_product(product_id: str):
     """Get a single product by ID with discount calculation"""
@@ -695,44 +841,7 @@ async def get_product(product_id: str):
         raise HTTPException(status_code=404, detail="Product not found")
     
     # Calculate discounted prices for the product
-    discount_percentage = product.get('discount_percentage')
-    discount_expiry = product.get('discount_expiry_date')
-    
-    # Check if discount is valid
-    discount_active = False
-    if discount_percentage and discount_expiry:
-        try:
-            # Parse the date string
-            expiry_date_str = discount_expiry.replace('Z', '+00:00')
-            if 'T' in expiry_date_str:
-                expiry_date = datetime.fromisoformat(expiry_date_str)
-            else:
-                # If only date is provided (YYYY-MM-DD), add time and timezone
-                expiry_date = datetime.fromisoformat(expiry_date_str + "T23:59:59+00:00")
-            
-            # Ensure timezone awareness for comparison
-            if expiry_date.tzinfo is None:
-                expiry_date = expiry_date.replace(tzinfo=timezone.utc)
-            
-            if expiry_date > datetime.now(timezone.utc):
-                discount_active = True
-        except:
-            pass
-    
-    product['discount_active'] = discount_active
-    
-    # Calculate discounted prices if discount is active
-    if discount_active and discount_percentage:
-        discounted_prices = []
-        for price_item in product.get('prices', []):
-            original_price = price_item['price']
-            discounted_price = round(original_price * (1 - discount_percentage / 100), 2)
-            discounted_prices.append({
-                **price_item,
-                'original_price': original_price,
-                'discounted_price': discounted_price
-            })
-        product['discounted_prices'] = discounted_prices
+    apply_discount(product)
     
     return product
 
@@ -741,6 +850,7 @@ async def create_product(product: Product, current_user: dict = Depends(get_curr
     """Create new product (Admin only)"""
     product_dict = product.model_dump()
     await db.products.insert_one(product_dict)
+    await bump_products_version()
     product_dict.pop("_id", None)
     return {"message": "Product created successfully", "product": product_dict}
 
@@ -753,6 +863,7 @@ async def update_product(product_id: str, product: Product, current_user: dict =
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await bump_products_version()
     return {"message": "Product updated successfully"}
 
 @api_router.delete("/products/{product_id}")
@@ -763,8 +874,156 @@ async def delete_product(product_id: str, current_user: dict = Depends(get_curre
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await bump_products_version()
     return {"message": "Product deleted successfully"}
 
+# ============= CATALOG IMPORT/EXPORT APIS =============
+
+# Rows validated and written per bulk_write round-trip
+CATALOG_IMPORT_CHUNK_SIZE = 200
+# Products pulled from the cursor and encoded per streamed export chunk
+CATALOG_EXPORT_BATCH_SIZE = 200
+# Cap on per-row errors echoed back so a bad file can't produce a huge response
+CATALOG_MAX_REPORTED_ERRORS = 100
+
+async def _apply_catalog_chunk(records: list, dry_run: bool) -> dict:
+    """Validate a chunk of (row_number, record) pairs against Product and upsert the valid ones"""
+    ids = [record.get("id") for _, record in records if record.get("id")]
+    existing_docs = await db.products.find({"id": {"$in": ids}}, {"_id": 0}).to_list(len(ids) or 1)
+    existing_by_id = {doc["id"]: doc for doc in existing_docs}
+
+    operations = []
+    errors = []
+    for row_number, record in records:
+        product_id = record.get("id")
+        if not product_id:
+            errors.append({"row": row_number, "error": "Missing product id"})
+            continue
+
+        # Partial rows (e.g. just id + prices) are validated against the stored product
+        existing = existing_by_id.get(product_id, {})
+        try:
+            product = Product.model_validate({**existing, **record})
+        except ValidationError as e:
+            errors.append({"row": row_number, "id": product_id, "error": e.errors(include_url=False)})
+            continue
+
+        validated = product.model_dump()
+        changed_fields = {field: validated[field] for field in record if field in validated}
+        insert_defaults = {field: value for field, value in validated.items() if field not in changed_fields}
+        update = {"$set": changed_fields}
+        if insert_defaults:
+            update["$setOnInsert"] = insert_defaults
+        operations.append(UpdateOne({"id": product_id}, update, upsert=True))
+
+    stats = {"valid": len(operations), "inserted": 0, "updated": 0, "errors": errors}
+    if operations and not dry_run:
+        result = await db.products.bulk_write(operations, ordered=False)
+        stats["inserted"] = result.upserted_count
+        stats["updated"] = result.modified_count
+        await bump_products_version()
+    return stats
+
+@api_router.post("/admin/products/import")
+async def import_products(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    dry_run: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Bulk create/update products from a CSV or JSONL upload (Admin only).
+    Rows are matched on product id; empty CSV cells leave the stored value untouched.
+    Use dry_run=true to validate the file without writing anything.
+    """
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    try:
+        fmt = detect_catalog_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # Parse lazily from the spooled upload; each chunk is parsed off the event loop
+        text_stream = codecs.getreader("utf-8-sig")(file.file)
+        records = iter_catalog_records(text_stream, fmt)
+
+        totals = {"processed": 0, "valid": 0, "inserted": 0, "updated": 0, "error_count": 0}
+        errors = []
+
+        while True:
+            chunk = await run_in_threadpool(lambda: list(itertools.islice(records, CATALOG_IMPORT_CHUNK_SIZE)))
+            if not chunk:
+                break
+
+            totals["processed"] += len(chunk)
+            parsed = []
+            for row_number, record, parse_error in chunk:
+                if parse_error:
+                    totals["error_count"] += 1
+                    if len(errors) < CATALOG_MAX_REPORTED_ERRORS:
+                        errors.append({"row": row_number, "error": parse_error})
+                else:
+                    parsed.append((row_number, record))
+
+            if not parsed:
+                continue
+
+            stats = await _apply_catalog_chunk(parsed, dry_run)
+            totals["valid"] += stats["valid"]
+            totals["inserted"] += stats["inserted"]
+            totals["updated"] += stats["updated"]
+            totals["error_count"] += len(stats["errors"])
+            errors.extend(stats["errors"][:max(0, CATALOG_MAX_REPORTED_ERRORS - len(errors))])
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Catalog file must be UTF-8 encoded")
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Malformed CSV: {str(e)}")
+
+    totals["unchanged"] = 0 if dry_run else totals["valid"] - totals["inserted"] - totals["updated"]
+    logger.info(f"Catalog import ({fmt}{', dry run' if dry_run else ''}): {totals}")
+
+    return {
+        "message": "Catalog validated successfully" if dry_run else "Catalog imported successfully",
+        "format": fmt,
+        "dry_run": dry_run,
+        **totals,
+        "errors": errors
+    }
+
+@api_router.get("/admin/products/export")
+async def export_products(format: str = "csv", current_user: dict = Depends(get_current_user)):
+    """Stream the full product catalog as CSV or JSONL (Admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    try:
+        fmt = detect_catalog_format(None, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def generate():
+        cursor = db.products.find({}, {"_id": 0}).sort("id", 1).batch_size(CATALOG_EXPORT_BATCH_SIZE)
+        batch = []
+        first_batch = True
+        async for product in cursor:
+            batch.append(product)
+            if len(batch) >= CATALOG_EXPORT_BATCH_SIZE:
+                yield encode_csv_rows(batch, include_header=first_batch) if fmt == "csv" else encode_jsonl_rows(batch)
+                batch = []
+                first_batch = False
+        if batch or (first_batch and fmt == "csv"):
+            yield encode_csv_rows(batch, include_header=first_batch) if fmt == "csv" else encode_jsonl_rows(batch)
+
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"products_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return StreamingResponse(
+        generate(),
+        media_type=f"{media_type}; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 # ============= DISCOUNT APIS =============
 
 @api_router.post("/admin/products/{product_id}/discount")
@@ -805,6 +1064,7 @@ async def add_discount(product_id: str, discount: DiscountUpdate, current_user:
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await bump_products_version()
     return {"message": "Discount added successfully"}
 
 @api_router.delete("/admin/products/{product_id}/discount")
@@ -818,6 +1078,7 @@ async def remove_discount(product_id: str, current_user: dict = Depends(get_curr
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await bump_products_version()
     return {"message": "Discount removed successfully"}
 
 @api_router.get("/admin/products/discounts")
@@ -856,6 +1117,7 @@ async def update_inventory(product_id: str, data: dict, current_user: dict = Dep
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await bump_products_version()
     return {"message": "Inventory updated successfully"}
 
 @api_router.get("/admin/products/{product_id}/stock-status")
@@ -884,6 +1146,7 @@ async def toggle_stock_status(product_id: str, data: dict, current_user: dict =
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await bump_products_version()
     return {"message": "Stock status updated successfully"}
 
 @api_router.put("/admin/products/{product_id}/available-cities")
@@ -903,6 +1166,7 @@ async def update_available_cities(product_id: str, data: dict, current_user: dic
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await bump_products_version()
     return {"message": "Available cities updated successfully"}
 
 # ============= BEST SELLER APIS =============
@@ -922,6 +1186,7 @@ async def update_best_sellers(data: dict, current_user: dict = Depends(get_curre
             {"$set": {"isBestSeller": True}}
         )
     
+    await bump_products_version()
     return {"message": "Best sellers updated successfully"}
 
 @api_router.get("/admin/best-sellers")
@@ -980,6 +1245,7 @@ async def update_festival_products(data: dict, current_user: dict = Depends(get_
             {"$set": {"isFestival": True}}
         )
     
+    await bump_products_version()
     return {"message": "Festival products updated successfully"}
 
 @api_router.get("/admin/festival-products")
@@ -1001,8 +1267,36 @@ async def toggle_product_festival(product_id: str, data: dict, current_user: dic
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await bump_products_version()
     return {"message": f"Product festival status updated to {is_festival}"}
 
+@api_router.put("/admin/products/{product_id}/flash-sale")
+async def toggle_product_flash_sale(product_id: str, data: dict, current_user: dict = Depends(get_current_user)):
+    """Switch flash-sale inventory mode for a product (Admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    enabled = bool(data.get("enabled", False))
+    result = await db.products.update_one({"id": product_id}, {"$set": {"flash_sale": enabled}})
+    
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    await bump_products_version()
+    if not enabled:
+        # Hand this worker's pooled units back; other workers flush theirs once the product goes idle
+        await flash_inventory.flush_product(product_id)
+    
+    return {"message": f"Product flash sale mode updated to {enabled}"}
+
+@api_router.get("/admin/flash-sale/status")
+async def get_flash_sale_status(current_user: dict = Depends(get_current_user)):
+    """Get flash-sale pools and reservation counters for this worker (Admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return flash_inventory.status()
+
 # ============= FREE DELIVERY SETTINGS API =============
 
 @api_router.post("/admin/settings/free-delivery")
@@ -1070,34 +1364,279 @@ async def upload_image_alias(file: UploadFile = File(...), current_user: dict =
     """Upload product image from desktop (alias endpoint)"""
     return await upload_image(file, current_user)
 
+# ============= CART APIS =============
+
+@api_router.post("/cart/quote")
+async def quote_cart_endpoint(data: CartQuoteRequest):
+    """
+    Price a cart for delivery to a city (public API)
+    Returns catalog unit prices (with active discounts), per-line availability, the city's
+    delivery charge and free-delivery threshold, and the total - the same numbers an order would get.
+    """
+    snapshot = await catalog_cache.snapshot()
+    city = data.city
+    if not data.is_custom_location:
+        city = resolve_delivery_city(data.city, data.state, snapshot) or data.city
+    quote = quote_cart(
+        [item.model_dump() for item in data.items],
+        city, data.state, data.is_custom_location, snapshot
+    )
+    return {**asdict(quote), "city": city}
+
+@api_router.get("/admin/catalog-cache/status")
+async def get_catalog_cache_status(current_user: dict = Depends(get_current_user)):
+    """Get catalog cache, search index and cached response size, age and hit counters for this worker (admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return {**catalog_cache.status(), "search": product_search.status(), "responses": catalog_responses.status()}
+
 # ============= ORDERS APIS =============
 
+async def send_email_off_loop(send_func, *args):
+    """Run a gmail_service sender on a worker thread - they do blocking SMTP I/O despite being async"""
+    return await run_in_threadpool(asyncio.run, send_func(*args))
+
+def _tracked_quantities(items, products_by_id, flash_sale: bool = False) -> dict:
+    """Total ordered quantity per product, for products whose inventory is tracked (in or out of flash-sale mode)"""
+    quantities = {}
+    for item in items:
+        product = products_by_id.get(item.product_id)
+        if product and product.get("inventory_count") is not None and bool(product.get("flash_sale")) == flash_sale:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+async def reserve_flash_sale_inventory(items, products_by_id) -> Optional[str]:
+    """Reserve flash-sale products from the in-memory pools; returns the reservation token"""
+    quantities = _tracked_quantities(items, products_by_id, flash_sale=True)
+    if not quantities:
+        return None
+    try:
+        return await flash_inventory.reserve(quantities)
+    except FlashSaleSoldOut as e:
+        names = ", ".join(products_by_id[product_id].get("name", product_id) for product_id in e.product_ids)
+        raise HTTPException(status_code=400, detail=f"Sold out: {names}")
+
+async def release_inventory(items, products_by_id):
+    """Give back stock taken by reserve_inventory"""
+    quantities = _tracked_quantities(items, products_by_id)
+    await asyncio.gather(*(
+        db.products.update_one({"id": product_id}, {"$inc": {"inventory_count": quantity}})
+        for product_id, quantity in quantities.items()
+    ))
+
+async def reserve_inventory(items, products_by_id):
+    """Atomically take stock for every tracked product, all or nothing"""
+    quantities = _tracked_quantities(items, products_by_id)
+    product_ids = list(quantities)
+    results = await asyncio.gather(*(
+        db.products.update_one(
+            {"id": product_id, "inventory_count": {"$gte": quantities[product_id]}},
+            {"$inc": {"inventory_count": -quantities[product_id]}}
+        )
+        for product_id in product_ids
+    ))
+    
+    short = [product_id for product_id, result in zip(product_ids, results) if result.modified_count == 0]
+    if short:
+        # Roll back what was taken so a rejected order leaves stock untouched
+        await asyncio.gather(*(
+            db.products.update_one({"id": product_id}, {"$inc": {"inventory_count": quantities[product_id]}})
+            for product_id, result in zip(product_ids, results) if result.modified_count
+        ))
+        names = ", ".join(products_by_id[product_id].get("name", product_id) for product_id in short)
+        raise HTTPException(status_code=400, detail=f"Insufficient inventory for {names}")
+
+def build_order_post_commit_steps(order_data: OrderCreate, order: dict, location_value: str) -> list:
+    """Side effects of a new order, run by order_pipeline once the order is stored"""
+    order_id = order["order_id"]
+    steps = []
+    
+    async def mark_sold_out():
+        product_ids = list({item.product_id for item in order_data.items})
+        # Flash-sale stock lives in worker pools, so a zero count there does not mean sold out
+        result = await db.products.update_many(
+            {"id": {"$in": product_ids}, "inventory_count": {"$lte": 0}, "flash_sale": {"$ne": True}, "out_of_stock": {"$ne": True}},
+            {"$set": {"out_of_stock": True}}
+        )
+        if result.modified_count:
+            await bump_products_version()
+    steps.append(("inventory_flags", mark_sold_out))
+    
+    async def save_profile():
+        profile_writer.enqueue(build_profile(
+            customer_name=order_data.customer_name,
+            email=order_data.email,
+            phone=order_data.phone,
+            whatsapp_number=order_data.whatsapp_number,
+            doorNo=order_data.doorNo,
+            building=order_data.building,
+            street=order_data.street,
+            city=order_data.city,
+            state=order_data.state,
+            pincode=order_data.pincode,
+            location=location_value
+        ))
+    steps.append(("customer_profile", save_profile))
+    
+    if order["custom_city_request"]:
+        async def create_city_suggestion():
+            # Counted once per order_id, so a retried step never counts the same order twice
+            suggestion = await city_suggestions.record(
+                order_data.city, order_data.state,
+                {"customer_name": order_data.customer_name, "phone": order_data.phone,
+                 "email": order_data.email, "order_id": order_id},
+                request_id=order_id
+            )
+            logger.info(f"📝 City suggestion {suggestion['id']} for {suggestion['city']}, {order_data.state} (order {order_id})")
+        steps.append(("city_suggestion", create_city_suggestion))
+    
+    if order["is_custom_location"] and order.get("custom_city"):
+        async def count_pending_city():
+            await record_custom_city_order(db, order)
+        steps.append(("pending_city", count_pending_city))
+    
+    if order_data.email:
+        email_data = {
+            "order_id": order_id,
+            "tracking_code": order["tracking_code"],
+            "customer_name": order_data.customer_name,
+            "order_date": datetime.now().strftime("%B %d, %Y"),
+            "total": order["total"],
+            "address": order_data.address,
+            "doorNo": order_data.doorNo,
+            "building": order_data.building,
+            "street": order_data.street,
+            "city": order_data.city,
+            "state": order_data.state,
+            "pincode": order_data.pincode,
+            "location": order_data.location,
+            "phone": order_data.phone,
+            "items": [
+                {"name": item["name"], "weight": item["weight"], "quantity": item["quantity"], "price": item["price"]}
+                for item in order["items"]
+            ],
+            "order_status": order["order_status"],
+            "payment_status": order["payment_status"]
+        }
+        
+        async def send_confirmation_email():
+            email_sent = await send_email_off_loop(send_order_confirmation_email_gmail, order_data.email, email_data)
+            if email_sent:
+                logger.info(f"✅ Order confirmation email sent successfully to {order_data.email} for order {order_id}")
+            return email_sent
+        steps.append(("confirmation_email", send_confirmation_email))
+    
+    return steps
+
+@api_router.get("/admin/orders/post-commit/stats")
+async def get_post_commit_stats(current_user: dict = Depends(get_current_user)):
+    """Get background order side-effect counters (admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return order_pipeline.stats()
+
 @api_router.post("/orders")
-async def create_order(order_data: OrderCreate, current_user: dict = Depends(get_current_user_optional)):
-    """Create new order - allows guest checkout"""
+async def create_order(
+    order_data: OrderCreate,
+    current_user: dict = Depends(get_current_user_optional),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """Create new order - allows guest checkout (send an Idempotency-Key header to make retries safe)"""
+    if not idempotency_key:
+        return await place_order(order_data, current_user)
+    
     try:
-        print(f"DEBUG: Received order data: {order_data.model_dump()}")
-        print(f"DEBUG: Current user: {current_user}")
+        replay = await idempotency_store.claim(
+            "orders", idempotency_key, request_fingerprint(order_data.model_dump_json())
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if replay:
+        # Retry of a completed request - same order, no new writes
+        status_code, body = replay
+        return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+    
+    # The order is stored with its key, so a claim taken over after a crash finds it here
+    stored = await db.orders.find_one({"idempotency_key": idempotency_key}, {"_id": 0})
+    if stored:
+        result = order_created_response(stored)
+    else:
+        try:
+            result = await place_order(order_data, current_user, idempotency_key)
+        except BaseException:
+            # Failed (or cancelled) after the insert: keep the key on that order so a retry gets it
+            stored = await db.orders.find_one({"idempotency_key": idempotency_key}, {"_id": 0})
+            if stored:
+                await idempotency_store.complete("orders", idempotency_key, 200, jsonable_encoder(order_created_response(stored)))
+            else:
+                await idempotency_store.release("orders", idempotency_key)
+            raise
+    
+    try:
+        await idempotency_store.complete("orders", idempotency_key, 200, jsonable_encoder(result))
+    except Exception as e:
+        # A retry after the lease finds the order by its key instead of placing another one
+        logger.error(f"❌ Failed to store response for idempotency key {idempotency_key}: {str(e)}")
+    return result
+
+def order_created_response(order: dict) -> dict:
+    """Response of POST /orders for a stored order"""
+    custom_city_request = order["custom_city_request"]
+    return {
+        "message": "Order created successfully" + (" - Awaiting city approval" if custom_city_request else ""),
+        "order_id": order["order_id"],
+        "tracking_code": order["tracking_code"],
+        "subtotal": order["subtotal"],
+        "delivery_charge": order["delivery_charge"],
+        "total": order["total"],
+        "custom_city_request": custom_city_request,
+        "payment_required": custom_city_request,
+        "order": order
+    }
+
+async def place_order(order_data: OrderCreate, current_user: dict, idempotency_key: Optional[str] = None):
+    """Validate, reserve stock and store an order; side effects are handed to order_pipeline"""
+    try:
+        # Summary only - never the payload, which holds names, phone numbers and addresses
+        log_sampled(
+            logger, "/api/orders", "order_received",
+            item_count=len(order_data.items),
+            city=order_data.city,
+            state=order_data.state,
+            payment_method=order_data.payment_method,
+            guest=current_user.get("id") == "guest"
+        )
+        
+        # Price and validate the cart with the same engine as POST /cart/quote (cached catalog, no per-order reads)
+        snapshot = await catalog_cache.snapshot()
+        products_by_id = snapshot.products_by_id
+        if not order_data.is_custom_location:
+            # A spelling variant of a town we deliver to is that town, not a custom city request
+            resolved_city = resolve_delivery_city(order_data.city, order_data.state, snapshot)
+            if resolved_city and resolved_city != order_data.city:
+                logger.info(f"City '{order_data.city}' resolved to delivery location '{resolved_city}'")
+                order_data.city = resolved_city
+        quote = quote_cart(
+            [{"product_id": item.product_id, "weight": item.weight, "quantity": item.quantity} for item in order_data.items],
+            order_data.city, order_data.state, order_data.is_custom_location or False, snapshot
+        )
         
         # Check city availability and inventory for all items
         unavailable_products = []
-        for item in order_data.items:
-            product = await db.products.find_one({"id": item.product_id})
-            if product:
-                # Check if product is available for delivery to the customer's city
-                available_cities = product.get("available_cities")
-                if available_cities and len(available_cities) > 0:
-                    # If available_cities is set and not empty, check if the city is in the list
-                    if order_data.city not in available_cities:
-                        unavailable_products.append(item.name)
-                        continue
-                
-                if product.get("out_of_stock", False):
-                    raise HTTPException(status_code=400, detail=f"Product {item.name} is out of stock")
-                
-                inventory_count = product.get("inventory_count")
-                if inventory_count is not None and inventory_count < item.quantity:
-                    raise HTTPException(status_code=400, detail=f"Insufficient inventory for {item.name}")
+        for item, line in zip(order_data.items, quote.lines):
+            if line.reason == NOT_IN_CITY:
+                unavailable_products.append(item.name)
+            elif line.reason == OUT_OF_STOCK:
+                raise HTTPException(status_code=400, detail=f"Product {item.name} is out of stock")
+            elif line.reason == INSUFFICIENT_INVENTORY:
+                raise HTTPException(status_code=400, detail=f"Insufficient inventory for {item.name}")
+            elif line.reason:
+                raise HTTPException(status_code=400, detail=f"Product {item.name} ({item.weight}) is no longer available")
         
         # If any products are not available for delivery to this city, return error
         if unavailable_products:
@@ -1107,6 +1646,14 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
                 detail=f"The following products are not available for delivery to {order_data.city}: {products_list}"
             )
         
+        # Catalog prices win over what the client sent
+        if abs(quote.subtotal - order_data.subtotal) > 0.01:
+            logger.warning(f"Client subtotal {order_data.subtotal} differs from catalog subtotal {quote.subtotal} - using catalog prices")
+        order_items = [
+            {**item.model_dump(), "price": line.unit_price}
+            for item, line in zip(order_data.items, quote.lines)
+        ]
+        
         # Generate order ID and tracking code
         order_id = generate_order_id()
         tracking_code = generate_tracking_code()
@@ -1119,60 +1666,21 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
         custom_city = order_data.custom_city
         custom_state = order_data.custom_state
         
-        # Detect if this is a custom city request (city not in our delivery locations)
-        custom_city_request = False
-        if not is_custom_location and order_data.city and order_data.state:
-            # Check if city exists by matching both city name AND state (CASE-INSENSITIVE)
-            city_exists = await db.locations.find_one({
-                "name": {"$regex": f"^{order_data.city}$", "$options": "i"},
-                "state": {"$regex": f"^{order_data.state}$", "$options": "i"}
-            })
-            if not city_exists:
-                custom_city_request = True
-                print(f"🆕 CUSTOM CITY REQUEST: {order_data.city}, {order_data.state} - Awaiting approval")
-            else:
-                print(f"✅ EXISTING CITY CONFIRMED: {order_data.city}, {order_data.state}")
-        
-        # SERVER-SIDE DELIVERY CHARGE CALCULATION
-        # For custom locations or custom city requests, delivery charge is 0 initially
-        calculated_delivery_charge = 0.0
-        
-        if is_custom_location or custom_city_request:
-            # Custom city - delivery charge will be calculated by admin
-            calculated_delivery_charge = 0.0
-            if custom_city_request:
-                print(f"📍 CUSTOM CITY REQUEST: {order_data.city}, {order_data.state} - Delivery charge to be determined after approval")
-            else:
-                print(f"📍 CUSTOM LOCATION: {custom_city}, {custom_state} - Delivery charge to be calculated by admin")
+        # SERVER-SIDE DELIVERY CHARGE CALCULATION (city matched by name AND state, case-insensitive)
+        # Custom locations and custom city requests are charged later by admin
+        custom_city_request = quote.custom_city_request
+        calculated_delivery_charge = quote.delivery_charge
+        if custom_city_request:
+            logger.info(f"🆕 CUSTOM CITY REQUEST: {order_data.city}, {order_data.state} - Awaiting approval")
+        elif is_custom_location:
+            log_sampled(logger, "/api/orders", "delivery_charge_deferred", reason="custom_location", city=custom_city)
+        elif quote.free_delivery_applied:
+            log_sampled(logger, "/api/orders", "free_delivery_applied", city=order_data.city, subtotal=quote.subtotal, threshold=quote.free_delivery_threshold)
         else:
-            # Find the city's delivery settings from database
-            # Match by both city name AND state for accuracy (CASE-INSENSITIVE)
-            city_location = await db.locations.find_one({
-                "name": {"$regex": f"^{order_data.city}$", "$options": "i"},
-                "state": {"$regex": f"^{order_data.state}$", "$options": "i"}
-            })
-            
-            if city_location:
-                base_charge = city_location.get("charge", 99.0)
-                free_delivery_threshold = city_location.get("free_delivery_threshold") or 0
-                
-                # Check if order qualifies for free delivery (threshold must be > 0)
-                if free_delivery_threshold and free_delivery_threshold > 0 and order_data.subtotal >= free_delivery_threshold:
-                    calculated_delivery_charge = 0.0
-                    print(f"🎁 FREE DELIVERY APPLIED: {order_data.city} - Subtotal Rs.{order_data.subtotal} >= Threshold Rs.{free_delivery_threshold}")
-                else:
-                    calculated_delivery_charge = base_charge
-                    print(f"💰 DELIVERY CHARGE APPLIED: {order_data.city} - Rs.{base_charge}")
-            else:
-                # City not found in database, treat as custom city request
-                # This should ONLY happen for truly non-existent cities
-                custom_city_request = True
-                calculated_delivery_charge = 0.0
-                print(f"⚠️ CITY NOT IN DATABASE: {order_data.city}, {order_data.state} - Treating as custom city request")
-                print(f"📝 Debug: Please verify city name and state spelling match the database")
+            log_sampled(logger, "/api/orders", "delivery_charge_applied", city=order_data.city, charge=calculated_delivery_charge)
         
         # Calculate correct total
-        calculated_total = order_data.subtotal + calculated_delivery_charge
+        calculated_total = quote.total
         
         # Determine payment status and order status
         # For custom city requests or online payments, status is pending until verified
@@ -1188,6 +1696,7 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
             "customer_name": order_data.customer_name,
             "email": order_data.email,
             "phone": order_data.phone,
+            "phone_e164": normalize_phone(order_data.phone),
             "whatsapp_number": order_data.whatsapp_number,
             "address": order_data.address,
             "doorNo": order_data.doorNo,
@@ -1197,8 +1706,8 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
             "state": order_data.state,
             "pincode": order_data.pincode,
             "location": location_value,
-            "items": [item.model_dump() for item in order_data.items],
-            "subtotal": order_data.subtotal,
+            "items": order_items,
+            "subtotal": quote.subtotal,
             "delivery_charge": calculated_delivery_charge,
             "total": calculated_total,
             "payment_method": order_data.payment_method,
@@ -1219,124 +1728,41 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
             "custom_state": custom_state,
             "distance_from_guntur": order_data.distance_from_guntur if hasattr(order_data, 'distance_from_guntur') else None
         }
+        if idempotency_key:
+            order["idempotency_key"] = idempotency_key
+        
+        # Side effects that don't decide whether the order exists run after it is stored
+        post_commit_steps = build_order_post_commit_steps(order_data, order, location_value)
+        order["post_commit"] = pending_status(post_commit_steps)
+        
+        # Critical path: reserve inventory (flash-sale products in memory), then store the order
+        flash_token = await reserve_flash_sale_inventory(order_data.items, products_by_id)
+        if flash_token:
+            order["flash_sale_reservation"] = flash_token
+            order["flash_sale_items"] = _tracked_quantities(order_data.items, products_by_id, flash_sale=True)
+        try:
+            await reserve_inventory(order_data.items, products_by_id)
+        except Exception:
+            await flash_inventory.release(flash_token)
+            raise
+        try:
+            await db.orders.insert_one(order)
+        except Exception as e:
+            await release_inventory(order_data.items, products_by_id)
+            await flash_inventory.release(flash_token)
+            if isinstance(e, DuplicateKeyError) and idempotency_key:
+                # A concurrent request with the same key stored its order first
+                stored = await db.orders.find_one({"idempotency_key": idempotency_key}, {"_id": 0})
+                if stored:
+                    return order_created_response(stored)
+            raise
         
-        # If custom city request, create a city suggestion entry
-        if custom_city_request:
-            suggestion_id = str(uuid.uuid4())
-            city_suggestion = {
-                "id": suggestion_id,
-                "city": order_data.city,
-                "state": order_data.state,
-                "customer_name": order_data.customer_name,
-                "phone": order_data.phone,
-                "email": order_data.email,
-                "status": "pending",
-                "order_id": order_id,
-                "created_at": datetime.now(timezone.utc)
-            }
-            await db.city_suggestions.insert_one(city_suggestion)
-            print(f"📝 City suggestion created: {suggestion_id} for {order_data.city}, {order_data.state}")
-        
-        await db.orders.insert_one(order)
-        
-        # Update inventory for each item
-        for item in order_data.items:
-            product = await db.products.find_one({"id": item.product_id})
-            if product and product.get("inventory_count") is not None:
-                new_count = product["inventory_count"] - item.quantity
-                update_data = {"inventory_count": max(0, new_count)}
-                
-                # Mark as out of stock if inventory reaches 0
-                if new_count <= 0:
-                    update_data["out_of_stock"] = True
-                
-                await db.products.update_one(
-                    {"id": item.product_id},
-                    {"$set": update_data}
-                )
-        
-        # Save user details for future orders
-        saved_details = {
-            "identifier": order_data.phone,  # Use phone as primary identifier
-            "customer_name": order_data.customer_name,
-            "email": order_data.email,
-            "phone": order_data.phone,
-            "doorNo": order_data.doorNo,
-            "building": order_data.building,
-            "street": order_data.street,
-            "city": order_data.city,
-            "state": order_data.state,
-            "pincode": order_data.pincode,
-            "location": location_value,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.saved_user_details.update_one(
-            {"identifier": order_data.phone},
-            {"$set": saved_details},
-            upsert=True
-        )
-        
-        # Also save with email as identifier
-        await db.saved_user_details.update_one(
-            {"identifier": order_data.email},
-            {"$set": {**saved_details, "identifier": order_data.email}},
-            upsert=True
-        )
-        
-        # Prepare email content
-        items_list = []
-        for item in order_data.items:
-            items_list.append({
-                "name": item.name,
-                "weight": item.weight,
-                "quantity": item.quantity,
-                "price": item.price
-            })
-        
-        email_data = {
-            "order_id": order_id,
-            "tracking_code": tracking_code,
-            "customer_name": order_data.customer_name,
-            "order_date": datetime.now().strftime("%B %d, %Y"),
-            "total": calculated_total,
-            "address": order_data.address,
-            "doorNo": order_data.doorNo,
-            "building": order_data.building,
-            "street": order_data.street,
-            "city": order_data.city,
-            "state": order_data.state,
-            "pincode": order_data.pincode,
-            "location": order_data.location,
-            "phone": order_data.phone,
-            "items": items_list
-        }
-        
-        # Send order confirmation email immediately when order is created
-        # Customer will receive confirmation that order has been placed
-        if order_data.email:
-            try:
-                email_sent = await send_order_confirmation_email_gmail(order_data.email, {**email_data, "order_status": order_status, "payment_status": payment_status})
-                if email_sent:
-                    logger.info(f"✅ Order confirmation email sent successfully to {order_data.email} for order {order_id}")
-                else:
-                    logger.warning(f"⚠️ Order confirmation email failed for {order_data.email}")
-            except Exception as email_error:
-                logger.error(f"❌ Failed to send order confirmation email: {str(email_error)}")
+        order_pipeline.submit(order_id, post_commit_steps)
         
         # Remove MongoDB _id field before returning
         order.pop("_id", None)
         
-        return {
-            "message": "Order created successfully" + (" - Awaiting city approval" if custom_city_request else ""),
-            "order_id": order_id,
-            "tracking_code": tracking_code,
-            "subtotal": order_data.subtotal,
-            "delivery_charge": calculated_delivery_charge,
-            "total": calculated_total,
-            "custom_city_request": custom_city_request,
-            "payment_required": custom_city_request,
-            "order": order
-        }
+        return order_created_response(order)
     
     except HTTPException:
         raise
@@ -1350,25 +1776,30 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
 async def track_order(identifier: str):
     """Track order by order_id, tracking_code, phone number, or email (public API)"""
     # Check if identifier is order_id or tracking_code (return single order)
-    order = await db.orders.find_one(
-        {"$or": [
-            {"order_id": identifier}, 
-            {"tracking_code": identifier}
-        ]},
-        {"_id": 0}
-    )
+    code_query = {"$or": [
+        {"order_id": identifier}, 
+        {"tracking_code": identifier}
+    ]}
+    order = await db.orders.find_one(code_query, {"_id": 0})
+    if not order:
+        archived = await find_archived_orders(db, code_query, limit=1)
+        order = archived[0] if archived else None
     
     if order:
         return {"orders": [order], "total": 1}
     
     # If not found by order_id/tracking_code, search by phone or email (return all orders)
+    contact_query = build_contact_query(identifier)
     orders = await db.orders.find(
-        {"$or": [
-            {"phone": identifier},
-            {"email": identifier}
-        ]},
+        contact_query,
         {"_id": 0}
-    ).sort("order_date", -1).to_list(length=100)  # Sort by newest first, limit 100
+    ).sort("created_at", -1).to_list(length=100)  # Sort by newest first, limit 100
+    
+    # Older delivered/cancelled orders live in the archive tier
+    hot_order_ids = {order["order_id"] for order in orders}
+    archived = [order for order in await find_archived_orders(db, contact_query) if order["order_id"] not in hot_order_ids]
+    if archived:
+        orders = sorted(orders + archived, key=lambda order: str(order.get("created_at", "")), reverse=True)[:100]
     
     if not orders:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -1379,25 +1810,48 @@ async def track_order(identifier: str):
 
 @api_router.post("/payment/create-razorpay-order")
 async def create_razorpay_order(data: dict):
-    """Create Razorpay order for payment"""
+    """
+    Create Razorpay order for payment.
+    For an existing order the amount is its stored total; checkout pays before its order exists,
+    so that amount is checked against the order total when the payment is verified.
+    """
     try:
-        amount = data.get("amount")  # Amount in rupees
+        order_id = data.get("order_id")
+        if order_id:
+            order = await db.orders.find_one(
+                {"order_id": order_id}, {"_id": 0, "total": 1, "payment_status": 1, "cancelled": 1}
+            )
+            if not order:
+                raise HTTPException(status_code=404, detail="Order not found")
+            if order.get("payment_status") != "pending" or order.get("cancelled"):
+                raise HTTPException(status_code=400, detail="Order is not awaiting payment")
+            amount = order.get("total")
+        else:
+            amount = data.get("amount")  # Amount in rupees
         currency = data.get("currency", "INR")
         receipt = data.get("receipt", f"order_{uuid.uuid4().hex[:12]}")
         
         if not amount:
             raise HTTPException(status_code=400, detail="Amount is required")
         
-        # Convert amount to paise (Razorpay requires amount in smallest currency unit)
-        amount_in_paise = int(float(amount) * 100)
+        # Create Razorpay order (auto capture) without blocking the event loop
+        # Our order_id (when already known) rides along in notes so webhooks can find the order
+        notes = {"order_id": order_id} if order_id else None
+        razorpay_order = await payment_gateway.create_order(amount_in_paise(amount), currency, receipt, notes=notes)
         
-        # Create Razorpay order
-        razorpay_order = razorpay_client.order.create({
-            "amount": amount_in_paise,
-            "currency": currency,
-            "receipt": receipt,
-            "payment_capture": 1  # Auto capture payment
+        # What this gateway order may pay for - checked before any payment on it is applied
+        await db.razorpay_orders.insert_one({
+            "_id": razorpay_order["id"],
+            "amount": razorpay_order["amount"],
+            "currency": razorpay_order["currency"],
+            "order_id": order_id,
+            "created_at": datetime.now(timezone.utc).isoformat()
         })
+        if order_id:
+            await db.orders.update_one(
+                {"order_id": order_id},
+                {"$set": {"razorpay_order_id": razorpay_order["id"], "payment_amount": razorpay_order["amount"]}}
+            )
         
         logger.info(f"Razorpay order created: {razorpay_order['id']}")
         
@@ -1408,13 +1862,174 @@ async def create_razorpay_order(data: dict):
             "key_id": os.environ.get('RAZORPAY_KEY_ID', '')
         }
     
+    except HTTPException:
+        raise
+    except GatewayUnavailable as e:
+        logger.error(f"Razorpay unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail="Payment service is temporarily unavailable, please try again")
+    except GatewayError as e:
+        logger.error(f"Razorpay rejected order: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to create payment order: {str(e)}")
     except Exception as e:
         logger.error(f"Error creating Razorpay order: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create payment order: {str(e)}")
 
+def amount_in_paise(amount) -> int:
+    """Rupees to paise (Razorpay amounts are in the smallest currency unit)"""
+    return int(round(float(amount) * 100))
+
+async def load_razorpay_order(razorpay_order_id: str) -> Optional[dict]:
+    """Our record of a gateway order; fetched from Razorpay (and stored) when we have none"""
+    record = await db.razorpay_orders.find_one({"_id": razorpay_order_id})
+    if record:
+        return record
+    try:
+        remote = await payment_gateway.fetch_order(razorpay_order_id)
+    except GatewayError as e:
+        logger.error(f"Could not fetch Razorpay order {razorpay_order_id}: {str(e)}")
+        return None
+    notes = remote.get("notes") if isinstance(remote.get("notes"), dict) else {}
+    record = {
+        "_id": razorpay_order_id,
+        "amount": remote.get("amount"),
+        "currency": remote.get("currency"),
+        "order_id": notes.get("order_id"),
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    try:
+        await db.razorpay_orders.insert_one(record)
+    except DuplicateKeyError:
+        record = await db.razorpay_orders.find_one({"_id": razorpay_order_id})
+    return record
+
+# A claim older than this was left by a request that died mid-way; another callback may take it over
+PAYMENT_CLAIM_STALE_SECONDS = 120
+# Final event states - a repeat callback for the payment reports them instead of "duplicate"
+SETTLED_PAYMENT_STATUSES = ("refund_required",)
+
+async def ingest_payment_event(razorpay_payment_id: str, razorpay_order_id: str, order_id: Optional[str], source: str):
+    """
+    Apply a captured payment to its order exactly once.
+    payment_events is keyed by razorpay_payment_id: a duplicate callback fails the claiming
+    upsert on _id (one indexed no-op). Events that could not be matched to an order, or were
+    rejected for the order a caller named, stay claimable so a later callback for the same
+    payment can still apply them, and so does a claim left in "processing" by a request that
+    failed or was cancelled.
+    The gateway order must be for this order (it is bound to the first order it pays) and for
+    its total, otherwise the payment is "rejected". Only a pending order is confirmed; a payment
+    captured for a cancelled, expired or already paid order is recorded as "refund_required".
+    order_id may be None (webhooks without notes): the order the gateway order was created for is used.
+    Returns (order, status) where status is "applied", "duplicate", "unmatched", "rejected" or "refund_required".
+    """
+    now = datetime.now(timezone.utc)
+    stale_claim = (now - timedelta(seconds=PAYMENT_CLAIM_STALE_SECONDS)).isoformat()
+    now = now.isoformat()
+    try:
+        await db.payment_events.find_one_and_update(
+            {"_id": razorpay_payment_id, "$or": [
+                {"status": {"$in": ["unmatched", "rejected"]}},
+                {"status": "processing", "updated_at": {"$lt": stale_claim}}
+            ]},
+            {
+                "$set": {"status": "processing", "source": source, "updated_at": now},
+                "$setOnInsert": {"razorpay_order_id": razorpay_order_id, "received_at": now}
+            },
+            upsert=True
+        )
+    except DuplicateKeyError:
+        event = await db.payment_events.find_one({"_id": razorpay_payment_id}, {"status": 1})
+        status = (event or {}).get("status")
+        return None, status if status in SETTLED_PAYMENT_STATUSES else "duplicate"
+    
+    async def settle(status: str, **fields):
+        nonlocal resolved
+        await db.payment_events.update_one(
+            {"_id": razorpay_payment_id}, {"$set": {"status": status, "updated_at": now, **fields}}
+        )
+        resolved = True
+    
+    resolved = False
+    try:
+        razorpay_order = await load_razorpay_order(razorpay_order_id)
+        order_id = order_id or (razorpay_order or {}).get("order_id")
+        if not razorpay_order or not order_id:
+            return None, "unmatched"
+        
+        order = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
+        if not order:
+            return None, "unmatched"
+        
+        if razorpay_order.get("amount") != amount_in_paise(order.get("total") or 0):
+            await settle("rejected", order_id=order_id, reason="amount_mismatch")
+            logger.warning(f"⚠️ Payment {razorpay_payment_id} of {razorpay_order.get('amount')} paise does not match order {order_id} total {order.get('total')} - rejected")
+            return None, "rejected"
+        
+        # One gateway order pays for one order
+        bound = await db.razorpay_orders.update_one(
+            {"_id": razorpay_order_id, "order_id": {"$in": [None, order_id]}}, {"$set": {"order_id": order_id}}
+        )
+        if not bound.matched_count:
+            await settle("rejected", order_id=order_id, reason="gateway_order_mismatch")
+            logger.warning(f"⚠️ Payment {razorpay_payment_id} belongs to another order than {order_id} - rejected")
+            return None, "rejected"
+        
+        order = await db.orders.find_one_and_update(
+            {"order_id": order_id, "payment_status": "pending", "cancelled": {"$ne": True}},
+            {"$set": {
+                "payment_status": "completed",
+                "order_status": "confirmed",
+                "razorpay_order_id": razorpay_order_id,
+                "razorpay_payment_id": razorpay_payment_id,
+                "payment_verified_at": now,
+                "payment_source": source
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if not order:
+            current = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
+            if current and current.get("razorpay_payment_id") == razorpay_payment_id:
+                # Applied by an earlier attempt that stopped before recording it
+                await settle("applied", order_id=order_id)
+                return current, "duplicate"
+            if current and (current.get("cancelled") or current.get("payment_status") == "completed"):
+                # Paid after the order was cancelled or expired, or paid twice: refund this payment
+                current = await db.orders.find_one_and_update(
+                    {"order_id": order_id},
+                    {
+                        "$set": {"refund_required": True},
+                        "$addToSet": {"late_payment_ids": razorpay_payment_id}
+                    },
+                    return_document=ReturnDocument.AFTER
+                )
+                current.pop("_id", None)
+                await settle("refund_required", order_id=order_id)
+                logger.warning(f"⚠️ Payment {razorpay_payment_id} captured for closed order {order_id} via {source} - refund required")
+                return current, "refund_required"
+            return None, "unmatched"
+        
+        order.pop("_id", None)
+        flash_inventory.commit(order.get("flash_sale_reservation"))
+        await settle("applied", order_id=order["order_id"])
+    finally:
+        if not resolved:
+            # Unmatched, failed or cancelled: give the claim back so a retry can apply the payment
+            await db.payment_events.update_one(
+                {"_id": razorpay_payment_id, "status": "processing"}, {"$set": {"status": "unmatched"}}
+            )
+    
+    # Only the call that applied the payment gets here, so the email is queued once
+    if order.get("email"):
+        async def send_payment_email():
+            return await send_email_off_loop(send_payment_completion_email, order["email"], order)
+        order_pipeline.submit(order["order_id"], [("payment_email", send_payment_email)])
+    
+    logger.info(f"Payment {razorpay_payment_id} applied to order {order['order_id']} via {source}")
+    return order, "applied"
+
 @api_router.post("/payment/verify-razorpay-payment")
 async def verify_razorpay_payment(data: dict):
-    """Verify Razorpay payment signature"""
+    """Verify Razorpay payment signature (safe to retry - each payment is applied once)"""
     try:
         razorpay_order_id = data.get("razorpay_order_id")
         razorpay_payment_id = data.get("razorpay_payment_id")
@@ -1425,47 +2040,25 @@ async def verify_razorpay_payment(data: dict):
             raise HTTPException(status_code=400, detail="Missing required payment verification fields")
         
         # Verify signature
-        generated_signature = hmac.new(
-            os.environ.get('RAZORPAY_KEY_SECRET', '').encode('utf-8'),
-            f"{razorpay_order_id}|{razorpay_payment_id}".encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        
-        if generated_signature != razorpay_signature:
+        if not payment_gateway.verify_payment_signature(razorpay_order_id, razorpay_payment_id, razorpay_signature):
             logger.error(f"Payment signature verification failed for order {order_id}")
             raise HTTPException(status_code=400, detail="Invalid payment signature")
         
-        # Update order payment status and order status
-        result = await db.orders.update_one(
-            {"order_id": order_id},
-            {"$set": {
-                "payment_status": "completed",
-                "order_status": "confirmed",
-                "razorpay_order_id": razorpay_order_id,
-                "razorpay_payment_id": razorpay_payment_id,
-                "payment_verified_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        order, status = await ingest_payment_event(razorpay_payment_id, razorpay_order_id, order_id, "checkout")
         
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Order not found")
-        
-        # Get updated order
-        order = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
-        
-        # Send confirmation email
-        if order and order.get("email"):
-            try:
-                send_order_confirmation_email_gmail(order)
-                logger.info(f"Order confirmation email sent to {order.get('email')} for order {order_id}")
-            except Exception as email_error:
-                logger.error(f"Failed to send confirmation email: {str(email_error)}")
-        
-        logger.info(f"Payment verified and order {order_id} updated successfully")
+        if status == "unmatched":
+            existing = await db.orders.find_one({"order_id": order_id}, {"_id": 0, "payment_status": 1})
+            if not existing:
+                raise HTTPException(status_code=404, detail="Order not found")
+            raise HTTPException(status_code=503, detail="Payment could not be confirmed yet, please try again")
+        elif status == "rejected":
+            raise HTTPException(status_code=400, detail="Payment does not match this order")
+        elif status == "refund_required":
+            raise HTTPException(status_code=409, detail="Order was cancelled or already paid before this payment arrived; the payment will be refunded")
         
         return {
             "success": True,
-            "message": "Payment verified successfully",
+            "message": "Payment verified successfully" if status == "applied" else "Payment already verified",
             "order_id": order_id
         }
     
@@ -1475,6 +2068,35 @@ async def verify_razorpay_payment(data: dict):
         logger.error(f"Error verifying payment: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to verify payment: {str(e)}")
 
+@api_router.post("/payment/razorpay-webhook")
+async def razorpay_webhook(request: Request):
+    """Razorpay webhook - payment.captured / order.paid events (signed with RAZORPAY_WEBHOOK_SECRET)"""
+    body = await request.body()
+    signature = request.headers.get("X-Razorpay-Signature", "")
+    if not payment_gateway.verify_webhook_signature(body, signature, os.environ.get('RAZORPAY_WEBHOOK_SECRET', '')):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+    
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    
+    if event.get("event") not in ("payment.captured", "order.paid"):
+        return {"status": "ignored"}
+    
+    payment = ((event.get("payload") or {}).get("payment") or {}).get("entity") or {}
+    razorpay_payment_id = payment.get("id")
+    razorpay_order_id = payment.get("order_id")
+    if not razorpay_payment_id or not razorpay_order_id:
+        return {"status": "ignored"}
+    
+    # Our order_id from the notes if present; otherwise the order the gateway order was created for
+    notes = payment.get("notes") if isinstance(payment.get("notes"), dict) else {}
+    _, status = await ingest_payment_event(razorpay_payment_id, razorpay_order_id, notes.get("order_id"), "webhook")
+    
+    # Always 2xx so Razorpay stops redelivering; unmatched events are applied by the checkout callback
+    return {"status": status}
+
 @api_router.get("/orders/user/{user_id}")
 async def get_user_orders(user_id: str, current_user: dict = Depends(get_current_user)):
     """Get all orders for a user"""
@@ -1488,7 +2110,106 @@ async def get_user_orders(user_id: str, current_user: dict = Depends(get_current
 async def get_all_orders(current_user: dict = Depends(get_current_user)):
     """Get all orders (Admin only)"""
     orders = await db.orders.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return orders
+    # Plain documents - rendered by orjson without a jsonable_encoder pass
+    return FastJSONResponse(orders)
+
+# Orders pulled from the cursor per exported chunk (CSV chunk / Parquet row group)
+ORDER_EXPORT_BATCH_SIZE = 500
+
+def parse_export_date(value: str, field_name: str) -> datetime:
+    """Parse a YYYY-MM-DD or ISO date query parameter as an aware UTC datetime"""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {field_name}, expected YYYY-MM-DD or ISO datetime")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def build_order_export_query(start_date: Optional[str], end_date: Optional[str], status: Optional[str]) -> dict:
+    """Mongo filter for an order export - end_date is inclusive when given as a plain date"""
+    query = {}
+    if status:
+        query["order_status"] = {"$in": [s.strip() for s in status.split(",") if s.strip()]}
+
+    date_range = {}
+    if start_date:
+        date_range["$gte"] = parse_export_date(start_date, "start_date")
+    if end_date:
+        end = parse_export_date(end_date, "end_date")
+        date_range["$lt"] = end + timedelta(days=1) if "T" not in end_date else end
+    if date_range:
+        # created_at is an ISO string on new orders but a datetime on some older ones;
+        # Mongo compares within a type, so match both representations
+        string_range = {op: value.isoformat() for op, value in date_range.items()}
+        query["$or"] = [{"created_at": string_range}, {"created_at": date_range}]
+
+    return query
+
+@api_router.get("/admin/orders/export")
+async def export_orders(
+    format: str = "csv",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream orders as CSV or Parquet with one row per line item (Admin only)
+    Filters: start_date/end_date (YYYY-MM-DD, inclusive) and comma-separated order status.
+    Orders are read from the cursor in batches, so memory use does not grow with the range.
+    Archived orders come first, then the orders still in the hot collection.
+    """
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    fmt = format.lower()
+    if fmt not in ORDER_EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Must be one of: {', '.join(ORDER_EXPORT_FORMATS)}")
+
+    query = build_order_export_query(start_date, end_date, status)
+
+    parquet_writer = None
+    if fmt == "parquet":
+        try:
+            parquet_writer = ParquetStreamWriter()
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow to be installed")
+
+    async def generate():
+        rows = []
+        order_count = 0
+        first_chunk = True
+
+        async def flush():
+            if parquet_writer:
+                return await run_in_threadpool(parquet_writer.write_rows, rows)
+            return encode_order_rows_csv(rows, include_header=first_chunk)
+
+        for collection in (db[ARCHIVE_COLLECTION], db.orders):
+            cursor = collection.find(query, ORDER_EXPORT_PROJECTION).sort("created_at", 1).batch_size(ORDER_EXPORT_BATCH_SIZE)
+            async for order in cursor:
+                rows.extend(flatten_order(order))
+                order_count += 1
+                if order_count % ORDER_EXPORT_BATCH_SIZE == 0:
+                    yield await flush()
+                    rows = []
+                    first_chunk = False
+
+        if rows or first_chunk:
+            yield await flush()
+        if parquet_writer:
+            yield parquet_writer.close()
+
+        logger.info(f"Order export ({fmt}) streamed {order_count} orders")
+
+    media_type = "text/csv; charset=utf-8" if fmt == "csv" else "application/vnd.apache.parquet"
+    filename = f"orders_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @api_router.put("/orders/{order_id}/status")
 async def update_order_status(order_id: str, data: dict, current_user: dict = Depends(get_current_user)):
@@ -1598,6 +2319,8 @@ async def cancel_order_customer(order_id: str, data: dict):
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Order not found")
         
+        await flash_inventory.release_order(order)
+        
         # Send cancellation email
         if order.get("email"):
             try:
@@ -1639,9 +2362,9 @@ async def complete_payment(order_id: str, data: dict):
         payment_method = data.get("payment_method", order.get("payment_method", "online"))
         payment_sub_method = data.get("payment_sub_method", order.get("payment_sub_method"))
         
-        # Update order with payment completion
+        # Update order with payment completion (unless it expired or was cancelled meanwhile)
         result = await db.orders.update_one(
-            {"order_id": order_id},
+            {"order_id": order_id, "cancelled": {"$ne": True}, "payment_status": {"$ne": "completed"}},
             {"$set": {
                 "payment_status": "completed",
                 "payment_method": payment_method,
@@ -1651,7 +2374,12 @@ async def complete_payment(order_id: str, data: dict):
         )
         
         if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Order not found")
+            current = await db.orders.find_one({"order_id": order_id}, {"_id": 0, "cancelled": 1})
+            if not current:
+                raise HTTPException(status_code=404, detail="Order not found")
+            if current.get("cancelled"):
+                raise HTTPException(status_code=400, detail="Cannot complete payment for cancelled order")
+            raise HTTPException(status_code=400, detail="Payment is already completed")
         
         # Send payment confirmation email
         if order.get("email"):
@@ -1688,9 +2416,9 @@ async def cancel_order_payment(order_id: str, data: dict = {}):
         
         cancel_reason = data.get("cancel_reason", "Payment cancelled by customer")
         
-        # Update order to cancelled status
+        # Update order to cancelled status (only while still pending, so stock is given back once)
         result = await db.orders.update_one(
-            {"order_id": order_id},
+            {"order_id": order_id, "payment_status": "pending"},
             {"$set": {
                 "cancelled": True,
                 "cancel_reason": cancel_reason,
@@ -1701,9 +2429,14 @@ async def cancel_order_payment(order_id: str, data: dict = {}):
         )
         
         if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Order not found")
+            # Paid, cancelled or archived since it was read
+            if not await db.orders.find_one({"order_id": order_id}, {"_id": 1}):
+                raise HTTPException(status_code=404, detail="Order not found")
+            raise HTTPException(status_code=400, detail="Cannot cancel order with non-pending payment")
         
         logger.info(f"🚫 ORDER CANCELLED: {order_id} - Reason: {cancel_reason}")
+        await restock_cancelled_orders([order])
+        await flash_inventory.release_order(order)
         
         # Send cancellation email
         if order.get("email"):
@@ -1724,6 +2457,91 @@ async def cancel_order_payment(order_id: str, data: dict = {}):
         logger.error(f"Error cancelling order: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to cancel order: {str(e)}")
 
+# Orders paid at checkout; WhatsApp bookings and custom city requests wait on people, not on the gateway
+EXPIRING_PAYMENT_METHODS = ["razorpay", "online"]
+ORDER_EXPIRY_BATCH_SIZE = 200
+
+async def restock_cancelled_orders(orders: list):
+    """Give back the regular stock taken by cancelled orders (flash-sale units go back via their reservation)"""
+    quantities = {}
+    for order in orders:
+        flash_items = order.get("flash_sale_items") or {}
+        for item in order.get("items", []):
+            product_id = item.get("product_id")
+            if product_id and product_id not in flash_items:
+                quantities[product_id] = quantities.get(product_id, 0) + item.get("quantity", 0)
+    if not quantities:
+        return
+    
+    # Unlimited products (inventory_count None) were never decremented
+    await db.products.bulk_write([
+        UpdateOne({"id": product_id, "inventory_count": {"$ne": None}}, {"$inc": {"inventory_count": quantity}})
+        for product_id, quantity in quantities.items()
+    ], ordered=False)
+    result = await db.products.update_many(
+        {"id": {"$in": list(quantities)}, "inventory_count": {"$gt": 0}, "out_of_stock": True, "flash_sale": {"$ne": True}},
+        {"$set": {"out_of_stock": False}}
+    )
+    if result.modified_count:
+        await bump_products_version()
+
+async def expire_stale_orders() -> dict:
+    """Cancel online orders still unpaid after PENDING_ORDER_EXPIRY_MINUTES and release their stock"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(minutes=PENDING_ORDER_EXPIRY_MINUTES)).isoformat()
+    stale_filter = {
+        "payment_status": "pending",
+        "created_at": {"$lt": cutoff},
+        "cancelled": {"$ne": True},
+        "custom_city_request": {"$ne": True},
+        "payment_method": {"$in": EXPIRING_PAYMENT_METHODS}
+    }
+    
+    expired = 0
+    while True:
+        batch = await db.orders.find(stale_filter, {"_id": 0, "order_id": 1}).sort("created_at", 1).limit(ORDER_EXPIRY_BATCH_SIZE).to_list(ORDER_EXPIRY_BATCH_SIZE)
+        if not batch:
+            break
+        order_ids = [order["order_id"] for order in batch]
+        
+        # Re-check the stale filter in the update so an order paid meanwhile is left alone,
+        # and tag the run to learn exactly which orders this batch cancelled
+        run_id = str(uuid.uuid4())
+        await db.orders.update_many(
+            {**stale_filter, "order_id": {"$in": order_ids}},
+            {"$set": {
+                "cancelled": True,
+                "cancel_reason": "Payment not completed in time",
+                "cancelled_at": datetime.now(timezone.utc).isoformat(),
+                "order_status": "cancelled",
+                "payment_status": "cancelled",
+                "expiry_run": run_id
+            }}
+        )
+        cancelled = await db.orders.find(
+            {"order_id": {"$in": order_ids}, "expiry_run": run_id},
+            {"_id": 0, "order_id": 1, "items": 1, "flash_sale_items": 1, "flash_sale_reservation": 1}
+        ).to_list(ORDER_EXPIRY_BATCH_SIZE)
+        
+        await restock_cancelled_orders(cancelled)
+        for order in cancelled:
+            await flash_inventory.release_order(order)
+        expired += len(cancelled)
+        
+        if len(batch) < ORDER_EXPIRY_BATCH_SIZE:
+            break
+    
+    if expired:
+        logger.info(f"🚫 Expired {expired} unpaid orders older than {PENDING_ORDER_EXPIRY_MINUTES:g} minutes")
+    return {"expired": expired}
+
+background_jobs.add("expire_stale_orders", expire_stale_orders, "* * * * *")
+
+async def archive_old_orders() -> dict:
+    """Move delivered/cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS to the archive tier"""
+    return {"archived": await archive_orders(db, ORDER_ARCHIVE_AFTER_DAYS)}
+
+background_jobs.add("archive_orders", archive_old_orders, "30 3 * * *")
+
 @api_router.put("/orders/{order_id}/admin-update")
 async def update_order_admin_fields(order_id: str, data: dict, current_user: dict = Depends(get_current_user)):
     """Update admin fields like notes and delivery days"""
@@ -1805,24 +2623,30 @@ async def update_order_admin_fields(order_id: str, data: dict, current_user: dic
 async def get_orders_analytics(current_user: dict = Depends(get_current_user)):
     """Get order analytics and statistics"""
     try:
-        # Get all orders
-        all_orders = await db.orders.find({}, {"_id": 0}).to_list(10000)
+        # Get all hot orders; archived ones are already summed up by MongoDB
+        all_orders, archived = await asyncio.gather(
+            db.orders.find({}, {"_id": 0}).to_list(10000),
+            archived_order_totals(db)
+        )
         
         # Filter out cancelled orders for sales calculations
         non_cancelled_orders = [o for o in all_orders if not o.get("cancelled", False) and o.get("order_status") != "cancelled"]
         
         # Calculate statistics
-        total_orders = len(all_orders)
+        total_orders = len(all_orders) + archived["orders"]
         # Only sum sales from non-cancelled orders
-        total_sales = sum(order.get("total", 0) for order in non_cancelled_orders)
-        active_orders = len([o for o in non_cancelled_orders if o.get("order_status") != "delivered"])
-        cancelled_orders = len([o for o in all_orders if o.get("cancelled", False) or o.get("order_status") == "cancelled"])
-        completed_orders = len([o for o in non_cancelled_orders if o.get("order_status") == "delivered"])
+        total_sales = sum(order.get("total", 0) for order in non_cancelled_orders) + archived["sales"]
+        active_orders = len([o for o in non_cancelled_orders if o.get("order_status") != "delivered"]) + archived["not_cancelled"] - archived["delivered"]
+        cancelled_orders = len([o for o in all_orders if o.get("cancelled", False) or o.get("order_status") == "cancelled"]) + archived["cancelled"]
+        completed_orders = len([o for o in non_cancelled_orders if o.get("order_status") == "delivered"]) + archived["delivered"]
         
         # Monthly sales - only include non-cancelled orders
         from collections import defaultdict
         monthly_sales = defaultdict(float)
         monthly_orders = defaultdict(int)
+        for month_key, (sales, count) in archived["monthly"].items():
+            monthly_sales[month_key] += sales
+            monthly_orders[month_key] += count
         
         for order in non_cancelled_orders:
             created_at = order.get("created_at", "")
@@ -1836,7 +2660,7 @@ async def get_orders_analytics(current_user: dict = Depends(get_current_user)):
                     pass
         
         # Top products - only include non-cancelled orders
-        product_counts = defaultdict(int)
+        product_counts = defaultdict(int, archived["products"])
         for order in non_cancelled_orders:
             for item in order.get("items", []):
                 product_counts[item.get("name", "Unknown")] += item.get("quantity", 0)
@@ -1857,64 +2681,46 @@ async def get_orders_analytics(current_user: dict = Depends(get_current_user)):
         logger.error(f"Error getting analytics: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get analytics: {str(e)}")
 
-# ============= USER DETAILS API =============
+# ============= LOCATIONS API =============
 
-@api_router.get("/user-details/{identifier}")
-async def get_user_details(identifier: str):
-    """Get user details by phone or email from most recent order"""
-    # Search for the most recent order with this phone or email
-    order = await db.orders.find_one(
-        {"$or": [
-            {"phone": identifier},
-            {"email": identifier}
-        ]},
-        {"_id": 0},
-        sort=[("created_at", -1)]  # Get most recent order
-    )
+def default_locations() -> list:
+    """Built-in cities with default charges, served while no locations are stored"""
+    locations = []
     
-    if not order:
-        raise HTTPException(status_code=404, detail="No details found")
+    # Add default cities with charges
+    for city, charge in DEFAULT_DELIVERY_CHARGES.items():
+        state = "Andhra Pradesh" if city in ANDHRA_PRADESH_CITIES else "Telangana"
+        locations.append({"name": city, "charge": charge, "state": state})
     
-    # Return relevant customer details
-    return {
-        "customer_name": order.get("customer_name"),
-        "email": order.get("email"),
-        "phone": order.get("phone"),
-        "doorNo": order.get("doorNo"),
-        "building": order.get("building"),
-        "street": order.get("street"),
-        "city": order.get("city"),
-        "state": order.get("state"),
-        "pincode": order.get("pincode"),
-        "location": order.get("location")
-    }
-
-# ============= LOCATIONS API =============
+    # Add remaining AP cities with default charge
+    for city in ANDHRA_PRADESH_CITIES:
+        if city not in DEFAULT_DELIVERY_CHARGES:
+            locations.append({"name": city, "charge": DEFAULT_OTHER_CITY_CHARGE, "state": "Andhra Pradesh"})
+    
+    # Add remaining Telangana cities with default charge
+    for city in TELANGANA_CITIES:
+        if city not in DEFAULT_DELIVERY_CHARGES:
+            locations.append({"name": city, "charge": DEFAULT_OTHER_CITY_CHARGE, "state": "Telangana"})
+    return locations
 
 @api_router.get("/locations")
-async def get_locations():
-    """Get delivery locations with state information"""
+async def get_locations(request: Request):
+    """Get delivery locations with state information (rendered once per locations version)"""
+    snapshot = await catalog_cache.snapshot()
+    
+    async def render():
+        return json_dumps(await load_locations())
+    
+    return await catalog_responses.respond(request, ("locations",), snapshot.versions, render)
+
+async def load_locations() -> list:
+    """Stored delivery locations (state filled in), or the built-in cities while none are stored"""
     # Check if custom locations exist in database
     locations = await db.locations.find({}, {"_id": 0}).to_list(1000)
     
     if not locations:
         # Return default cities with charges and state information
-        locations = []
-        
-        # Add default cities with charges
-        for city, charge in DEFAULT_DELIVERY_CHARGES.items():
-            state = "Andhra Pradesh" if city in ANDHRA_PRADESH_CITIES else "Telangana"
-            locations.append({"name": city, "charge": charge, "state": state})
-        
-        # Add remaining AP cities with default charge
-        for city in ANDHRA_PRADESH_CITIES:
-            if city not in DEFAULT_DELIVERY_CHARGES:
-                locations.append({"name": city, "charge": DEFAULT_OTHER_CITY_CHARGE, "state": "Andhra Pradesh"})
-        
-        # Add remaining Telangana cities with default charge
-        for city in TELANGANA_CITIES:
-            if city not in DEFAULT_DELIVERY_CHARGES:
-                locations.append({"name": city, "charge": DEFAULT_OTHER_CITY_CHARGE, "state": "Telangana"})
+        locations = default_locations()
     else:
         # For database locations, add state information if not present
         for loc in locations:
@@ -1930,18 +2736,77 @@ async def get_locations():
     
     return locations
 
+# Fields a typeahead suggestion needs - not the whole location document
+CITY_SEARCH_FIELDS = ("name", "state", "charge", "free_delivery_threshold")
+CITY_SEARCH_MAX_LIMIT = 25
+
+def sync_city_index(snapshot):
+    """Point the city index at the snapshot's locations (or the built-in cities while none are stored)"""
+    def current_locations():
+        stored = list(snapshot.locations_by_key.values())
+        return [
+            {field: location.get(field) for field in CITY_SEARCH_FIELDS}
+            for location in (stored or default_locations())
+        ]
+    
+    city_index.sync(snapshot.locations_by_key, current_locations, ALL_CITIES)
+
+def resolve_delivery_city(city: Optional[str], state: Optional[str], snapshot) -> Optional[str]:
+    """Name of the stored delivery location a submitted city almost certainly means, or None"""
+    if not city or not state:
+        return None
+    if location_key(city, state) in snapshot.locations_by_key:
+        return city
+    sync_city_index(snapshot)
+    match = city_index.resolve(city, state)
+    if match and location_key(match["name"], state) in snapshot.locations_by_key:
+        return match["name"]
+    return None
+
+@api_router.get("/locations/search")
+async def search_locations(q: str, limit: int = 8, state: Optional[str] = None):
+    """City typeahead - top delivery locations for a partly typed (or misspelled) name, with charges"""
+    snapshot = await catalog_cache.snapshot()
+    sync_city_index(snapshot)
+    return city_index.search(q, limit=min(max(limit, 1), CITY_SEARCH_MAX_LIMIT), state=state)
+
+@api_router.get("/locations/version")
+async def get_locations_version():
+    """Current location-table version - changes whenever any delivery location is written"""
+    return {"version": await get_settings_version(db, LOCATIONS_VERSION_KEY)}
+
 @api_router.post("/admin/locations")
 async def update_locations(locations: List[Location], current_user: dict = Depends(get_current_user)):
-    """Update delivery locations (Admin only)"""
-    # Clear existing locations
-    await db.locations.delete_many({})
-    
-    # Insert new locations
-    if locations:
-        location_dicts = [loc.model_dump() for loc in locations]
-        await db.locations.insert_many(location_dicts)
+    """
+    Sync delivery locations to the submitted list (Admin only)
+    Only the differences are written, as one ordered bulk_write (inserts, then updates,
+    then deletes), so checkout lookups never see an empty or half-rebuilt table.
+    """
+    desired = []
+    for loc in locations:
+        location_dict = loc.model_dump()
+        if not location_dict.get("state"):
+            location_dict["state"] = detect_city_state(location_dict["name"])
+        desired.append(location_dict)
+    
+    existing = await db.locations.find({}, {"_id": 0}).to_list(None)
+    plan = plan_seed(existing, desired, LOCATION_KEY_FIELDS, prune=True)
+    operations = build_mongodb_operations(plan, LOCATION_KEY_FIELDS)
+    
+    if operations:
+        await db.locations.bulk_write(operations, ordered=True)
+        version = await bump_locations_version()
+    else:
+        version = await get_settings_version(db, LOCATIONS_VERSION_KEY)
     
-    return {"message": "Locations updated successfully"}
+    return {
+        "message": "Locations updated successfully",
+        "inserted": len(plan["inserts"]),
+        "updated": len(plan["updates"]),
+        "deleted": len(plan["deletes"]),
+        "unchanged": plan["unchanged"],
+        "version": version
+    }
 
 @api_router.put("/admin/locations/{city_name}")
 async def update_city_settings(
@@ -1968,6 +2833,7 @@ async def update_city_settings(
         
         if update_data:
             await db.locations.update_one({"name": city_name}, {"$set": update_data})
+            await bump_locations_version()
     else:
         # Create new city entry
         city_data = {"name": city_name}
@@ -1987,6 +2853,7 @@ async def update_city_settings(
             city_data["state"] = "Andhra Pradesh"
         
         await db.locations.insert_one(city_data)
+        await bump_locations_version()
     
     return {"message": f"Settings updated for {city_name}"}
 
@@ -1998,6 +2865,8 @@ async def delete_location(city_name: str, current_user: dict = Depends(get_curre
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Location not found")
     
+    await bump_locations_version()
+    
     return {"message": f"Location '{city_name}' deleted successfully"}
 
 # ============= CUSTOM CITY API =============
@@ -2028,40 +2897,28 @@ async def calculate_custom_city_delivery(data: dict):
 @api_router.get("/admin/pending-cities")
 async def get_pending_cities(current_user: dict = Depends(get_current_user)):
     """Get all custom cities from orders that need admin approval"""
-    # Find all orders with custom locations
-    orders = await db.orders.find(
-        {"is_custom_location": True},
-        {"_id": 0, "custom_city": 1, "custom_state": 1, "distance_from_guntur": 1, "delivery_charge": 1, "created_at": 1}
-    ).to_list(1000)
+    # Kept up to date by order placement and city approval (see utils/pending_cities.py)
+    cities, snapshot = await asyncio.gather(list_pending_cities(db), catalog_cache.snapshot())
     
-    # Get all existing locations to filter out already-approved cities
-    existing_locations = await db.locations.find({}, {"_id": 0, "name": 1, "state": 1}).to_list(10000)
-    existing_set = {f"{loc['name']}_{loc['state']}" for loc in existing_locations}
-    
-    # Group by city and state to remove duplicates
-    cities_dict = {}
-    for order in orders:
-        city_name = order.get('custom_city', '')
-        state_name = order.get('custom_state', '')
-        city_key = f"{city_name}_{state_name}"
-        
-        # Skip if this city has already been approved (exists in locations)
-        if city_key in existing_set:
-            continue
-            
-        if city_key not in cities_dict:
-            cities_dict[city_key] = {
-                "city_name": city_name,
-                "state_name": state_name,
-                "distance_km": order.get("distance_from_guntur"),
-                "suggested_charge": order.get("delivery_charge"),
-                "first_order_date": order.get("created_at"),
-                "order_count": 1
-            }
-        else:
-            cities_dict[city_key]["order_count"] += 1
+    # Skip cities added to locations some other way since their orders came in
+    return [
+        city for city in cities
+        if location_key(city.get("city_name"), city.get("state_name")) not in snapshot.locations_by_key
+    ]
+
+async def served_city_keys() -> set:
+    """Match keys of the stored delivery locations - their orders are no longer pending"""
+    snapshot = await catalog_cache.snapshot()
+    return {city_match_key(location.get("name"), location.get("state")) for location in snapshot.locations_by_key.values()}
+
+@api_router.post("/admin/pending-cities/rebuild")
+async def rebuild_pending_cities_endpoint(current_user: dict = Depends(get_current_user)):
+    """Recompute the pending cities from all custom-location orders (admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    return list(cities_dict.values())
+    towns = await rebuild_pending_cities(db, await served_city_keys())
+    return {"message": f"Pending cities rebuilt: {towns} cities", "cities": towns}
 
 @api_router.post("/admin/approve-city")
 async def approve_custom_city(data: dict, current_user: dict = Depends(get_current_user)):
@@ -2093,29 +2950,33 @@ async def approve_custom_city(data: dict, current_user: dict = Depends(get_curre
         city_data["free_delivery_threshold"] = free_delivery_threshold
     
     await db.locations.insert_one(city_data)
+    await bump_locations_version()
+    await remove_pending_city(db, city_name, state_name)
     
-    # Check if there's a matching city suggestion and update its status + send email
+    # Mark the matching city suggestion(s) approved + email everyone who asked for the city
     try:
-        suggestion = await db.city_suggestions.find_one({
-            "city": city_name,
-            "state": state_name,
-            "status": "pending"
-        }, {"_id": 0})
+        suggestion_query = {
+            "status": "pending",
+            "$or": [{"match_key": city_match_key(city_name, state_name)}, {"city": city_name, "state": state_name}]
+        }
+        suggestions = await db.city_suggestions.find(suggestion_query, {"_id": 0}).to_list(None)
         
-        if suggestion:
+        if suggestions:
             # Update suggestion status to approved
-            await db.city_suggestions.update_one(
-                {"id": suggestion["id"]},
+            await db.city_suggestions.update_many(
+                {"id": {"$in": [suggestion["id"] for suggestion in suggestions]}},
                 {"$set": {"status": "approved", "updated_at": datetime.now(timezone.utc)}}
             )
+            city_suggestions.invalidate()
             
-            # Send approval email if customer provided email
-            if suggestion.get("email"):
-                try:
-                    await send_city_approval_email(suggestion["email"], suggestion)
-                    logger.info(f"City approval email sent to {suggestion['email']} for {city_name}, {state_name}")
-                except Exception as e:
-                    logger.error(f"Failed to send city approval email: {str(e)}")
+            # Send approval email to customers who provided an email
+            for suggestion in suggestions:
+                for email in requester_emails(suggestion):
+                    try:
+                        await send_city_approval_email(email, suggestion)
+                        logger.info(f"City approval email sent to {email} for {city_name}, {state_name}")
+                    except Exception as e:
+                        logger.error(f"Failed to send city approval email: {str(e)}")
     except Exception as e:
         logger.error(f"Error updating city suggestion: {str(e)}")
         # Don't fail the approval if email/suggestion update fails
@@ -2197,6 +3058,54 @@ async def delete_state(state_name: str, current_user: dict = Depends(get_current
     return {"message": f"State '{state_name}' deleted successfully"}
 
 
+# Compress large text responses for clients that accept gzip/brotli (innermost, so admission
+# control and CORS see the final response); cached catalog responses arrive precompressed
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.environ.get('COMPRESSION_MIN_BYTES', '1024')))
+
+# Admission control - per-route concurrency limits, 503 + Retry-After when saturated
+# (added before CORS so shed responses still carry CORS headers)
+admission_controller = AdmissionController(global_limit=int(os.environ.get('ADMISSION_GLOBAL_LIMIT', '256')))
+app.add_middleware(AdmissionControlMiddleware, controller=admission_controller)
+
+@api_router.get("/admin/admission/metrics")
+async def get_admission_metrics(current_user: dict = Depends(get_current_user)):
+    """Get per-route-class concurrency, queue depth and rejection counters (admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return admission_controller.metrics()
+
+@api_router.get("/admin/jobs")
+async def get_background_jobs(current_user: dict = Depends(get_current_user)):
+    """Get job schedules, leader status and run counters for this worker (admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return background_jobs.stats()
+
+@api_router.get("/admin/jobs/{job_name}/runs")
+async def get_background_job_runs(job_name: str, limit: int = 20, current_user: dict = Depends(get_current_user)):
+    """Get the recorded run history of a job across all workers (admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if job_name not in background_jobs.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {"job": job_name, "runs": await background_jobs.history(job_name, min(max(limit, 1), 200))}
+
+@api_router.post("/admin/jobs/{job_name}/run")
+async def run_background_job(job_name: str, current_user: dict = Depends(get_current_user)):
+    """Run a background job immediately (admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if job_name not in background_jobs.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    try:
+        return {"job": job_name, "result": await background_jobs.run_now(job_name)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Job {job_name} failed: {str(e)}")
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -2204,27 +3113,49 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER],
 )
 
+# Tag every request (and its log lines) with a request ID
+app.add_middleware(RequestIdMiddleware)
+
+async def submit_city_suggestion(city: Optional[str], state: Optional[str], requester: dict) -> dict:
+    """
+    Record a customer's city request. A spelling of a town we already deliver to is answered with
+    that location; repeat requests for a town are merged into its one pending suggestion.
+    """
+    snapshot = await catalog_cache.snapshot()
+    resolved_city = resolve_delivery_city(city, state, snapshot)
+    if resolved_city:
+        return {"matched_location": {field: snapshot.locations_by_key[location_key(resolved_city, state)].get(field) for field in CITY_SEARCH_FIELDS}}
+    suggestion = await city_suggestions.record(city, state, requester)
+    return {"suggestion": suggestion}
+
+# Admin listings that may be streamed one document per line instead of as one array
+LISTING_STREAM_FORMATS = ("json", "ndjson")
+
+def page_headers(total: int, next_cursor: Optional[str]) -> dict:
+    """Paging metadata of an admin listing page"""
+    headers = {"X-Total-Count": str(total)}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return headers
+
 # City Suggestion endpoint
 @api_router.post("/suggest-city")
 async def suggest_city(data: dict):
     """Handle city suggestion from customers"""
     try:
-        suggestion = {
-            "id": str(uuid.uuid4()),
-            "state": data.get("state"),
-            "city": data.get("city"),
+        result = await submit_city_suggestion(data.get("city"), data.get("state"), {
             "customer_name": data.get("customer_name"),
             "phone": data.get("phone"),
-            "email": data.get("email"),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "status": "pending"
-        }
-        
-        await db.city_suggestions.insert_one(suggestion)
+            "email": data.get("email")
+        })
         
-        return {"message": "City suggestion received successfully", "suggestion_id": suggestion["id"]}
+        if "matched_location" in result:
+            location = result["matched_location"]
+            return {"message": f"We already deliver to {location['name']}", "suggestion_id": None, "matched_location": location}
+        return {"message": "City suggestion received successfully", "suggestion_id": result["suggestion"]["id"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to submit city suggestion: {str(e)}")
 
@@ -2233,20 +3164,20 @@ async def suggest_city(data: dict):
 async def create_city_suggestion(data: dict):
     """Save city suggestion with contact info when customer searches for unlisted city"""
     try:
-        suggestion = {
-            "id": str(uuid.uuid4()),
-            "state": data.get("state"),
-            "city": data.get("city_name", data.get("city")),
+        city = data.get("city_name", data.get("city"))
+        result = await submit_city_suggestion(city, data.get("state"), {
             "customer_name": data.get("customer_name", ""),
             "phone": data.get("phone"),
-            "email": data.get("email"),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "status": "pending"
-        }
+            "email": data.get("email")
+        })
         
-        await db.city_suggestions.insert_one(suggestion)
+        if "matched_location" in result:
+            location = result["matched_location"]
+            logger.info(f"City suggestion '{city}' ({data.get('state')}) matched delivery location {location['name']}")
+            return {"message": f"We already deliver to {location['name']}", "suggestion_id": None, "matched_location": location}
         
-        logger.info(f"City suggestion saved: {suggestion['city']} ({suggestion['state']}) - Contact: {suggestion['phone']}, {suggestion['email']}")
+        suggestion = result["suggestion"]
+        logger.info(f"City suggestion saved: {suggestion['city']} ({suggestion['state']}) - {suggestion.get('request_count', 1)} requests")
         
         return {"message": "City suggestion saved successfully", "suggestion_id": suggestion["id"]}
     except Exception as e:
@@ -2298,22 +3229,45 @@ async def create_bug_report(
         raise HTTPException(status_code=500, detail=f"Failed to submit bug report: {str(e)}")
 
 @api_router.get("/admin/reports")
-async def get_all_reports(current_user: dict = Depends(get_current_user)):
-    """Get all bug reports (admin only)"""
+async def get_all_reports(
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: str = "json",
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get bug reports with optional status/date filters (admin only), newest first.
+    With limit or cursor one page is returned (next page cursor in X-Next-Cursor, match count in
+    X-Total-Count); without them the whole list is streamed as a JSON array or NDJSON.
+    """
     try:
         if not current_user.get("is_admin"):
             raise HTTPException(status_code=403, detail="Admin access required")
+        fmt = format.lower()
+        if fmt not in LISTING_STREAM_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format. Must be one of: {', '.join(LISTING_STREAM_FORMATS)}")
         
-        reports = await db.bug_reports.find({}, {"_id": 0}).sort("created_at", -1).to_list(length=None)
+        query = date_range_filter("created_at", date_from, date_to)
+        if status and status in ["New", "In Progress", "Resolved"]:
+            query["status"] = status
         
-        # Convert datetime to ISO string for JSON serialization
-        for report in reports:
-            if isinstance(report.get("created_at"), datetime):
-                report["created_at"] = report["created_at"].isoformat()
+        # orjson writes created_at datetimes as ISO strings itself
+        if limit or cursor:
+            (reports, next_cursor), total = await asyncio.gather(
+                fetch_page(db.bug_reports, query, "created_at", cursor, limit),
+                db.bug_reports.count_documents(query)
+            )
+            return FastJSONResponse(reports, headers=page_headers(total, next_cursor))
         
-        return reports
+        cursor = db.bug_reports.find(query, {"_id": 0}).sort("created_at", -1)
+        return stream_json(cursor, ndjson=fmt == "ndjson")
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching bug reports: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch bug reports: {str(e)}")
@@ -2391,33 +3345,46 @@ async def delete_report(
 @api_router.get("/admin/city-suggestions")
 async def get_city_suggestions(
     status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: str = "json",
     current_user: dict = Depends(get_current_user)
 ):
-    """Get city suggestions with optional status filter (admin only)"""
+    """
+    Get city suggestions with optional status/date filters (admin only), newest first.
+    With limit or cursor one page is returned (next page cursor in X-Next-Cursor, match count in
+    X-Total-Count); without them the whole list is streamed as a JSON array or NDJSON.
+    """
     try:
         if not current_user.get("is_admin"):
             raise HTTPException(status_code=403, detail="Admin access required")
+        fmt = format.lower()
+        if fmt not in LISTING_STREAM_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format. Must be one of: {', '.join(LISTING_STREAM_FORMATS)}")
         
         # Build query filter
-        query = {}
+        query = date_range_filter("created_at", date_from, date_to)
         if status and status in ["pending", "approved", "rejected"]:
             query["status"] = status
         
-        suggestions = await db.city_suggestions.find(
+        if limit or cursor:
+            (suggestions, next_cursor), total = await asyncio.gather(
+                fetch_page(db.city_suggestions, query, "created_at", cursor, limit),
+                db.city_suggestions.count_documents(query)
+            )
+            return FastJSONResponse(suggestions, headers=page_headers(total, next_cursor))
+        
+        cursor = db.city_suggestions.find(
             query, 
             {"_id": 0}
-        ).sort("created_at", -1).to_list(length=None)
-        
-        # Convert datetime to ISO string for JSON serialization
-        for suggestion in suggestions:
-            if isinstance(suggestion.get("created_at"), datetime):
-                suggestion["created_at"] = suggestion["created_at"].isoformat()
-            if isinstance(suggestion.get("updated_at"), datetime):
-                suggestion["updated_at"] = suggestion["updated_at"].isoformat()
-        
-        return suggestions
+        ).sort("created_at", -1)
+        return stream_json(cursor, ndjson=fmt == "ndjson")
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching city suggestions: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch city suggestions: {str(e)}")
@@ -2465,26 +3432,36 @@ async def update_city_suggestion_status(
                     city_data["free_delivery_threshold"] = free_delivery_threshold
                 
                 await db.locations.insert_one(city_data)
+                await bump_locations_version()
                 logger.info(f"City {suggestion.get('city')}, {suggestion.get('state')} added to locations with charge Rs.{delivery_charge}")
+            
+            if existing or delivery_charge is not None:
+                await remove_pending_city(db, suggestion.get("city"), suggestion.get("state"))
         
         # Update suggestion status
-        result = await db.city_suggestions.update_one(
-            {"id": suggestion_id},
-            {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}}
-        )
+        try:
+            result = await db.city_suggestions.update_one(
+                {"id": suggestion_id},
+                {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}}
+            )
+        except DuplicateKeyError:
+            # Only one pending suggestion per town (see utils/city_suggestions.py)
+            raise HTTPException(status_code=409, detail="Another pending suggestion exists for this city")
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="City suggestion not found")
+        city_suggestions.invalidate()
+        await mark_suggestion_status(db, suggestion.get("city"), suggestion.get("state"), status)
         
-        # Send email notifications based on status
-        if suggestion.get("email"):
+        # Send email notifications based on status - to everyone who asked for the city
+        for email in requester_emails(suggestion):
             try:
                 if status == "approved":
-                    await send_city_approval_email(suggestion["email"], suggestion)
-                    logger.info(f"City approval email sent to {suggestion['email']} for {suggestion.get('city')}, {suggestion.get('state')}")
+                    await send_city_approval_email(email, suggestion)
+                    logger.info(f"City approval email sent to {email} for {suggestion.get('city')}, {suggestion.get('state')}")
                 elif status == "rejected":
-                    await send_city_rejection_email(suggestion["email"], suggestion)
-                    logger.info(f"City rejection email sent to {suggestion['email']} for {suggestion.get('city')}, {suggestion.get('state')}")
+                    await send_city_rejection_email(email, suggestion)
+                    logger.info(f"City rejection email sent to {email} for {suggestion.get('city')}, {suggestion.get('state')}")
             except Exception as e:
                 logger.error(f"Failed to send city status email: {str(e)}")
                 # Don't fail the request if email fails
@@ -3122,23 +4099,17 @@ async def update_payment_settings(
 async def get_customer_data_by_phone(phone: str):
     """Get customer data by phone number (no auth required for convenience)"""
     try:
-        # Clean phone number
-        cleaned_phone = phone.replace("+91", "").replace(" ", "").replace("-", "")
+        # Exact match on the normalized number (indexed) instead of a regex scan
+        phone_e164 = normalize_phone(phone)
+        if not phone_e164:
+            return None
         
-        # Try to find customer data by phone
-        customer = await db.customer_data.find_one(
-            {"phone": {"$regex": f".*{cleaned_phone}.*"}}, 
-            {"_id": 0}
-        )
+        profile = await find_profile(db.customer_profiles, profile_writer, phone_e164)
         
-        if not customer:
+        if not profile:
             return None
         
-        # Convert datetime to ISO string
-        if isinstance(customer.get("last_updated"), datetime):
-            customer["last_updated"] = customer["last_updated"].isoformat()
-        
-        return customer
+        return profile_to_customer_data(profile)
     except Exception as e:
         logger.error(f"Error fetching customer data: {str(e)}")
         return None
@@ -3147,16 +4118,28 @@ async def get_customer_data_by_phone(phone: str):
 async def save_customer_data(customer_data: CustomerData):
     """Save or update customer data by phone number"""
     try:
-        # Update or create customer data
-        await db.customer_data.update_one(
-            {"phone": customer_data.phone},
-            {"$set": customer_data.model_dump()},
-            upsert=True
-        )
+        # Update or create the customer profile
+        if not normalize_phone(customer_data.phone):
+            raise HTTPException(status_code=400, detail="Invalid phone number")
+        
+        profile_writer.enqueue(build_profile(
+            customer_name=customer_data.name,
+            email=customer_data.email,
+            phone=customer_data.phone,
+            whatsapp_number=customer_data.whatsapp,
+            doorNo=customer_data.door_no,
+            building=customer_data.building,
+            street=customer_data.street,
+            city=customer_data.city,
+            state=customer_data.state,
+            pincode=customer_data.pincode
+        ))
         
         logger.info(f"Customer data saved for phone: {customer_data.phone}")
         
         return {"message": "Customer data saved successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving customer data: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to save customer data: {str(e)}")
@@ -3512,60 +4495,100 @@ async def unsubscribe_from_newsletter(unsubscribe_data: NewsletterUnsubscribe):
         raise HTTPException(status_code=500, detail="Failed to unsubscribe from newsletter")
 
 @api_router.get("/admin/newsletter/subscribers")
-async def get_newsletter_subscribers(current_user: dict = Depends(get_current_user)):
-    """Get all newsletter subscribers (Admin only)"""
+async def get_newsletter_subscribers(
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: str = "json",
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get newsletter subscribers (Admin only), newest first; status is active or inactive, dates
+    filter subscribed_at. With limit or cursor one page is returned with next_cursor; without them
+    the whole list is streamed (with format=ndjson the counts are in X-Total-Count/X-Active-Count).
+    """
     try:
         if not current_user.get("is_admin"):
             raise HTTPException(status_code=403, detail="Admin access required")
+        fmt = format.lower()
+        if fmt not in LISTING_STREAM_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format. Must be one of: {', '.join(LISTING_STREAM_FORMATS)}")
+        if status and status not in ("active", "inactive"):
+            raise HTTPException(status_code=400, detail="Invalid status. Must be active or inactive")
+        
+        date_query = date_range_filter("subscribed_at", date_from, date_to)
+        query = {**date_query, "is_active": status == "active"} if status else date_query
+        
+        # Counts cover the date range; the listing is also narrowed by status
+        total_count, active_count = await asyncio.gather(
+            db.newsletter_subscribers.count_documents(date_query),
+            db.newsletter_subscribers.count_documents({**date_query, "is_active": True})
+        )
+        counts = {"total": total_count, "active": active_count, "inactive": total_count - active_count}
         
-        subscribers = await db.newsletter_subscribers.find(
-            {},
-            {"_id": 0}
-        ).sort("subscribed_at", -1).to_list(None)
-        
-        # Convert datetime to ISO string
-        for sub in subscribers:
-            if isinstance(sub.get("subscribed_at"), datetime):
-                sub["subscribed_at"] = sub["subscribed_at"].isoformat()
-            if isinstance(sub.get("unsubscribed_at"), datetime):
-                sub["unsubscribed_at"] = sub["unsubscribed_at"].isoformat()
-        
-        active_count = sum(1 for sub in subscribers if sub.get("is_active"))
+        if limit or cursor:
+            subscribers, next_cursor = await fetch_page(db.newsletter_subscribers, query, "subscribed_at", cursor, limit)
+            return FastJSONResponse({"subscribers": subscribers, **counts, "next_cursor": next_cursor})
         
-        return {
-            "subscribers": subscribers,
-            "total": len(subscribers),
-            "active": active_count,
-            "inactive": len(subscribers) - active_count
-        }
+        cursor = db.newsletter_subscribers.find(
+            query,
+            {"_id": 0}
+        ).sort("subscribed_at", -1)
+        return stream_json(
+            cursor, ndjson=fmt == "ndjson", envelope=counts, array_key="subscribers",
+            headers={"X-Total-Count": str(total_count), "X-Active-Count": str(active_count)}
+        )
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching newsletter subscribers: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch newsletter subscribers")
 
 @api_router.get("/admin/newsletter/campaigns")
-async def get_newsletter_campaigns(current_user: dict = Depends(get_current_user)):
-    """Get all newsletter campaigns (Admin only)"""
+async def get_newsletter_campaigns(
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get newsletter campaigns (Admin only), newest first, optionally by status and sent_at range.
+    With limit or cursor one page is returned with next_cursor; without them every campaign.
+    """
     try:
         if not current_user.get("is_admin"):
             raise HTTPException(status_code=403, detail="Admin access required")
         
+        query = date_range_filter("sent_at", date_from, date_to)
+        if status:
+            query["status"] = status
+        
+        if limit or cursor:
+            (campaigns, next_cursor), total = await asyncio.gather(
+                fetch_page(db.newsletter_campaigns, query, "sent_at", cursor, limit),
+                db.newsletter_campaigns.count_documents(query)
+            )
+            return FastJSONResponse({"campaigns": campaigns, "total": total, "next_cursor": next_cursor})
+        
         campaigns = await db.newsletter_campaigns.find(
-            {},
+            query,
             {"_id": 0}
         ).sort("sent_at", -1).to_list(None)
         
-        # Convert datetime to ISO string
-        for campaign in campaigns:
-            if isinstance(campaign.get("sent_at"), datetime):
-                campaign["sent_at"] = campaign["sent_at"].isoformat()
-        
-        return {"campaigns": campaigns, "total": len(campaigns)}
+        # orjson writes datetimes as ISO strings itself
+        return FastJSONResponse({"campaigns": campaigns, "total": len(campaigns)})
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching newsletter campaigns: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch newsletter campaigns")
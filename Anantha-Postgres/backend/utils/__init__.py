@@ -1,9 +1,21 @@
 """Utility functions package"""
 
-from .helpers import generate_order_id, generate_tracking_code, calculate_haversine_distance
+from .helpers import (
+    generate_order_id,
+    generate_tracking_code,
+    calculate_haversine_distance,
+    normalize_phone,
+    normalize_identifier,
+    bump_settings_version,
+    get_settings_version
+)
 
 __all__ = [
     "generate_order_id",
     "generate_tracking_code",
-    "calculate_haversine_distance"
+    "calculate_haversine_distance",
+    "normalize_phone",
+    "normalize_identifier",
+    "bump_settings_version",
+    "get_settings_version"
 ]
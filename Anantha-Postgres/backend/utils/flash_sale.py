@@ -0,0 +1,241 @@
+"""Flash-sale inventory - in-memory stock reservations for products with flash_sale enabled
+
+Instead of a conditional $inc on the product document for every unit sold, each worker
+claims stock from MongoDB in blocks (one write per block) into a local pool and hands out
+reservations from that pool under an asyncio lock. inventory_count in MongoDB therefore
+holds the stock not yet claimed by any worker, which keeps multiple workers safe.
+
+A reservation lives as long as its order: it is committed when the order is paid and its
+units go back into the pool when the order is cancelled or expires unpaid. Orders can be
+paid or cancelled on another worker, so reservations are also checked against their orders
+in the background; orders that wait on people (WhatsApp, custom cities) simply keep theirs
+until they are settled. Each order also stores its reserved quantities (flash_sale_items),
+so a cancelled order whose reservation is not held here - reserved on another worker or
+before a restart - gives its units straight back to MongoDB; the flash_sale_released flag
+on the order makes sure that happens only once. Pools of products that stop selling (or leave flash-sale mode)
+are flushed back to MongoDB in the background, and on shutdown.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FlashSaleSoldOut(Exception):
+    """Not enough flash-sale stock left for a reservation"""
+
+    def __init__(self, product_ids):
+        super().__init__(f"Sold out: {', '.join(product_ids)}")
+        self.product_ids = list(product_ids)
+
+
+@dataclass
+class Reservation:
+    token: str
+    quantities: Dict[str, int]
+    check_at: float
+
+
+class FlashSaleInventory:
+    """Per-worker flash-sale stock pools with reservation tokens tied to their orders"""
+
+    def __init__(self, block_size: int = 10, check_interval: float = 60.0,
+                 flush_interval: float = 5.0, idle_seconds: float = 60.0):
+        self.block_size = block_size
+        self.check_interval = check_interval
+        self.flush_interval = flush_interval
+        self.idle_seconds = idle_seconds
+        self._products = None
+        self._orders = None
+        self._pools: Dict[str, int] = {}
+        self._last_sale: Dict[str, float] = {}
+        self._reservations: Dict[str, Reservation] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"reserved": 0, "committed": 0, "released": 0, "orphaned": 0, "restored": 0,
+                      "block_claims": 0}
+
+    def start(self, products_collection, orders_collection):
+        self._products = products_collection
+        self._orders = orders_collection
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background loop and give every pooled unit back to MongoDB"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        async with self._lock:
+            await self._flush_pools(list(self._pools))
+
+    async def _claim(self, product_id: str, needed: int) -> int:
+        """Move stock from MongoDB into the local pool: a full block if possible, else what is left"""
+        for amount in (max(needed, self.block_size), needed):
+            result = await self._products.update_one(
+                {"id": product_id, "inventory_count": {"$gte": amount}},
+                {"$inc": {"inventory_count": -amount}}
+            )
+            if result.modified_count:
+                self.stats["block_claims"] += 1
+                self._pools[product_id] = self._pools.get(product_id, 0) + amount
+                self._last_sale.setdefault(product_id, time.monotonic())
+                return amount
+        return 0
+
+    async def reserve(self, quantities: Dict[str, int]) -> str:
+        """Reserve stock for every product in quantities (all or nothing) and return a token"""
+        async with self._lock:
+            short = []
+            for product_id, quantity in quantities.items():
+                if self._pools.get(product_id, 0) < quantity:
+                    await self._claim(product_id, quantity - self._pools.get(product_id, 0))
+                if self._pools.get(product_id, 0) < quantity:
+                    short.append(product_id)
+            if short:
+                raise FlashSaleSoldOut(short)
+
+            now = time.monotonic()
+            for product_id, quantity in quantities.items():
+                self._pools[product_id] -= quantity
+                self._last_sale[product_id] = now
+
+            token = uuid.uuid4().hex
+            self._reservations[token] = Reservation(token, dict(quantities), now + self.check_interval)
+            self.stats["reserved"] += 1
+            return token
+
+    def commit(self, token: Optional[str]):
+        """The order was paid - its units are sold for good"""
+        if token and self._reservations.pop(token, None):
+            self.stats["committed"] += 1
+
+    async def release(self, token: Optional[str]):
+        """The order failed or was cancelled - return its units to the pool"""
+        if not token:
+            return
+        async with self._lock:
+            reservation = self._reservations.pop(token, None)
+            if reservation:
+                self._return_to_pool(reservation)
+                self.stats["released"] += 1
+
+    async def release_order(self, order: dict):
+        """
+        The order was cancelled or expired - give its flash-sale units back exactly once.
+        Orders carry their reserved quantities (flash_sale_items), so units reserved by
+        another worker, or before a restart, go straight back to MongoDB.
+        """
+        token = order.get("flash_sale_reservation")
+        if not token:
+            return
+        result = await self._orders.update_one(
+            {"order_id": order["order_id"], "flash_sale_released": {"$ne": True}},
+            {"$set": {"flash_sale_released": True}}
+        )
+        if not result.modified_count:
+            # Already given back elsewhere; a token still held here is dropped by the settle loop
+            return
+        async with self._lock:
+            reservation = self._reservations.pop(token, None)
+            if reservation:
+                self._return_to_pool(reservation)
+                self.stats["released"] += 1
+                return
+        for product_id, quantity in (order.get("flash_sale_items") or {}).items():
+            await self._products.update_one({"id": product_id}, {"$inc": {"inventory_count": quantity}})
+        self.stats["restored"] += 1
+
+    def _return_to_pool(self, reservation: Reservation):
+        for product_id, quantity in reservation.quantities.items():
+            self._pools[product_id] = self._pools.get(product_id, 0) + quantity
+
+    async def _settle_reservations(self):
+        """Commit or release reservations whose order was paid or cancelled (possibly on another worker)"""
+        now = time.monotonic()
+        due = [token for token, reservation in self._reservations.items() if reservation.check_at <= now]
+        if not due:
+            return
+
+        orders = {
+            order["flash_sale_reservation"]: order
+            async for order in self._orders.find(
+                {"flash_sale_reservation": {"$in": due}},
+                {"_id": 0, "order_id": 1, "flash_sale_reservation": 1, "payment_status": 1,
+                 "order_status": 1, "cancelled": 1, "flash_sale_released": 1}
+            )
+        }
+        # Claim the release of cancelled orders first, so units are never given back twice
+        claimed = set()
+        for order in orders.values():
+            if order.get("cancelled") and not order.get("flash_sale_released"):
+                result = await self._orders.update_one(
+                    {"order_id": order["order_id"], "flash_sale_released": {"$ne": True}},
+                    {"$set": {"flash_sale_released": True}}
+                )
+                if result.modified_count:
+                    claimed.add(order["order_id"])
+
+        released = 0
+        async with self._lock:
+            for token in due:
+                reservation = self._reservations.get(token)
+                if not reservation:
+                    continue
+                order = orders.get(token)
+                if order and not order.get("cancelled") and (
+                        order.get("payment_status") == "completed" or order.get("order_status") == "delivered"):
+                    self._reservations.pop(token)
+                    self.stats["committed"] += 1
+                elif order is None or order.get("cancelled"):
+                    # Cancelled or expired - or the order was never stored (archived orders are long settled)
+                    self._reservations.pop(token)
+                    if order is None or order["order_id"] in claimed:
+                        self._return_to_pool(reservation)
+                        self.stats["released" if order else "orphaned"] += 1
+                        released += 1
+                else:
+                    # Still waiting for its payment (or, off the gateway, for delivery)
+                    reservation.check_at = now + self.check_interval
+
+        if released:
+            logger.info(f"Released {released} flash-sale reservations of cancelled orders")
+
+    async def _flush_pools(self, product_ids):
+        """Return pooled (unreserved) units to MongoDB - caller holds the lock"""
+        for product_id in product_ids:
+            quantity = self._pools.pop(product_id, 0)
+            self._last_sale.pop(product_id, None)
+            if quantity:
+                await self._products.update_one({"id": product_id}, {"$inc": {"inventory_count": quantity}})
+
+    async def flush_product(self, product_id: str):
+        """Give a product's pooled units back (e.g. when flash-sale mode is switched off)"""
+        async with self._lock:
+            await self._flush_pools([product_id])
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self._settle_reservations()
+                cutoff = time.monotonic() - self.idle_seconds
+                async with self._lock:
+                    idle = [product_id for product_id, last in self._last_sale.items() if last < cutoff]
+                    await self._flush_pools(idle)
+            except Exception as e:
+                logger.error(f"❌ Flash-sale maintenance failed: {e}")
+
+    def status(self) -> dict:
+        return {
+            "pools": dict(self._pools),
+            "active_reservations": len(self._reservations),
+            **self.stats,
+        }
@@ -0,0 +1,97 @@
+"""Index management - create the MongoDB indexes hot queries depend on"""
+import logging
+
+from .idempotency import IDEMPOTENCY_KEY_TTL_SECONDS
+from .jobs import JOB_RUN_HISTORY_TTL_SECONDS
+from .order_archive import ARCHIVE_COLLECTION, ARCHIVE_INDEX_COLLECTION
+from .pending_cities import PENDING_CITIES_COLLECTION, PENDING_CITY_INDEXES
+
+logger = logging.getLogger(__name__)
+
+# collection -> list of (keys, options). create_index is idempotent, so this runs on every startup.
+MONGODB_INDEXES = {
+    "orders": [
+        ([("phone_e164", 1), ("created_at", -1)], {"name": "phone_e164_created_at"}),
+        # Order lookups by email (build_contact_query), newest first
+        ([("email", 1), ("created_at", -1)], {"name": "email_created_at"}),
+        ([("order_id", 1)], {"name": "order_id"}),
+        # One order per Idempotency-Key (see create_order)
+        ([("idempotency_key", 1)], {"name": "idempotency_key", "unique": True,
+                                    "partialFilterExpression": {"idempotency_key": {"$type": "string"}}}),
+        # Webhooks find the order by gateway order id when notes carry no order_id
+        ([("razorpay_order_id", 1)], {"name": "razorpay_order_id", "sparse": True}),
+        ([("flash_sale_reservation", 1)], {"name": "flash_sale_reservation", "sparse": True}),
+        # Stale pending-payment scan of the order expiry job
+        ([("payment_status", 1), ("created_at", 1)], {"name": "payment_status_created_at"}),
+        # Oldest-first scan of the archive job
+        ([("created_at", 1)], {"name": "created_at"}),
+    ],
+    ARCHIVE_COLLECTION: [
+        ([("order_id", 1)], {"name": "order_id", "unique": True}),
+    ],
+    # Slim documents of archived orders - what order tracking looks up by
+    ARCHIVE_INDEX_COLLECTION: [
+        ([("order_id", 1)], {"name": "order_id", "unique": True}),
+        ([("tracking_code", 1)], {"name": "tracking_code"}),
+        ([("phone_e164", 1), ("created_at", -1)], {"name": "phone_e164_created_at"}),
+        ([("email", 1), ("created_at", -1)], {"name": "email_created_at"}),
+    ],
+    "city_suggestions": [
+        # One pending suggestion per town - repeat requests are merged into it (see utils/city_suggestions.py)
+        ([("match_key", 1)], {"name": "pending_match_key", "unique": True,
+                              "partialFilterExpression": {"status": "pending", "match_key": {"$exists": True}}}),
+        # Admin listing pages: newest first, optionally by status (see utils/pagination.py)
+        ([("status", 1), ("created_at", -1), ("id", -1)], {"name": "status_created_at_id"}),
+        ([("created_at", -1), ("id", -1)], {"name": "created_at_id"}),
+    ],
+    # Admin bug report listing pages, newest first, optionally by status
+    "bug_reports": [
+        ([("status", 1), ("created_at", -1), ("id", -1)], {"name": "status_created_at_id"}),
+        ([("created_at", -1), ("id", -1)], {"name": "created_at_id"}),
+    ],
+    "newsletter_subscribers": [
+        ([("email", 1)], {"name": "email"}),
+        ([("subscribed_at", -1), ("id", -1)], {"name": "subscribed_at_id"}),
+        ([("is_active", 1), ("subscribed_at", -1), ("id", -1)], {"name": "is_active_subscribed_at_id"}),
+    ],
+    "newsletter_campaigns": [
+        ([("sent_at", -1), ("id", -1)], {"name": "sent_at_id"}),
+        ([("status", 1), ("sent_at", -1), ("id", -1)], {"name": "status_sent_at_id"}),
+    ],
+    # One document per town with custom-location orders (see utils/pending_cities.py)
+    PENDING_CITIES_COLLECTION: PENDING_CITY_INDEXES,
+    "customer_profiles": [
+        # One profile per phone number; email-only profiles carry no phone_e164
+        ([("phone_e164", 1)], {"name": "phone_e164", "unique": True,
+                               "partialFilterExpression": {"phone_e164": {"$type": "string"}}}),
+        ([("email_lower", 1), ("updated_at", -1)], {"name": "email_lower_updated_at"}),
+    ],
+    "idempotency_keys": [
+        # Stored responses are removed by the TTL monitor
+        ([("created_at", 1)], {"name": "created_at_ttl", "expireAfterSeconds": IDEMPOTENCY_KEY_TTL_SECONDS}),
+    ],
+    "job_runs": [
+        ([("job", 1), ("started_at", -1)], {"name": "job_started_at"}),
+        ([("finished_at", 1)], {"name": "finished_at_ttl", "expireAfterSeconds": JOB_RUN_HISTORY_TTL_SECONDS}),
+    ],
+    "users": [
+        ([("phone_e164", 1)], {"name": "phone_e164", "sparse": True}),
+    ],
+}
+
+
+async def ensure_indexes_mongodb(db):
+    """
+    Ensure all application indexes exist in MongoDB
+    Failures are logged per index so one bad index never blocks startup
+    """
+    created = 0
+    for collection_name, indexes in MONGODB_INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await db[collection_name].create_index(keys, **options)
+                created += 1
+            except Exception as e:
+                logger.error(f"❌ Failed to create index {options.get('name')} on {collection_name}: {e}")
+
+    logger.info(f"✅ Ensured {created} MongoDB indexes")
@@ -0,0 +1,141 @@
+"""Order archive - move old delivered/cancelled orders out of the hot orders collection
+
+Full documents go to orders_archive (read only by order_id); a slim document per archived order
+goes to orders_archive_index, carrying the fields that order tracking looks up by and that the
+analytics summary aggregates over. db.orders then only holds recent and still-active orders.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "orders_archive"
+ARCHIVE_INDEX_COLLECTION = "orders_archive_index"
+TERMINAL_ORDER_STATUSES = ["delivered", "cancelled"]
+SLIM_ORDER_FIELDS = (
+    "order_id", "tracking_code", "user_id", "phone_e164", "email",
+    "created_at", "order_status", "payment_status", "cancelled", "total",
+)
+
+
+def archivable_filter(older_than_days: float) -> dict:
+    """Orders in a terminal state created before the cutoff"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    return {
+        "$and": [
+            {"$or": [{"order_status": {"$in": TERMINAL_ORDER_STATUSES}}, {"cancelled": True}]},
+            # created_at is an ISO string on new orders but a datetime on some older ones
+            {"$or": [{"created_at": {"$lt": cutoff.isoformat()}}, {"created_at": {"$lt": cutoff}}]},
+        ]
+    }
+
+
+def slim_order(order: dict) -> dict:
+    slim = {field: order.get(field) for field in SLIM_ORDER_FIELDS}
+    slim["items"] = [
+        {"name": item.get("name"), "quantity": item.get("quantity", 0)}
+        for item in order.get("items", [])
+    ]
+    return slim
+
+
+async def archive_orders(db, older_than_days: float, batch_size: int = 500) -> int:
+    """
+    Move archivable orders to the archive tier in batches; returns how many were moved.
+    Each batch is copied before it is deleted, and copies are keyed by the original _id,
+    so a run interrupted half way simply finishes the batch next time.
+    """
+    query = archivable_filter(older_than_days)
+    moved = 0
+    while True:
+        batch = await db.orders.find(query).sort("created_at", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        try:
+            await db[ARCHIVE_COLLECTION].insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Duplicates are copies left by an interrupted run; anything else must stop the move
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+        await db[ARCHIVE_INDEX_COLLECTION].bulk_write([
+            UpdateOne({"order_id": order["order_id"]}, {"$set": slim_order(order)}, upsert=True)
+            for order in batch
+        ], ordered=False)
+        # Re-apply the filter so an order reopened since it was read stays hot
+        result = await db.orders.delete_many({**query, "_id": {"$in": [order["_id"] for order in batch]}})
+        moved += result.deleted_count
+
+        if len(batch) < batch_size:
+            break
+
+    if moved:
+        logger.info(f"📦 Archived {moved} orders older than {older_than_days:g} days")
+    return moved
+
+
+async def find_archived_orders(db, index_query: dict, limit: int = 100) -> List[dict]:
+    """Full archived orders whose slim index document matches index_query, newest first"""
+    order_ids = [
+        slim["order_id"]
+        async for slim in db[ARCHIVE_INDEX_COLLECTION].find(
+            index_query, {"_id": 0, "order_id": 1}
+        ).sort("created_at", -1).limit(limit)
+    ]
+    if not order_ids:
+        return []
+    return await db[ARCHIVE_COLLECTION].find(
+        {"order_id": {"$in": order_ids}}, {"_id": 0}
+    ).sort("created_at", -1).to_list(limit)
+
+
+# Same rule as the analytics summary: cancelled orders count as orders, not as sales
+_NOT_CANCELLED = {"cancelled": {"$ne": True}, "order_status": {"$ne": "cancelled"}}
+# Month of an ISO created_at string; dates stored as datetimes have no month in the summary either
+_CREATED_MONTH = {"$cond": [{"$eq": [{"$type": "$created_at"}, "string"]}, {"$substrCP": ["$created_at", 0, 7]}, None]}
+
+
+async def archived_order_totals(db) -> dict:
+    """
+    Analytics summary figures of the archived orders, aggregated in MongoDB: order and cancelled
+    counts, and for the other orders sales, delivered count, per-month sales/orders and item quantities.
+    """
+    index = db[ARCHIVE_INDEX_COLLECTION]
+    counts, months, products = await asyncio.gather(
+        index.aggregate([{"$group": {
+            "_id": None,
+            "orders": {"$sum": 1},
+            "cancelled": {"$sum": {"$cond": [{"$or": [
+                {"$eq": ["$cancelled", True]}, {"$eq": ["$order_status", "cancelled"]}
+            ]}, 1, 0]}}
+        }}]).to_list(1),
+        index.aggregate([
+            {"$match": _NOT_CANCELLED},
+            {"$group": {
+                "_id": _CREATED_MONTH,
+                "sales": {"$sum": "$total"},
+                "orders": {"$sum": 1},
+                "delivered": {"$sum": {"$cond": [{"$eq": ["$order_status", "delivered"]}, 1, 0]}}
+            }}
+        ]).to_list(None),
+        index.aggregate([
+            {"$match": _NOT_CANCELLED},
+            {"$unwind": "$items"},
+            {"$group": {"_id": "$items.name", "count": {"$sum": "$items.quantity"}}}
+        ]).to_list(None),
+    )
+    totals = counts[0] if counts else {"orders": 0, "cancelled": 0}
+    return {
+        "orders": totals["orders"],
+        "cancelled": totals["cancelled"],
+        "sales": sum(month["sales"] for month in months),
+        "not_cancelled": sum(month["orders"] for month in months),
+        "delivered": sum(month["delivered"] for month in months),
+        "monthly": {month["_id"]: (month["sales"], month["orders"]) for month in months if month["_id"]},
+        "products": {product["_id"]: product["count"] for product in products},
+    }
@@ -0,0 +1,192 @@
+"""Razorpay gateway adapter - async REST client with pooling, timeouts, retries and a circuit breaker
+
+Replaces the synchronous razorpay SDK on the request path: every call is a non-blocking
+aiohttp request over a shared keep-alive connection pool. Point RAZORPAY_API_BASE at
+fake_razorpay.py to run against a local fake gateway.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+RAZORPAY_API_BASE = "https://api.razorpay.com/v1"
+
+# Status codes worth retrying on idempotent calls
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GatewayError(Exception):
+    """The gateway rejected a request or returned something unusable"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class GatewayUnavailable(GatewayError):
+    """The gateway could not be reached (timeout, connection error, open circuit)"""
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for reset_timeout
+    seconds, then lets a single trial call through (half-open) to decide whether to close.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            raise GatewayUnavailable("Payment gateway temporarily unavailable (circuit open)")
+        if state == "half_open":
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            # A failed trial call re-opens the circuit for another full timeout
+            self.opened_at = time.monotonic()
+
+
+class RazorpayGateway:
+    """Async Razorpay REST client; one instance per process, shared across requests"""
+
+    def __init__(
+        self,
+        key_id: str,
+        key_secret: str,
+        base_url: str = RAZORPAY_API_BASE,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_retries: int = 2,
+        pool_size: int = 20,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.key_id = key_id
+        self.key_secret = key_secret
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so it binds to the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30),
+                auth=aiohttp.BasicAuth(self.key_id, self.key_secret),
+                timeout=self.timeout,
+                raise_for_status=False,
+            )
+        return self._session
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(self, method: str, path: str, payload: Optional[dict] = None,
+                       idempotent: bool = False, timeout: Optional[float] = None) -> dict:
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        last_error: Optional[GatewayError] = None
+
+        for attempt in range(1, attempts + 1):
+            self.breaker.before_call()
+            try:
+                async with self._get_session().request(
+                    method, f"{self.base_url}{path}", json=payload, timeout=request_timeout
+                ) as response:
+                    status = response.status
+                    try:
+                        body = await response.json(content_type=None)
+                    except ValueError:
+                        body = None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.breaker.record_failure()
+                last_error = GatewayUnavailable(f"Payment gateway unreachable: {e.__class__.__name__}")
+            except BaseException:
+                # Cancelled or failed unexpectedly: still settle the call, or a half-open trial never ends
+                self.breaker.record_failure()
+                raise
+            else:
+                if status < 400:
+                    self.breaker.record_success()
+                    return body
+                error = body.get("error") if isinstance(body, dict) else None
+                description = (error or {}).get("description") or f"HTTP {status}"
+                if status in RETRYABLE_STATUSES:
+                    self.breaker.record_failure()
+                    last_error = GatewayUnavailable(f"Payment gateway error: {description}", status)
+                else:
+                    # A 4xx is our request's fault, not the gateway's health
+                    self.breaker.record_success()
+                    raise GatewayError(description, status)
+
+            if attempt < attempts:
+                await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+
+        logger.warning(f"Razorpay {method} {path} failed after {attempts} attempt(s): {last_error}")
+        raise last_error
+
+    async def create_order(self, amount_in_paise: int, currency: str = "INR", receipt: Optional[str] = None,
+                           notes: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
+        """Create a gateway order (not retried - a repeat POST would create a second order)"""
+        payload = {"amount": amount_in_paise, "currency": currency, "payment_capture": 1}
+        if receipt:
+            payload["receipt"] = receipt
+        if notes:
+            payload["notes"] = notes
+        return await self._request("POST", "/orders", payload, timeout=timeout)
+
+    async def fetch_order(self, razorpay_order_id: str, timeout: Optional[float] = None) -> dict:
+        return await self._request("GET", f"/orders/{razorpay_order_id}", idempotent=True, timeout=timeout)
+
+    async def fetch_payment(self, razorpay_payment_id: str, timeout: Optional[float] = None) -> dict:
+        return await self._request("GET", f"/payments/{razorpay_payment_id}", idempotent=True, timeout=timeout)
+
+    def verify_payment_signature(self, razorpay_order_id: str, razorpay_payment_id: str, signature: str) -> bool:
+        """Check the checkout callback signature (HMAC-SHA256 of order_id|payment_id)"""
+        expected = hmac.new(
+            self.key_secret.encode("utf-8"),
+            f"{razorpay_order_id}|{razorpay_payment_id}".encode("utf-8"),
+            hashlib.sha256
+        ).hexdigest()
+        return hmac.compare_digest(expected, signature or "")
+
+    @staticmethod
+    def verify_webhook_signature(body: bytes, signature: str, webhook_secret: str) -> bool:
+        """Check a webhook's X-Razorpay-Signature (HMAC-SHA256 of the raw body)"""
+        if not webhook_secret:
+            return False
+        expected = hmac.new(webhook_secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature or "")
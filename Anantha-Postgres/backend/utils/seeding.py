@@ -0,0 +1,233 @@
+"""Idempotent seeding engine - diff desired documents against the database and apply only the changes"""
+import json
+import logging
+from typing import Iterable, List, Optional, Sequence
+
+from pymongo import DeleteOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Documents per bulk_write / executemany call (one round-trip per batch)
+DEFAULT_BATCH_SIZE = 500
+
+
+def _key_of(doc: dict, key_fields: Sequence[str]) -> tuple:
+    """Build the identity tuple of a document from its key fields"""
+    return tuple(doc.get(field) for field in key_fields)
+
+
+def _batches(items: List, batch_size: int):
+    """Yield successive slices of at most batch_size items"""
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def plan_seed(
+    existing_docs: Iterable[dict],
+    desired_docs: Iterable[dict],
+    key_fields: Sequence[str],
+    insert_only_fields: Sequence[str] = (),
+    prune: bool = False
+) -> dict:
+    """
+    Compare existing documents with the desired ones and work out what has to change.
+
+    Fields listed in insert_only_fields are written only when a document is created,
+    so live values (inventory counts, stock flags) survive a re-seed.
+    Duplicate keys in desired_docs are collapsed - the last definition wins.
+
+    Returns a dict with:
+        inserts   - full documents that do not exist yet
+        updates   - list of (key, changed_fields) for documents that drifted
+        deletes   - keys present in the database but not desired (only when prune=True)
+        unchanged - number of documents already up to date
+    """
+    existing_by_key = {_key_of(doc, key_fields): doc for doc in existing_docs}
+
+    desired_by_key = {}
+    for doc in desired_docs:
+        desired_by_key[_key_of(doc, key_fields)] = doc
+
+    inserts = []
+    updates = []
+    unchanged = 0
+
+    for key, doc in desired_by_key.items():
+        current = existing_by_key.get(key)
+        if current is None:
+            inserts.append(doc)
+            continue
+
+        changed = {
+            field: value
+            for field, value in doc.items()
+            if field not in key_fields
+            and field not in insert_only_fields
+            and current.get(field) != value
+        }
+        if changed:
+            updates.append((key, changed))
+        else:
+            unchanged += 1
+
+    deletes = []
+    if prune:
+        deletes = [key for key in existing_by_key if key not in desired_by_key]
+
+    return {
+        "inserts": inserts,
+        "updates": updates,
+        "deletes": deletes,
+        "unchanged": unchanged
+    }
+
+
+def _plan_summary(plan: dict) -> dict:
+    """Counts-only view of a seed plan for logging and API responses"""
+    return {
+        "inserted": len(plan["inserts"]),
+        "updated": len(plan["updates"]),
+        "deleted": len(plan["deletes"]),
+        "unchanged": plan["unchanged"]
+    }
+
+
+def build_mongodb_operations(plan: dict, key_fields: Sequence[str]) -> list:
+    """
+    Translate a seed plan into pymongo write models.
+
+    New documents are written with an upsert + $setOnInsert, so two seeders racing
+    each other (or a seeder racing an admin edit) can never create duplicates.
+    """
+    operations = []
+
+    for doc in plan["inserts"]:
+        key_filter = {field: doc.get(field) for field in key_fields}
+        insert_fields = {field: value for field, value in doc.items() if field not in key_fields}
+        operations.append(UpdateOne(key_filter, {"$setOnInsert": insert_fields}, upsert=True))
+
+    for key, changed in plan["updates"]:
+        key_filter = dict(zip(key_fields, key))
+        operations.append(UpdateOne(key_filter, {"$set": changed}))
+
+    for key in plan["deletes"]:
+        operations.append(DeleteOne(dict(zip(key_fields, key))))
+
+    return operations
+
+
+async def seed_mongodb(
+    collection,
+    desired_docs: Iterable[dict],
+    key_fields: Sequence[str],
+    insert_only_fields: Sequence[str] = (),
+    prune: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> dict:
+    """
+    Bring a MongoDB collection in line with desired_docs using ordered bulk_write batches.
+
+    Safe to re-run at any time: unchanged documents cost nothing, the collection is never
+    emptied, and each batch is a single round-trip.
+    """
+    existing = await collection.find({}, {"_id": 0}).to_list(None)
+    plan = plan_seed(existing, desired_docs, key_fields, insert_only_fields, prune)
+    operations = build_mongodb_operations(plan, key_fields)
+
+    for batch in _batches(operations, batch_size):
+        await collection.bulk_write(batch, ordered=True)
+
+    summary = _plan_summary(plan)
+    logger.info(f"Seeded {collection.name}: {summary}")
+    return summary
+
+
+async def seed_postgresql(
+    conn,
+    table: str,
+    desired_rows: Iterable[dict],
+    key_columns: Sequence[str],
+    insert_only_columns: Sequence[str] = (),
+    json_columns: Sequence[str] = (),
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> dict:
+    """
+    Bring a PostgreSQL table in line with desired_rows using batched INSERT ... ON CONFLICT.
+
+    key_columns must be covered by a primary key or unique index. Changed and new rows are
+    sent through executemany inside one transaction per batch; unchanged rows are skipped.
+    """
+    desired_rows = list(desired_rows)
+    if not desired_rows:
+        return _plan_summary(plan_seed([], [], key_columns))
+
+    columns: List[str] = []
+    for row in desired_rows:
+        for column in row:
+            if column not in columns:
+                columns.append(column)
+
+    column_list = ", ".join(columns)
+    existing = []
+    for record in await conn.fetch(f"SELECT {column_list} FROM {table}"):
+        row = dict(record)
+        for column in json_columns:
+            if isinstance(row.get(column), str):
+                row[column] = json.loads(row[column])
+        existing.append(row)
+
+    plan = plan_seed(existing, desired_rows, key_columns, insert_only_columns)
+
+    changed_keys = {key for key, _ in plan["updates"]}
+    rows_to_write = list(plan["inserts"]) + [
+        row for row in desired_rows if _key_of(row, key_columns) in changed_keys
+    ]
+
+    update_columns = [c for c in columns if c not in key_columns and c not in insert_only_columns]
+    placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+    conflict_action = (
+        "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+        if update_columns else "DO NOTHING"
+    )
+    statement = (
+        f"INSERT INTO {table} ({column_list}) VALUES ({placeholders}) "
+        f"ON CONFLICT ({', '.join(key_columns)}) {conflict_action}"
+    )
+
+    def to_args(row: dict) -> tuple:
+        return tuple(
+            json.dumps(row.get(column)) if column in json_columns else row.get(column)
+            for column in columns
+        )
+
+    for batch in _batches(rows_to_write, batch_size):
+        async with conn.transaction():
+            await conn.executemany(statement, [to_args(row) for row in batch])
+
+    summary = _plan_summary(plan)
+    logger.info(f"Seeded {table}: {summary}")
+    return summary
+
+
+def build_location_documents(default_charges: Optional[dict] = None) -> List[dict]:
+    """Desired location documents for every city in cities_data.py"""
+    from cities_data import ANDHRA_PRADESH_CITIES, TELANGANA_CITIES, DEFAULT_DELIVERY_CHARGES
+
+    charges = default_charges if default_charges is not None else DEFAULT_DELIVERY_CHARGES
+    documents = []
+
+    # Andhra Pradesh defaults to Rs.49, Telangana to Rs.99 unless a city has its own charge
+    for state, cities, fallback_charge in (
+        ("Andhra Pradesh", ANDHRA_PRADESH_CITIES, 49),
+        ("Telangana", TELANGANA_CITIES, 99)
+    ):
+        for city in cities:
+            documents.append({
+                "name": city,
+                "state": state,
+                "charge": charges.get(city, fallback_charge),
+                "free_delivery_threshold": None,  # Can be set by admin later
+                "enabled": True
+            })
+
+    return documents
@@ -0,0 +1,155 @@
+"""Structured logging - JSON lines written by a background thread, tagged with the request ID
+
+Handlers on the event loop only put records on a queue (QueueHandler); a QueueListener
+thread formats and writes them, so slow stdout/log shipping never stalls a request.
+Verbose per-request debug events go through log_sampled() with per-route sample rates; the
+sampling decision is made once per request, so a sampled request logs all of its events.
+"""
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# Sample rate of the current request if it was sampled, 0.0 if not, None outside a request
+sample_rate_var: ContextVar[Optional[float]] = ContextVar("sample_rate", default=None)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Fraction of requests whose verbose debug events are logged, per route (path prefix match)
+DEFAULT_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.01"))
+ROUTE_SAMPLE_RATES: Dict[str, float] = {
+    "/api/orders": 0.05,
+}
+
+_listener: Optional[QueueListener] = None
+
+# Attributes every LogRecord has - anything else was passed via extra=
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id, plus any extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ContextQueueHandler(QueueHandler):
+    """QueueHandler that captures the request ID and renders the message/traceback before enqueueing"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Context variables and exception objects are only valid on the calling side
+        record = copy.copy(record)
+        record.request_id = request_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: Optional[str] = None) -> QueueListener:
+    """Route the root logger through a queue to a JSON stdout handler (safe to call more than once)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [ContextQueueHandler(log_queue)]
+    root.setLevel(level or os.environ.get("LOG_LEVEL", "INFO"))
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def sample_rate_for(path: str) -> float:
+    """Sample rate of the longest configured route prefix matching path"""
+    matches = [prefix for prefix in ROUTE_SAMPLE_RATES if path.startswith(prefix)]
+    if not matches:
+        return DEFAULT_SAMPLE_RATE
+    return ROUTE_SAMPLE_RATES[max(matches, key=len)]
+
+
+def _draw_sample(rate: float) -> float:
+    """rate if this request/event is sampled, else 0.0"""
+    return rate if rate > 0 and random.random() < rate else 0.0
+
+
+def log_sampled(logger: logging.Logger, route: str, event: str, **fields):
+    """Log a verbose debug event for a sampled fraction of requests (fields must be PII-free)"""
+    rate = sample_rate_var.get()
+    if rate is None:
+        # Outside a request (background work): sample the event on its own
+        rate = _draw_sample(sample_rate_for(route))
+    if rate:
+        logger.info(event, extra={"event": event, "sample_rate": rate, **fields})
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware - reuse the caller's X-Request-ID or mint one, expose it to logs and echo it
+    back; also decides whether the request's sampled debug events are logged
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = REQUEST_ID_HEADER.lower().encode()
+        request_id = next((value.decode() for name, value in scope["headers"] if name == header), None)
+        request_id = (request_id or uuid.uuid4().hex)[:64]
+        token = request_id_var.set(request_id)
+        sample_token = sample_rate_var.set(_draw_sample(sample_rate_for(scope["path"])))
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(header, request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
+            sample_rate_var.reset(sample_token)
@@ -1,74 +1,51 @@
 #!/usr/bin/env python3
 """
-Seed all cities from cities_data.py into MongoDB database
+Seed all cities from cities_data.py into PostgreSQL database
 This script adds all 419 cities from Andhra Pradesh and Telangana
+
+Uses the same seeding engine as the MongoDB seeder: only new or changed cities are
+written, in batched INSERT ... ON CONFLICT statements, so it is safe to re-run.
 """
-import os
+import asyncio
 import sys
-from pymongo import MongoClient
-from cities_data import ANDHRA_PRADESH_CITIES, TELANGANA_CITIES, DEFAULT_DELIVERY_CHARGES
+from database.connection_postgresql import get_db_pool, close_db_pool, create_tables
+from utils.seeding import seed_postgresql, build_location_documents
+
+# Admin-managed columns that a re-seed must not reset
+LOCATION_INSERT_ONLY_COLUMNS = ("free_delivery_threshold", "enabled")
 
-def seed_all_cities():
+async def seed_all_cities():
     """Seed all cities from cities_data.py into database"""
     
-    # Connect to MongoDB
-    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
-    client = MongoClient(mongo_url)
-    db = client['food_delivery']
-    locations_collection = db.locations
-    
     print("=" * 60)
-    print("SEEDING ALL CITIES TO DATABASE")
+    print("SEEDING ALL CITIES TO DATABASE (PostgreSQL)")
     print("=" * 60)
     
-    # Clear existing cities
-    delete_result = locations_collection.delete_many({})
-    print(f"\n✓ Cleared {delete_result.deleted_count} existing cities")
+    # Make sure tables (and the unique name/state index used for upserts) exist
+    await create_tables()
+    pool = await get_db_pool()
     
-    cities_added = 0
+    city_docs = build_location_documents()
+    print(f"\n📍 Syncing {len(city_docs)} Andhra Pradesh and Telangana cities...")
     
-    # Add Andhra Pradesh cities
-    print(f"\n📍 Adding Andhra Pradesh cities...")
-    for city in ANDHRA_PRADESH_CITIES:
-        # Get delivery charge from default map or use 49 as default for AP
-        charge = DEFAULT_DELIVERY_CHARGES.get(city, 49)
+    async with pool.acquire() as conn:
+        summary = await seed_postgresql(
+            conn,
+            "locations",
+            city_docs,
+            key_columns=("name", "state"),
+            insert_only_columns=LOCATION_INSERT_ONLY_COLUMNS
+        )
         
-        city_doc = {
-            "name": city,
-            "state": "Andhra Pradesh",
-            "charge": charge,
-            "free_delivery_threshold": None,  # Can be set by admin later
-            "enabled": True
-        }
+        print(f"✓ Added {summary['inserted']} new cities")
+        print(f"✓ Updated {summary['updated']} changed cities")
+        print(f"✓ {summary['unchanged']} cities already up to date")
         
-        locations_collection.insert_one(city_doc)
-        cities_added += 1
-    
-    print(f"✓ Added {len(ANDHRA_PRADESH_CITIES)} Andhra Pradesh cities")
-    
-    # Add Telangana cities
-    print(f"\n📍 Adding Telangana cities...")
-    for city in TELANGANA_CITIES:
-        # Get delivery charge from default map or use 99 as default for Telangana
-        charge = DEFAULT_DELIVERY_CHARGES.get(city, 99)
-        
-        city_doc = {
-            "name": city,
-            "state": "Telangana",
-            "charge": charge,
-            "free_delivery_threshold": None,  # Can be set by admin later
-            "enabled": True
-        }
-        
-        locations_collection.insert_one(city_doc)
-        cities_added += 1
-    
-    print(f"✓ Added {len(TELANGANA_CITIES)} Telangana cities")
-    
-    # Verify
-    total_count = locations_collection.count_documents({})
-    ap_count = locations_collection.count_documents({"state": "Andhra Pradesh"})
-    tg_count = locations_collection.count_documents({"state": "Telangana"})
+        # Verify
+        total_count = await conn.fetchval("SELECT COUNT(*) FROM locations")
+        ap_count = await conn.fetchval("SELECT COUNT(*) FROM locations WHERE state = $1", "Andhra Pradesh")
+        tg_count = await conn.fetchval("SELECT COUNT(*) FROM locations WHERE state = $1", "Telangana")
+        sample_cities = await conn.fetch("SELECT name, state, charge FROM locations ORDER BY id LIMIT 10")
     
     print("\n" + "=" * 60)
     print("SEEDING COMPLETE ✓")
@@ -79,7 +56,6 @@ def seed_all_cities():
     
     # Show sample cities
     print("\nSample cities from database:")
-    sample_cities = list(locations_collection.find({}, {"name": 1, "state": 1, "charge": 1, "_id": 0}).limit(10))
     for city in sample_cities:
         print(f"  • {city['name']}, {city['state']} - ₹{city['charge']}")
     
@@ -88,11 +64,11 @@ def seed_all_cities():
     print("  2. Checkout page - City dropdown")
     print("\n" + "=" * 60)
     
-    client.close()
+    await close_db_pool()
 
 if __name__ == "__main__":
     try:
-        seed_all_cities()
+        asyncio.run(seed_all_cities())
     except Exception as e:
         print(f"\n❌ Error seeding cities: {str(e)}")
         sys.exit(1)
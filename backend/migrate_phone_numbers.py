@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Backfill normalized phone numbers (E.164) into existing MongoDB documents
+
+Adds phone_e164 to orders and users so phone lookups can use exact
+indexed matches instead of regex scans. Safe to re-run.
+Customer autofill data is migrated separately by migrate_customer_profiles.py.
+"""
+import asyncio
+import os
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from utils.helpers import normalize_phone
+from utils.index_manager import ensure_indexes_mongodb
+
+load_dotenv()
+
+BATCH_SIZE = 500
+
+async def flush(collection, operations):
+    """Write a batch of updates and return how many documents changed"""
+    if not operations:
+        return 0
+    result = await collection.bulk_write(operations, ordered=False)
+    operations.clear()
+    return result.modified_count
+
+async def backfill_phone_field(collection):
+    """Set phone_e164 on every document that has a phone but no normalized copy"""
+    operations = []
+    updated = 0
+    skipped = 0
+    cursor = collection.find(
+        {"phone": {"$nin": [None, ""]}, "phone_e164": {"$exists": False}},
+        {"_id": 1, "phone": 1}
+    )
+    async for doc in cursor:
+        phone_e164 = normalize_phone(str(doc["phone"]))
+        if not phone_e164:
+            skipped += 1
+            continue
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"phone_e164": phone_e164}}))
+        if len(operations) >= BATCH_SIZE:
+            updated += await flush(collection, operations)
+    updated += await flush(collection, operations)
+    return updated, skipped
+
+async def migrate_phone_numbers():
+    """Backfill normalized phone numbers and create the lookup indexes"""
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ.get('DB_NAME', 'anantha_lakshmi_db')]
+
+    print("=" * 60)
+    print("NORMALIZING PHONE NUMBERS")
+    print("=" * 60)
+
+    for name in ("orders", "users"):
+        updated, skipped = await backfill_phone_field(db[name])
+        print(f"  • {name}: {updated} updated, {skipped} unparseable")
+
+    await ensure_indexes_mongodb(db)
+    print("\n✓ Indexes ensured")
+
+    client.close()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(migrate_phone_numbers())
+    except Exception as e:
+        print(f"\n❌ Error migrating phone numbers: {str(e)}")
+        sys.exit(1)
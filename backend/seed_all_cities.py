@@ -2,73 +2,59 @@
 """
 Seed all cities from cities_data.py into MongoDB database
 This script adds all 419 cities from Andhra Pradesh and Telangana
+
+Re-runnable: only new or changed cities are written (ordered bulk_write upserts),
+so the locations collection is never emptied while checkouts are reading it.
 """
+import asyncio
 import os
 import sys
-from pymongo import MongoClient
-from cities_data import ANDHRA_PRADESH_CITIES, TELANGANA_CITIES, DEFAULT_DELIVERY_CHARGES
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from utils.seeding import seed_mongodb, build_location_documents
+from utils.helpers import bump_settings_version
+
+load_dotenv()
+
+# Admin-managed fields that a re-seed must not reset
+LOCATION_INSERT_ONLY_FIELDS = ("free_delivery_threshold", "enabled")
 
-def seed_all_cities():
+async def seed_all_cities():
     """Seed all cities from cities_data.py into database"""
     
     # Connect to MongoDB
     mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
-    client = MongoClient(mongo_url)
-    db = client['food_delivery']
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ.get('DB_NAME', 'anantha_lakshmi_db')]
     locations_collection = db.locations
     
     print("=" * 60)
     print("SEEDING ALL CITIES TO DATABASE")
     print("=" * 60)
     
-    # Clear existing cities
-    delete_result = locations_collection.delete_many({})
-    print(f"\n✓ Cleared {delete_result.deleted_count} existing cities")
-    
-    cities_added = 0
-    
-    # Add Andhra Pradesh cities
-    print(f"\n📍 Adding Andhra Pradesh cities...")
-    for city in ANDHRA_PRADESH_CITIES:
-        # Get delivery charge from default map or use 49 as default for AP
-        charge = DEFAULT_DELIVERY_CHARGES.get(city, 49)
-        
-        city_doc = {
-            "name": city,
-            "state": "Andhra Pradesh",
-            "charge": charge,
-            "free_delivery_threshold": None,  # Can be set by admin later
-            "enabled": True
-        }
-        
-        locations_collection.insert_one(city_doc)
-        cities_added += 1
+    city_docs = build_location_documents()
+    print(f"\n📍 Syncing {len(city_docs)} Andhra Pradesh and Telangana cities...")
     
-    print(f"✓ Added {len(ANDHRA_PRADESH_CITIES)} Andhra Pradesh cities")
+    summary = await seed_mongodb(
+        locations_collection,
+        city_docs,
+        key_fields=("name", "state"),
+        insert_only_fields=LOCATION_INSERT_ONLY_FIELDS
+    )
     
-    # Add Telangana cities
-    print(f"\n📍 Adding Telangana cities...")
-    for city in TELANGANA_CITIES:
-        # Get delivery charge from default map or use 99 as default for Telangana
-        charge = DEFAULT_DELIVERY_CHARGES.get(city, 99)
-        
-        city_doc = {
-            "name": city,
-            "state": "Telangana",
-            "charge": charge,
-            "free_delivery_threshold": None,  # Can be set by admin later
-            "enabled": True
-        }
-        
-        locations_collection.insert_one(city_doc)
-        cities_added += 1
+    print(f"✓ Added {summary['inserted']} new cities")
+    print(f"✓ Updated {summary['updated']} changed cities")
+    print(f"✓ {summary['unchanged']} cities already up to date")
     
-    print(f"✓ Added {len(TELANGANA_CITIES)} Telangana cities")
+    # Let running servers know their location caches are stale
+    if summary['inserted'] or summary['updated']:
+        version = await bump_settings_version(db, "locations_version")
+        print(f"✓ Location table version is now {version}")
     
     # Verify
-    total_count = locations_collection.count_documents({})
-    ap_count = locations_collection.count_documents({"state": "Andhra Pradesh"})
-    tg_count = locations_collection.count_documents({"state": "Telangana"})
+    total_count = await locations_collection.count_documents({})
+    ap_count = await locations_collection.count_documents({"state": "Andhra Pradesh"})
+    tg_count = await locations_collection.count_documents({"state": "Telangana"})
     
     print("\n" + "=" * 60)
     print("SEEDING COMPLETE ✓")
@@ -79,7 +65,7 @@ def seed_all_cities():
     
     # Show sample cities
     print("\nSample cities from database:")
-    sample_cities = list(locations_collection.find({}, {"name": 1, "state": 1, "charge": 1, "_id": 0}).limit(10))
+    sample_cities = await locations_collection.find({}, {"name": 1, "state": 1, "charge": 1, "_id": 0}).limit(10).to_list(10)
     for city in sample_cities:
         print(f"  • {city['name']}, {city['state']} - ₹{city['charge']}")
     
@@ -92,7 +78,7 @@ def seed_all_cities():
 
 if __name__ == "__main__":
     try:
-        seed_all_cities()
+        asyncio.run(seed_all_cities())
     except Exception as e:
         print(f"\n❌ Error seeding cities: {str(e)}")
         sys.exit(1)
@@ -0,0 +1,265 @@
+"""Cart quotes - price a whole cart in memory from cached products and delivery locations
+
+CatalogCache keeps every product and delivery location in memory. It reloads when the
+products/locations version counters in settings change (checked at most every few seconds)
+or when the snapshot gets too old. Stock moved by orders does not bump a counter, so the
+inventory shown in a quote can lag by up to max_age. Orders still take stock with conditional
+updates, so a stale count never oversells.
+
+quote_cart() is the single pricing engine: POST /api/cart/quote returns its result as is, and
+order placement uses it for prices, availability and the delivery charge.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS_VERSION_KEY = "products_version"
+DEFAULT_DELIVERY_CHARGE = 99.0
+
+# Line problems, roughly from "can never be ordered" to "not right now"
+NOT_FOUND = "not_found"
+WEIGHT_UNAVAILABLE = "weight_unavailable"
+NOT_IN_CITY = "not_available_in_city"
+OUT_OF_STOCK = "out_of_stock"
+INSUFFICIENT_INVENTORY = "insufficient_inventory"
+
+
+def is_discount_active(product: dict, now: Optional[datetime] = None) -> bool:
+    """A product discount applies until the end of its expiry date (or exact expiry time)"""
+    discount_percentage = product.get("discount_percentage")
+    discount_expiry = product.get("discount_expiry_date")
+    if not discount_percentage or not discount_expiry:
+        return False
+    try:
+        expiry_date_str = discount_expiry.replace("Z", "+00:00")
+        if "T" in expiry_date_str:
+            expiry_date = datetime.fromisoformat(expiry_date_str)
+        else:
+            # If only date is provided (YYYY-MM-DD), add time and timezone
+            expiry_date = datetime.fromisoformat(expiry_date_str + "T23:59:59+00:00")
+        if expiry_date.tzinfo is None:
+            expiry_date = expiry_date.replace(tzinfo=timezone.utc)
+    except (AttributeError, ValueError):
+        return False
+    return expiry_date > (now or datetime.now(timezone.utc))
+
+
+def discounted_price(price: float, discount_percentage: float) -> float:
+    return round(price * (1 - discount_percentage / 100), 2)
+
+
+def apply_discount(product: dict, now: Optional[datetime] = None) -> dict:
+    """Add discount_active (and discounted_prices while active) to a product document"""
+    product["discount_active"] = is_discount_active(product, now)
+    if product["discount_active"]:
+        product["discounted_prices"] = [
+            {
+                **price_item,
+                "original_price": price_item["price"],
+                "discounted_price": discounted_price(price_item["price"], product["discount_percentage"])
+            }
+            for price_item in product.get("prices", [])
+        ]
+    return product
+
+
+def location_key(city: Optional[str], state: Optional[str]) -> Tuple[str, str]:
+    """Delivery locations match on city name AND state, case-insensitively"""
+    return (city or "").lower(), (state or "").lower()
+
+
+@dataclass
+class CatalogSnapshot:
+    products_by_id: Dict[str, dict]
+    locations_by_key: Dict[Tuple[str, str], dict]
+    versions: Tuple[int, ...]
+    loaded_at: float
+
+
+class CatalogCache:
+    """Products and delivery locations in memory, refreshed when their version counters move"""
+
+    def __init__(self, locations_version_key: str, check_interval: float = 2.0, max_age: float = 30.0):
+        self.version_keys = (PRODUCTS_VERSION_KEY, locations_version_key)
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._db = None
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self.stats = {"hits": 0, "reloads": 0, "version_checks": 0}
+
+    def start(self, db):
+        self._db = db
+
+    def invalidate(self):
+        """Reload on next use (e.g. right after a write on this worker)"""
+        self._snapshot = None
+
+    async def _versions(self) -> Tuple[int, ...]:
+        self.stats["version_checks"] += 1
+        settings = await self._db.settings.find(
+            {"key": {"$in": list(self.version_keys)}}, {"_id": 0, "key": 1, "version": 1}
+        ).to_list(len(self.version_keys))
+        by_key = {setting["key"]: setting.get("version", 0) for setting in settings}
+        return tuple(by_key.get(key, 0) for key in self.version_keys)
+
+    async def _load(self, versions: Tuple[int, ...]) -> CatalogSnapshot:
+        products, locations = await asyncio.gather(
+            self._db.products.find({}, {"_id": 0}).to_list(None),
+            self._db.locations.find({}, {"_id": 0}).to_list(None)
+        )
+        self.stats["reloads"] += 1
+        return CatalogSnapshot(
+            products_by_id={product["id"]: product for product in products if product.get("id")},
+            locations_by_key={location_key(location.get("name"), location.get("state")): location for location in locations},
+            versions=versions,
+            loaded_at=time.monotonic()
+        )
+
+    async def snapshot(self) -> CatalogSnapshot:
+        now = time.monotonic()
+        current = self._snapshot
+        if current and now - current.loaded_at < self.max_age and now - self._checked_at < self.check_interval:
+            self.stats["hits"] += 1
+            return current
+
+        async with self._lock:
+            current = self._snapshot
+            now = time.monotonic()
+            if current and now - current.loaded_at < self.max_age and now - self._checked_at < self.check_interval:
+                self.stats["hits"] += 1
+                return current
+            versions = await self._versions()
+            self._checked_at = time.monotonic()
+            if current is None or current.versions != versions or now - current.loaded_at >= self.max_age:
+                self._snapshot = await self._load(versions)
+            else:
+                self.stats["hits"] += 1
+            return self._snapshot
+
+    def status(self) -> dict:
+        current = self._snapshot
+        return {
+            "products": len(current.products_by_id) if current else 0,
+            "locations": len(current.locations_by_key) if current else 0,
+            "versions": dict(zip(self.version_keys, current.versions)) if current else None,
+            "age_seconds": round(time.monotonic() - current.loaded_at, 1) if current else None,
+            **self.stats,
+        }
+
+
+@dataclass
+class QuoteLine:
+    product_id: str
+    weight: str
+    quantity: int
+    name: Optional[str] = None
+    unit_price: Optional[float] = None
+    original_unit_price: Optional[float] = None
+    line_total: float = 0.0
+    available: bool = True
+    reason: Optional[str] = None
+    available_quantity: Optional[int] = None
+
+
+@dataclass
+class CartQuote:
+    lines: List[QuoteLine]
+    subtotal: float
+    delivery_charge: float
+    total: float
+    location_found: bool
+    custom_city_request: bool
+    free_delivery_threshold: Optional[float] = None
+    free_delivery_applied: bool = False
+    all_available: bool = True
+    unavailable: List[dict] = field(default_factory=list)
+
+
+def quote_cart(items: List[dict], city: Optional[str], state: Optional[str], is_custom_location: bool,
+               snapshot: CatalogSnapshot, now: Optional[datetime] = None) -> CartQuote:
+    """
+    Price items ({product_id, weight, quantity}) for delivery to city/state.
+    Unit prices come from the catalog (discounted while a discount is active); unavailable
+    lines are reported with a reason and left out of the subtotal.
+    """
+    now = now or datetime.now(timezone.utc)
+    products = snapshot.products_by_id
+
+    # Stock is checked against the product's total quantity across weights
+    requested: Dict[str, int] = {}
+    for item in items:
+        requested[item["product_id"]] = requested.get(item["product_id"], 0) + item["quantity"]
+
+    lines = []
+    for item in items:
+        line = QuoteLine(product_id=item["product_id"], weight=item["weight"], quantity=item["quantity"])
+        lines.append(line)
+        product = products.get(item["product_id"])
+        if product is None:
+            line.available, line.reason = False, NOT_FOUND
+            continue
+        line.name = product.get("name")
+
+        price_item = next((price for price in product.get("prices", []) if price.get("weight") == item["weight"]), None)
+        if price_item is None:
+            line.available, line.reason = False, WEIGHT_UNAVAILABLE
+            continue
+        line.original_unit_price = float(price_item["price"])
+        line.unit_price = (
+            discounted_price(line.original_unit_price, product["discount_percentage"])
+            if is_discount_active(product, now) else line.original_unit_price
+        )
+        line.line_total = round(line.unit_price * line.quantity, 2)
+
+        available_cities = product.get("available_cities")
+        inventory_count = product.get("inventory_count")
+        if available_cities and city not in available_cities:
+            line.available, line.reason = False, NOT_IN_CITY
+        elif product.get("out_of_stock", False):
+            line.available, line.reason = False, OUT_OF_STOCK
+        elif inventory_count is not None and not product.get("flash_sale") and inventory_count < requested[line.product_id]:
+            # Flash-sale stock lives in worker pools and is only known when it is reserved
+            line.available, line.reason = False, INSUFFICIENT_INVENTORY
+            line.available_quantity = max(inventory_count, 0)
+
+    subtotal = round(sum(line.line_total for line in lines if line.available), 2)
+
+    # Same rules as order placement: unknown cities become custom city requests, charged later by admin
+    location = None
+    if not is_custom_location and city and state:
+        location = snapshot.locations_by_key.get(location_key(city, state))
+    custom_city_request = not is_custom_location and location is None
+
+    delivery_charge = 0.0
+    free_delivery_threshold = None
+    free_delivery_applied = False
+    if location is not None:
+        free_delivery_threshold = location.get("free_delivery_threshold") or None
+        if free_delivery_threshold and free_delivery_threshold > 0 and subtotal >= free_delivery_threshold:
+            free_delivery_applied = True
+        else:
+            delivery_charge = float(location.get("charge", DEFAULT_DELIVERY_CHARGE))
+
+    unavailable = [
+        {"product_id": line.product_id, "weight": line.weight, "name": line.name, "reason": line.reason}
+        for line in lines if not line.available
+    ]
+    return CartQuote(
+        lines=lines,
+        subtotal=subtotal,
+        delivery_charge=delivery_charge,
+        total=round(subtotal + delivery_charge, 2),
+        location_found=location is not None,
+        custom_city_request=custom_city_request,
+        free_delivery_threshold=free_delivery_threshold,
+        free_delivery_applied=free_delivery_applied,
+        all_available=not unavailable,
+        unavailable=unavailable
+    )
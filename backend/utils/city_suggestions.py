@@ -0,0 +1,133 @@
+"""City suggestions - one counted suggestion per requested town instead of one per submission
+
+Every pending suggestion carries a match_key (state + phonetic key of the city, see
+utils/city_index.city_match_key), and a partial unique index allows one pending suggestion per
+key. Repeat requests, including other spellings of the same town, are folded into it: the
+request count goes up and the requester is appended to its requesters list.
+
+Spellings one typo away from a pending suggestion are caught by an in-memory CityIndex of the
+pending suggestions, reloaded every few seconds or right after a write on this worker.
+"""
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from .city_index import CityIndex, city_match_key
+
+logger = logging.getLogger(__name__)
+
+# Requesters kept on an aggregated suggestion (the count keeps going)
+MAX_REQUESTERS = 50
+
+
+def requester_emails(suggestion: dict) -> List[str]:
+    """Distinct email addresses of everyone who asked for a suggested city"""
+    emails = [suggestion.get("email")] + [requester.get("email") for requester in suggestion.get("requesters", [])]
+    return list(dict.fromkeys(email for email in emails if email))
+
+
+class CitySuggestionBook:
+    """Records city suggestions, merging requests for the same town into one pending suggestion"""
+
+    def __init__(self, refresh_seconds: float = 10.0):
+        self.refresh_seconds = refresh_seconds
+        self._db = None
+        self._pending = CityIndex()
+        self._loaded_at: Optional[float] = None
+        self.stats = {"recorded": 0, "merged": 0, "reloads": 0}
+
+    def start(self, db):
+        self._db = db
+
+    def invalidate(self):
+        """Reload pending suggestions on next use (after an approval, rejection or new suggestion)"""
+        self._loaded_at = None
+
+    async def _pending_index(self) -> CityIndex:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            pending = await self._db.city_suggestions.find(
+                {"status": "pending"}, {"_id": 0, "city": 1, "state": 1}
+            ).to_list(None)
+            self._pending.build({"name": item.get("city"), "state": item.get("state")} for item in pending if item.get("city"))
+            self._loaded_at = time.monotonic()
+            self.stats["reloads"] += 1
+        return self._pending
+
+    async def record(self, city: str, state: str, requester: dict, request_id: Optional[str] = None) -> dict:
+        """
+        Add a request for city/state and return the (new or existing) pending suggestion.
+        request_id (an order id) makes the call idempotent: a request already counted is not counted twice.
+        """
+        match = (await self._pending_index()).resolve(city, state)
+        canonical = match["name"] if match else city
+        now = datetime.now(timezone.utc)
+        query = {"match_key": city_match_key(canonical, state), "status": "pending"}
+        if request_id:
+            query["request_ids"] = {"$ne": request_id}
+        add_to_set = {"spellings": city}
+        if request_id:
+            add_to_set["request_ids"] = request_id
+        update = {
+            "$setOnInsert": {
+                "id": str(uuid.uuid4()),
+                "city": canonical,
+                "state": state,
+                "customer_name": requester.get("customer_name"),
+                "phone": requester.get("phone"),
+                "email": requester.get("email"),
+                "order_id": requester.get("order_id"),
+                "created_at": now.isoformat()
+            },
+            "$inc": {"request_count": 1},
+            "$push": {"requesters": {"$each": [{**requester, "city": city, "requested_at": now.isoformat()}], "$slice": -MAX_REQUESTERS}},
+            "$addToSet": add_to_set,
+            "$set": {"last_requested_at": now.isoformat()}
+        }
+
+        for _ in range(2):
+            try:
+                suggestion = await self._db.city_suggestions.find_one_and_update(
+                    query, update, upsert=True, return_document=ReturnDocument.AFTER
+                )
+                break
+            except DuplicateKeyError:
+                if request_id:
+                    # This order was counted by an earlier attempt
+                    suggestion = await self._db.city_suggestions.find_one({"match_key": query["match_key"], "status": "pending"})
+                    break
+                # Another request created the suggestion first - merge into it
+        else:
+            raise RuntimeError(f"Could not record city suggestion for {city}, {state}")
+
+        suggestion.pop("_id", None)
+        self.stats["recorded"] += 1
+        if suggestion.get("request_count", 1) > 1:
+            self.stats["merged"] += 1
+            logger.info(f"📝 City suggestion {canonical}, {state} requested again (as '{city}'), {suggestion['request_count']} requests")
+        else:
+            self.invalidate()
+        return suggestion
+
+    async def backfill_match_keys(self) -> int:
+        """Key pending suggestions stored before de-duplication; later duplicates of a town stay unkeyed"""
+        keyed = 0
+        async for suggestion in self._db.city_suggestions.find(
+            {"status": "pending", "match_key": {"$exists": False}}, {"_id": 1, "city": 1, "state": 1}
+        ).sort("created_at", 1):
+            try:
+                await self._db.city_suggestions.update_one(
+                    {"_id": suggestion["_id"]},
+                    {"$set": {"match_key": city_match_key(suggestion.get("city"), suggestion.get("state"))}}
+                )
+                keyed += 1
+            except DuplicateKeyError:
+                pass
+        return keyed
+
+    def status(self) -> dict:
+        return {"pending_indexed": self._pending.status()["locations"], **self.stats}
@@ -0,0 +1,127 @@
+"""Idempotency keys - replay the stored response when a client retries a non-idempotent POST
+
+Keys live in the idempotency_keys collection (TTL-indexed on created_at). The first request
+with a key claims it and runs; concurrent duplicates wait for it to finish and then get the
+same response. Failed executions release the key so the retry runs for real.
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_TTL_SECONDS = 24 * 60 * 60
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """The key is in use by a different request body, or its first execution is still running"""
+
+
+def request_fingerprint(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """Claim/complete/release idempotency keys; waits on in-flight duplicates"""
+
+    def __init__(self, wait_timeout: float = 30.0, poll_interval: float = 0.05, lease_seconds: float = 60.0):
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        # An in-progress claim older than this is assumed dead (e.g. the worker crashed)
+        self.lease_seconds = lease_seconds
+        self._collection = None
+        self._local_waiters: Dict[str, asyncio.Event] = {}
+
+    def start(self, collection):
+        self._collection = collection
+
+    async def claim(self, scope: str, key: str, fingerprint: str) -> Optional[Tuple[int, dict]]:
+        """
+        Claim a key for this request.
+        Returns None when the caller should execute the request, or (status_code, body)
+        of the original response when this is a retry.
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValueError(f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        doc_id = f"{scope}:{key}"
+        deadline = asyncio.get_running_loop().time() + self.wait_timeout
+        while True:
+            now = datetime.now(timezone.utc)
+            try:
+                await self._collection.insert_one({
+                    "_id": doc_id,
+                    "status": "in_progress",
+                    "fingerprint": fingerprint,
+                    "locked_at": now,
+                    "created_at": now
+                })
+                self._local_waiters[doc_id] = asyncio.Event()
+                return None
+            except DuplicateKeyError:
+                pass
+
+            existing = await self._collection.find_one({"_id": doc_id})
+            if existing is None:
+                continue  # released in the meantime - try to claim again
+            if existing.get("fingerprint") != fingerprint:
+                raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+            if existing.get("status") == "completed":
+                return existing["status_code"], existing["response"]
+
+            # Take over a claim whose owner has gone away
+            locked_at = existing.get("locked_at")
+            if locked_at is not None and locked_at.tzinfo is None:
+                locked_at = locked_at.replace(tzinfo=timezone.utc)
+            if locked_at is not None and now - locked_at > timedelta(seconds=self.lease_seconds):
+                taken = await self._collection.update_one(
+                    {"_id": doc_id, "status": "in_progress", "locked_at": existing["locked_at"]},
+                    {"$set": {"locked_at": now}}
+                )
+                if taken.modified_count:
+                    self._local_waiters[doc_id] = asyncio.Event()
+                    return None
+
+            # Wait for the first execution (event for same-process duplicates, polling across workers)
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise IdempotencyConflict("A request with this Idempotency-Key is still being processed")
+            waiter = self._local_waiters.get(doc_id)
+            try:
+                if waiter:
+                    await asyncio.wait_for(waiter.wait(), timeout=remaining)
+                else:
+                    await asyncio.sleep(min(self.poll_interval, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    async def complete(self, scope: str, key: str, status_code: int, response: dict):
+        """Store the response of a successful execution and wake waiting duplicates"""
+        doc_id = f"{scope}:{key}"
+        try:
+            await self._collection.update_one(
+                {"_id": doc_id},
+                {"$set": {"status": "completed", "status_code": status_code, "response": response}}
+            )
+        finally:
+            self._wake(doc_id)
+
+    async def release(self, scope: str, key: str):
+        """Forget a key after a failed execution so a retry runs again"""
+        doc_id = f"{scope}:{key}"
+        try:
+            await self._collection.delete_one({"_id": doc_id, "status": "in_progress"})
+        except Exception as e:
+            logger.error(f"❌ Failed to release idempotency key {doc_id}: {e}")
+        finally:
+            self._wake(doc_id)
+
+    def _wake(self, doc_id: str):
+        waiter = self._local_waiters.pop(doc_id, None)
+        if waiter:
+            waiter.set()
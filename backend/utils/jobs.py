@@ -0,0 +1,307 @@
+"""Job scheduler - periodic maintenance tasks, run once per deployment rather than once per worker
+
+Every worker runs a JobScheduler, but only the worker holding the scheduler lease in MongoDB
+(the leader) starts scheduled jobs. The leader renews the lease on every tick; when it dies or
+shuts down, another worker takes the lease over once it has expired (or at once, after a clean
+release) and picks up the schedules.
+
+Schedules are five-field cron expressions in UTC ("*/5 * * * *") or plain intervals in seconds.
+A failing run is retried with exponential backoff and full jitter; every attempt is written to
+the job_runs collection with its duration, so the run history is shared by all workers.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+LEADER_LEASE_ID = "job_scheduler"
+JOB_RUN_HISTORY_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# (low, high) of minute, hour, day of month, month, day of week (0 = Sunday; 7 is accepted too)
+CRON_FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def _parse_cron_field(text: str, low: int, high: int) -> set:
+    values = set()
+    for part in text.split(","):
+        range_text, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if range_text == "*":
+            start, end = low, high
+        elif "-" in range_text:
+            start, end = (int(value) for value in range_text.split("-", 1))
+        else:
+            start = int(range_text)
+            end = high if step_text else start
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(f"Invalid cron field '{text}'")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Five-field cron expression: minute hour day-of-month month day-of-week (UTC)"""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(text, low, high) for text, (low, high) in zip(fields, CRON_FIELD_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        # Like cron: when both day fields are restricted, a time matching either one runs
+        self._either_day = fields[2] != "*" and fields[4] != "*"
+
+    def _day_matches(self, when: datetime) -> bool:
+        day_match = when.day in self.days
+        weekday_match = (when.weekday() + 1) % 7 in self.weekdays
+        return (day_match or weekday_match) if self._either_day else (day_match and weekday_match)
+
+    def next_after(self, when: datetime) -> datetime:
+        candidate = when.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=5 * 366)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: '{self.expression}'")
+
+    def __str__(self):
+        return self.expression
+
+
+class IntervalSchedule:
+    """Run every `seconds` seconds"""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, when: datetime) -> datetime:
+        return when + timedelta(seconds=self.seconds)
+
+    def __str__(self):
+        return f"every {self.seconds:g}s"
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    schedule: Union[CronSchedule, IntervalSchedule]
+    max_retries: int = 2
+    retry_base_seconds: float = 5.0
+    next_run_at: Optional[datetime] = None
+    runs: int = 0
+    failures: int = 0
+    last_started_at: Optional[str] = None
+    last_duration_ms: Optional[float] = None
+    last_result: Any = None
+    last_error: Optional[str] = None
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def snapshot(self) -> dict:
+        return {
+            "schedule": str(self.schedule),
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "running": bool(self._task and not self._task.done()),
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_started_at": self.last_started_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+
+class JobScheduler:
+    """Cron/interval jobs behind a MongoDB leader lease; start() in the startup event, stop() on shutdown"""
+
+    def __init__(self, lease_seconds: float = 30.0, tick_seconds: float = 5.0):
+        self.lease_seconds = lease_seconds
+        self.tick_seconds = tick_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self.is_leader = False
+        self._leases = None
+        self._runs = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, func: Callable[[], Awaitable[Any]], schedule: Union[str, float],
+            max_retries: int = 2, retry_base_seconds: float = 5.0):
+        """Register a job; schedule is a cron expression or an interval in seconds"""
+        parsed = CronSchedule(schedule) if isinstance(schedule, str) else IntervalSchedule(schedule)
+        self.jobs[name] = Job(name, func, parsed, max_retries, retry_base_seconds)
+
+    def start(self, leases_collection, runs_collection):
+        self._leases = leases_collection
+        self._runs = runs_collection
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop scheduling, cancel running jobs and hand the lease to the next worker"""
+        tasks = [self._task] + [job._task for job in self.jobs.values()]
+        for task in tasks:
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        if self.is_leader:
+            self.is_leader = False
+            try:
+                await self._leases.delete_one({"_id": LEADER_LEASE_ID, "owner": self.worker_id})
+            except Exception as e:
+                logger.error(f"❌ Failed to release scheduler lease: {e}")
+
+    async def _acquire_lease(self) -> bool:
+        """Take or renew the leader lease; False when another worker holds a live lease"""
+        now = datetime.now(timezone.utc)
+        try:
+            await self._leases.find_one_and_update(
+                {"_id": LEADER_LEASE_ID, "$or": [{"owner": self.worker_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": {
+                    "owner": self.worker_id,
+                    "renewed_at": now,
+                    "expires_at": now + timedelta(seconds=self.lease_seconds)
+                }},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _on_elected(self):
+        """Work out when each job is due - interval jobs continue from the last recorded run"""
+        now = datetime.now(timezone.utc)
+        for job in self.jobs.values():
+            if isinstance(job.schedule, IntervalSchedule):
+                last = await self._runs.find_one({"job": job.name}, {"_id": 0, "started_at": 1}, sort=[("started_at", -1)])
+                last_started = last["started_at"] if last else None
+                if last_started is not None and last_started.tzinfo is None:
+                    last_started = last_started.replace(tzinfo=timezone.utc)
+                job.next_run_at = max(now, job.schedule.next_after(last_started)) if last_started else now
+            else:
+                job.next_run_at = job.schedule.next_after(now)
+
+    async def _loop(self):
+        while True:
+            try:
+                leader = await self._acquire_lease()
+                if leader and not self.is_leader:
+                    logger.info(f"Job scheduler: {self.worker_id} is now the leader")
+                    await self._on_elected()
+                elif self.is_leader and not leader:
+                    logger.warning(f"Job scheduler: {self.worker_id} lost the leader lease")
+                self.is_leader = leader
+                if leader:
+                    self._start_due_jobs()
+            except Exception as e:
+                self.is_leader = False
+                logger.error(f"❌ Job scheduler tick failed: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+    def _start_due_jobs(self):
+        now = datetime.now(timezone.utc)
+        for job in self.jobs.values():
+            if job.next_run_at is None or job.next_run_at > now:
+                continue
+            job.next_run_at = job.schedule.next_after(now)
+            if job._task and not job._task.done():
+                logger.warning(f"Job {job.name} is still running - skipping this run")
+                continue
+            job._task = asyncio.create_task(self._run_with_retries(job))
+
+    async def _run_with_retries(self, job: Job):
+        for attempt in range(1, job.max_retries + 2):
+            try:
+                await self._attempt(job, attempt, "schedule")
+                return
+            except Exception:
+                if attempt > job.max_retries or not self.is_leader:
+                    return
+                # Full jitter keeps retries of several failing jobs from hitting MongoDB together
+                await asyncio.sleep(random.uniform(0, job.retry_base_seconds * 2 ** (attempt - 1)))
+
+    async def _attempt(self, job: Job, attempt: int, trigger: str) -> Any:
+        started_at = datetime.now(timezone.utc)
+        job.last_started_at = started_at.isoformat()
+        started = time.perf_counter()
+        result, error = None, None
+        try:
+            result = await job.func()
+            return result
+        except Exception as e:
+            error = str(e)
+            logger.error(f"❌ Job {job.name} failed (attempt {attempt}): {e}")
+            raise
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            job.runs += 1
+            job.last_duration_ms = duration_ms
+            job.last_error = error
+            if error is None:
+                job.last_result = result
+            else:
+                job.failures += 1
+            await self._record_run(job, started_at, duration_ms, attempt, trigger, result, error)
+
+    async def _record_run(self, job: Job, started_at: datetime, duration_ms: float, attempt: int,
+                          trigger: str, result: Any, error: Optional[str]):
+        try:
+            await self._runs.insert_one({
+                "job": job.name,
+                "worker": self.worker_id,
+                "trigger": trigger,
+                "attempt": attempt,
+                "status": "failed" if error else "succeeded",
+                "started_at": started_at,
+                "finished_at": datetime.now(timezone.utc),
+                "duration_ms": duration_ms,
+                "result": result if isinstance(result, (dict, str, int, float, bool)) else None,
+                "error": error
+            })
+        except Exception as e:
+            logger.error(f"❌ Failed to record run of job {job.name}: {e}")
+
+    async def run_now(self, name: str) -> Any:
+        """Run a job once on this worker, outside its schedule (admin trigger)"""
+        return await self._attempt(self.jobs[name], 1, "manual")
+
+    async def history(self, name: str, limit: int = 20) -> List[dict]:
+        """Most recent recorded runs of a job, across all workers"""
+        runs = await self._runs.find({"job": name}, {"_id": 0}).sort("started_at", -1).limit(limit).to_list(limit)
+        for run in runs:
+            for key in ("started_at", "finished_at"):
+                if isinstance(run.get(key), datetime):
+                    run[key] = run[key].isoformat()
+        return runs
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "is_leader": self.is_leader,
+            "jobs": {name: job.snapshot() for name, job in self.jobs.items()},
+        }
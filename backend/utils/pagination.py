@@ -0,0 +1,98 @@
+"""Keyset pagination for admin listings
+
+Pages are read newest first by (sort_field, id) and continue from an opaque cursor holding the
+last document's sort value and id, so every page is one indexed range scan whatever its depth
+(no skip()). Date filters match both representations of timestamps found in older documents
+(ISO strings and BSON dates), as in the order export.
+"""
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+import orjson
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+TIEBREAK_FIELD = "id"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_date_param(value: str, name: str) -> datetime:
+    """YYYY-MM-DD or ISO datetime query parameter as an aware UTC datetime"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid {name}, expected YYYY-MM-DD or ISO datetime")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def date_range_filter(field: str, date_from: Optional[str], date_to: Optional[str]) -> dict:
+    """Filter on field between the dates; date_to is inclusive when given as a plain date"""
+    date_range = {}
+    if date_from:
+        date_range["$gte"] = parse_date_param(date_from, "date_from")
+    if date_to:
+        end = parse_date_param(date_to, "date_to")
+        date_range["$lt"] = end + timedelta(days=1) if "T" not in date_to else end
+    if not date_range:
+        return {}
+    string_range = {op: value.isoformat() for op, value in date_range.items()}
+    return {"$or": [{field: string_range}, {field: date_range}]}
+
+
+def encode_cursor(document: dict, sort_field: str) -> str:
+    value = document.get(sort_field)
+    kind = "date" if isinstance(value, datetime) else "value"
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = orjson.dumps([kind, value, document.get(TIEBREAK_FIELD)])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[object, Optional[str]]:
+    try:
+        kind, value, tiebreak = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if kind == "date":
+            value = datetime.fromisoformat(value)
+        return value, tiebreak
+    except (ValueError, TypeError, orjson.JSONDecodeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def after_cursor_filter(sort_field: str, cursor: str) -> dict:
+    """Documents that come after the cursor in (sort_field, id) descending order"""
+    value, tiebreak = decode_cursor(cursor)
+    after = [
+        {sort_field: {"$lt": value}},
+        {sort_field: value, TIEBREAK_FIELD: {"$lt": tiebreak}},
+    ]
+    if isinstance(value, datetime):
+        # Descending BSON order puts dates above strings, so every string-dated document is still to come
+        after.append({sort_field: {"$type": "string"}})
+    return {"$or": after}
+
+
+def page_query(base_query: dict, sort_field: str, cursor: Optional[str]) -> dict:
+    if not cursor:
+        return base_query
+    clauses = [clause for clause in (base_query, after_cursor_filter(sort_field, cursor)) if clause]
+    return {"$and": clauses} if len(clauses) > 1 else clauses[0]
+
+
+def page_size(limit: Optional[int]) -> int:
+    return min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+
+
+async def fetch_page(collection, base_query: dict, sort_field: str, cursor: Optional[str],
+                     limit: Optional[int], projection: Optional[dict] = None) -> Tuple[list, Optional[str]]:
+    """One page, newest first, and the cursor of the next page (None on the last page)"""
+    size = page_size(limit)
+    projection = {"_id": 0, **(projection or {})}
+    documents = await collection.find(page_query(base_query, sort_field, cursor), projection).sort(
+        [(sort_field, -1), (TIEBREAK_FIELD, -1)]
+    ).limit(size + 1).to_list(size + 1)
+    next_cursor = encode_cursor(documents[size - 1], sort_field) if len(documents) > size else None
+    return documents[:size], next_cursor
@@ -0,0 +1,139 @@
+"""Pending cities - custom-location orders grouped per town, kept up to date as orders come in
+
+Every order placed with a custom location ("Others" + a typed city) counts towards one
+pending_cities document per town (keyed like city suggestions, see utils/city_index.city_match_key).
+The document holds the order count, the first and last order dates and a suggested delivery charge
+from the first order's distance. Approving the city removes it. /admin/pending-cities reads the
+collection with a single indexed query; rebuild_pending_cities() recomputes it from the orders
+into a new collection and swaps it in, so readers never see it half built.
+"""
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from distance_calculator import get_delivery_charge_from_distance
+from .city_index import city_match_key
+
+logger = logging.getLogger(__name__)
+
+PENDING_CITIES_COLLECTION = "pending_cities"
+PENDING_CITY_FIELDS = {"_id": 0, "match_key": 0, "order_ids": 0}
+# One document per town, listed oldest first - also built on every rebuilt collection
+PENDING_CITY_INDEXES = [
+    ([("match_key", 1)], {"name": "match_key", "unique": True}),
+    ([("first_order_date", 1)], {"name": "first_order_date"}),
+]
+
+
+def suggested_charge(distance_km: Optional[float], order_charge: Optional[float]) -> Optional[float]:
+    """Distance tier charge when the distance is known, otherwise what the order was charged"""
+    if distance_km:
+        return get_delivery_charge_from_distance(distance_km)
+    return order_charge
+
+
+async def record_custom_city_order(db, order: dict) -> bool:
+    """Count a custom-location order towards its town; False if it was already counted"""
+    city, state = order.get("custom_city"), order.get("custom_state")
+    if not city:
+        return False
+    created_at = order.get("created_at") or datetime.now(timezone.utc).isoformat()
+    try:
+        await db[PENDING_CITIES_COLLECTION].update_one(
+            {"match_key": city_match_key(city, state), "order_ids": {"$ne": order["order_id"]}},
+            {
+                "$setOnInsert": {
+                    "city_name": city,
+                    "state_name": state,
+                    "distance_km": order.get("distance_from_guntur"),
+                    "suggested_charge": suggested_charge(order.get("distance_from_guntur"), order.get("delivery_charge")),
+                    "first_order_date": created_at
+                },
+                "$inc": {"order_count": 1},
+                "$max": {"last_order_date": created_at},
+                "$push": {"order_ids": order["order_id"]}
+            },
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # The town exists and already lists this order (a retried post-commit step)
+        return False
+
+
+async def remove_pending_city(db, city: str, state: str):
+    """The city was approved - it no longer waits for a delivery charge"""
+    await db[PENDING_CITIES_COLLECTION].delete_one({"match_key": city_match_key(city, state)})
+
+
+async def mark_suggestion_status(db, city: str, state: str, status: str):
+    """Show the status of the town's customer suggestion next to its pending orders"""
+    await db[PENDING_CITIES_COLLECTION].update_one(
+        {"match_key": city_match_key(city, state)}, {"$set": {"suggestion_status": status}}
+    )
+
+
+async def list_pending_cities(db) -> List[dict]:
+    return await db[PENDING_CITIES_COLLECTION].find({}, PENDING_CITY_FIELDS).sort("first_order_date", 1).to_list(None)
+
+
+async def rebuild_pending_cities(db, served_keys: set) -> int:
+    """
+    Recompute the collection from the orders; served_keys are match keys of stored locations.
+    MongoDB groups by exact spelling, then spellings of one town are merged here.
+    """
+    groups = await db.orders.aggregate([
+        {"$match": {"is_custom_location": True, "custom_city": {"$nin": [None, ""]}}},
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            "_id": {"city": "$custom_city", "state": "$custom_state"},
+            "distance_km": {"$first": "$distance_from_guntur"},
+            "delivery_charge": {"$first": "$delivery_charge"},
+            "first_order_date": {"$first": "$created_at"},
+            "last_order_date": {"$last": "$created_at"},
+            "order_count": {"$sum": 1},
+            "order_ids": {"$push": "$order_id"}
+        }},
+        {"$sort": {"first_order_date": 1}}
+    ]).to_list(None)
+
+    towns = {}
+    for group in groups:
+        city, state = group["_id"].get("city"), group["_id"].get("state")
+        key = city_match_key(city, state)
+        if key in served_keys:
+            continue
+        town = towns.get(key)
+        if town is None:
+            towns[key] = {
+                "match_key": key,
+                "city_name": city,
+                "state_name": state,
+                "distance_km": group["distance_km"],
+                "suggested_charge": suggested_charge(group["distance_km"], group["delivery_charge"]),
+                "first_order_date": group["first_order_date"],
+                "last_order_date": group["last_order_date"],
+                "order_count": group["order_count"],
+                "order_ids": group["order_ids"]
+            }
+        else:
+            town["order_count"] += group["order_count"]
+            town["order_ids"] += group["order_ids"]
+            town["last_order_date"] = max(town["last_order_date"], group["last_order_date"], key=str)
+
+    # Fill a fresh collection, then rename it over the live one in a single step
+    rebuilt = db[f"{PENDING_CITIES_COLLECTION}_rebuild_{uuid.uuid4().hex[:8]}"]
+    try:
+        for keys, options in PENDING_CITY_INDEXES:
+            await rebuilt.create_index(keys, **options)
+        if towns:
+            await rebuilt.insert_many(list(towns.values()))
+        await rebuilt.rename(PENDING_CITIES_COLLECTION, dropTarget=True)
+    except Exception:
+        await rebuilt.drop()
+        raise
+    logger.info(f"🏙️ Rebuilt pending cities: {len(towns)} towns from {sum(group['order_count'] for group in groups)} orders")
+    return len(towns)
@@ -0,0 +1,239 @@
+"""Product search - in-memory inverted index with Telugu support and prefix autocomplete
+
+Indexed fields: name, name_telugu, category, tag, description, description_telugu.
+
+Telugu words are indexed as written and also transliterated to Latin, and every Latin term
+is folded to a rough phonetic key (doubled letters, long vowels and aspirates collapsed).
+That way "laddu", "ladoo" and "లడ్డు" all reach the same products, and so do "chekkalu"
+and "chekalu".
+
+The index follows the catalog cache: when the cached product snapshot changes, only products
+whose indexed fields changed are re-indexed.
+"""
+import bisect
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# field -> weight of a match in that field
+FIELD_WEIGHTS = {
+    "name": 5.0,
+    "name_telugu": 5.0,
+    "category": 2.0,
+    "tag": 2.0,
+    "description": 1.0,
+    "description_telugu": 1.0,
+}
+# A prefix match (the word being typed) counts for less than a whole-word match
+PREFIX_FACTOR = 0.6
+MIN_PREFIX_LENGTH = 2
+
+# Letters, digits and the whole Telugu block (vowel signs and virama are marks, not \w)
+TOKEN_RE = re.compile("[\\w\u0C00-\u0C7F]+")
+TELUGU_RE = re.compile("[\u0C00-\u0C7F]")
+ZERO_WIDTH = dict.fromkeys(map(ord, "\u200b\u200c\u200d\ufeff"))
+
+# Long e and o are written as plain e and o in Latin (పూతరేకులు: pootharekulu), not as ee/oo,
+# which the phonetic rules read as i/u
+TELUGU_VOWELS = {
+    "అ": "a", "ఆ": "aa", "ఇ": "i", "ఈ": "ii", "ఉ": "u", "ఊ": "uu", "ఋ": "ru",
+    "ఎ": "e", "ఏ": "e", "ఐ": "ai", "ఒ": "o", "ఓ": "o", "ఔ": "au",
+}
+TELUGU_VOWEL_SIGNS = {
+    "ా": "aa", "ి": "i", "ీ": "ii", "ు": "u", "ూ": "uu", "ృ": "ru",
+    "ె": "e", "ే": "e", "ై": "ai", "ొ": "o", "ో": "o", "ౌ": "au",
+}
+TELUGU_CONSONANTS = {
+    "క": "k", "ఖ": "kh", "గ": "g", "ఘ": "gh", "ఙ": "ng",
+    "చ": "ch", "ఛ": "chh", "జ": "j", "ఝ": "jh", "ఞ": "ny",
+    "ట": "t", "ఠ": "th", "డ": "d", "ఢ": "dh", "ణ": "n",
+    "త": "t", "థ": "th", "ద": "d", "ధ": "dh", "న": "n",
+    "ప": "p", "ఫ": "ph", "బ": "b", "భ": "bh", "మ": "m",
+    "య": "y", "ర": "r", "ఱ": "r", "ల": "l", "ళ": "l", "వ": "v",
+    "శ": "sh", "ష": "sh", "స": "s", "హ": "h",
+}
+TELUGU_OTHER = {"ః": "h", "ఁ": "n"}
+TELUGU_ANUSVARA = "ం"
+TELUGU_LABIALS = set("పఫబభమ")
+TELUGU_VIRAMA = "్"
+TELUGU_DIGITS = {chr(0x0C66 + digit): str(digit) for digit in range(10)}
+
+# Applied in order to Latin text - spelling variants that mean the same sound
+PHONETIC_RULES = [
+    (re.compile(r"chh"), "ch"),
+    (re.compile(r"([kgjtdpb])h"), r"\1"),
+    (re.compile(r"sh"), "s"),
+    (re.compile(r"ck|q"), "k"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"ee|ii|y(?=[^aeiou]|$)"), "i"),
+    (re.compile(r"oo|uu"), "u"),
+    (re.compile(r"aa"), "a"),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+
+
+def transliterate_telugu(word: str) -> str:
+    """Telugu script to plain Latin letters (inherent 'a' handled, no diacritics)"""
+    out = []
+    pending_a = False
+    for position, char in enumerate(word):
+        if char in TELUGU_VOWEL_SIGNS:
+            out.append(TELUGU_VOWEL_SIGNS[char])
+            pending_a = False
+            continue
+        if char == TELUGU_VIRAMA:
+            pending_a = False
+            continue
+        if pending_a:
+            out.append("a")
+            pending_a = False
+        if char in TELUGU_CONSONANTS:
+            out.append(TELUGU_CONSONANTS[char])
+            pending_a = True
+        elif char in TELUGU_VOWELS:
+            out.append(TELUGU_VOWELS[char])
+        elif char == TELUGU_ANUSVARA:
+            # Sounds as m before p/b/m and at the end of a word, n elsewhere (సున్నుండలు: sunnundalu)
+            following = word[position + 1:position + 2]
+            out.append("n" if following and following not in TELUGU_LABIALS else "m")
+        elif char in TELUGU_OTHER:
+            out.append(TELUGU_OTHER[char])
+        elif char in TELUGU_DIGITS:
+            out.append(TELUGU_DIGITS[char])
+        elif char.isascii():
+            out.append(char)
+    if pending_a:
+        out.append("a")
+    return "".join(out)
+
+
+def phonetic_key(word: str) -> str:
+    for pattern, replacement in PHONETIC_RULES:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Normalized words of a text: NFC, lowercase, zero-width joiners removed"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFC", str(text)).translate(ZERO_WIDTH).lower()
+    return TOKEN_RE.findall(text)
+
+
+def index_terms(word: str) -> Set[str]:
+    """Terms a word is indexed (and searched) under"""
+    if TELUGU_RE.search(word):
+        latin = transliterate_telugu(word)
+        return {word, phonetic_key(latin)} if latin else {word}
+    return {phonetic_key(word)}
+
+
+class ProductSearchIndex:
+    """Inverted index term -> {product_id: weight}, kept in step with a product snapshot"""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._product_terms: Dict[str, Set[str]] = {}
+        self._fingerprints: Dict[str, Tuple] = {}
+        self._sorted_terms: List[str] = []
+        self._terms_dirty = False
+        self._synced_source = None
+        self.stats = {"syncs": 0, "reindexed": 0, "removed": 0, "queries": 0}
+
+    @staticmethod
+    def _fingerprint(product: dict) -> Tuple:
+        return tuple(product.get(field) for field in FIELD_WEIGHTS)
+
+    def sync(self, products_by_id: Dict[str, dict]):
+        """Re-index products whose indexed fields changed and drop deleted ones"""
+        if products_by_id is self._synced_source:
+            return
+        self.stats["syncs"] += 1
+        for product_id in set(self._fingerprints) - set(products_by_id):
+            self.remove(product_id)
+        for product_id, product in products_by_id.items():
+            if self._fingerprints.get(product_id) != self._fingerprint(product):
+                self.upsert(product)
+        self._synced_source = products_by_id
+
+    def upsert(self, product: dict):
+        product_id = product["id"]
+        self.remove(product_id, count=False)
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for word in tokenize(product.get(field)):
+                for term in index_terms(word):
+                    weights[term] = max(weights.get(term, 0.0), weight)
+        for term, weight in weights.items():
+            self._postings.setdefault(term, {})[product_id] = weight
+        self._product_terms[product_id] = set(weights)
+        self._fingerprints[product_id] = self._fingerprint(product)
+        self._terms_dirty = True
+        self.stats["reindexed"] += 1
+
+    def remove(self, product_id: str, count: bool = True):
+        for term in self._product_terms.pop(product_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[term]
+        if self._fingerprints.pop(product_id, None) is not None and count:
+            self.stats["removed"] += 1
+        self._terms_dirty = True
+
+    def _terms_with_prefix(self, prefix: str) -> Iterable[str]:
+        if self._terms_dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+        terms = self._sorted_terms
+        for position in range(bisect.bisect_left(terms, prefix), len(terms)):
+            if not terms[position].startswith(prefix):
+                break
+            yield terms[position]
+
+    def _word_scores(self, word: str, allow_prefix: bool) -> Dict[str, float]:
+        """Best score per product for one query word (whole-word or, for the last word, prefix)"""
+        scores: Dict[str, float] = {}
+        for term in index_terms(word):
+            for product_id, weight in self._postings.get(term, {}).items():
+                scores[product_id] = max(scores.get(product_id, 0.0), weight)
+            if allow_prefix and len(term) >= MIN_PREFIX_LENGTH:
+                for prefixed in self._terms_with_prefix(term):
+                    if prefixed == term:
+                        continue
+                    for product_id, weight in self._postings[prefixed].items():
+                        scores[product_id] = max(scores.get(product_id, 0.0), weight * PREFIX_FACTOR)
+        return scores
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """
+        (product_id, score) best first. Every word must match, the last one as a prefix
+        (search-as-you-type); if nothing matches all words, products matching the most
+        words are returned instead.
+        """
+        self.stats["queries"] += 1
+        words = tokenize(query)
+        if not words:
+            return []
+        per_word = [self._word_scores(word, allow_prefix=(index == len(words) - 1)) for index, word in enumerate(words)]
+
+        totals: Dict[str, float] = {}
+        matched: Dict[str, int] = {}
+        for scores in per_word:
+            for product_id, score in scores.items():
+                totals[product_id] = totals.get(product_id, 0.0) + score
+                matched[product_id] = matched.get(product_id, 0) + 1
+        if not totals:
+            return []
+
+        best = max(matched.values())
+        ranked = sorted(
+            ((product_id, score) for product_id, score in totals.items() if matched[product_id] == best),
+            key=lambda pair: (-pair[1], pair[0])
+        )
+        return ranked[:limit]
+
+    def status(self) -> dict:
+        return {"products": len(self._product_terms), "terms": len(self._postings), **self.stats}
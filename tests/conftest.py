@@ -0,0 +1,53 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+
+# The backend is not an installed package; its modules import each other as top-level names
+sys.path.insert(0, BACKEND_DIR)
+
+@pytest.fixture(scope="session")
+def fake_razorpay_url():
+    """fake_razorpay.py served on a free local port for the whole session"""
+    uvicorn = pytest.importorskip("uvicorn")
+    import fake_razorpay
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(fake_razorpay.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            pytest.fail("fake Razorpay server did not start")
+        time.sleep(0.02)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join(5)
+
+
+@pytest.fixture(scope="session")
+def api(fake_razorpay_url):
+    """
+    TestClient over the real app with an in-memory MongoDB and the gateway pointed at the
+    fake Razorpay server. Started once: the app's background components run until the session ends.
+    """
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from fastapi.testclient import TestClient
+
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "test")
+    import server
+    from utils.payment_gateway import RazorpayGateway
+
+    server.db = mongomock_motor.AsyncMongoMockClient()["test"]
+    server.payment_gateway = RazorpayGateway("rzp_test_key", "rzp_test_secret", base_url=fake_razorpay_url)
+    with TestClient(server.app) as client:
+        yield client
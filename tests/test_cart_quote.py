@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.cart_quote import (
+    INSUFFICIENT_INVENTORY,
+    NOT_FOUND,
+    NOT_IN_CITY,
+    OUT_OF_STOCK,
+    WEIGHT_UNAVAILABLE,
+    CatalogCache,
+    CatalogSnapshot,
+    location_key,
+    quote_cart,
+)
+
+NOW = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def snapshot(products, locations=()):
+    return CatalogSnapshot(
+        products_by_id={product["id"]: product for product in products},
+        locations_by_key={location_key(location["name"], location["state"]): location for location in locations},
+        versions=(0, 0),
+        loaded_at=0.0,
+    )
+
+
+def product(product_id, **fields):
+    return {"id": product_id, "name": product_id.title(), "prices": [{"weight": "250g", "price": 100},
+                                                                    {"weight": "500g", "price": 190}], **fields}
+
+
+def item(product_id, quantity=1, weight="250g"):
+    return {"product_id": product_id, "weight": weight, "quantity": quantity}
+
+
+GUNTUR = {"name": "Guntur", "state": "Andhra Pradesh", "charge": 49, "free_delivery_threshold": 1000}
+
+
+def test_quote_prices_lines_and_delivery():
+    quote = quote_cart([item("ariselu", 2), item("ariselu", 1, "500g")], "guntur", "ANDHRA PRADESH", False,
+                       snapshot([product("ariselu")], [GUNTUR]), NOW)
+
+    assert [line.line_total for line in quote.lines] == [200.0, 190.0]
+    assert quote.subtotal == 390.0
+    assert quote.delivery_charge == 49.0
+    assert quote.total == 439.0
+    assert quote.location_found and not quote.custom_city_request
+    assert quote.all_available
+
+
+def test_quote_free_delivery_over_threshold():
+    quote = quote_cart([item("ariselu", 10)], "Guntur", "Andhra Pradesh", False,
+                       snapshot([product("ariselu")], [GUNTUR]), NOW)
+
+    assert quote.free_delivery_applied
+    assert quote.delivery_charge == 0.0
+    assert quote.total == 1000.0
+
+
+def test_quote_active_discount_only():
+    active = product("ariselu", discount_percentage=10, discount_expiry_date="2025-06-01")
+    expired = product("boondi", discount_percentage=10, discount_expiry_date="2025-05-31T23:59:59Z")
+
+    quote = quote_cart([item("ariselu"), item("boondi")], "Guntur", "Andhra Pradesh", False,
+                       snapshot([active, expired], [GUNTUR]), NOW)
+
+    assert [(line.unit_price, line.original_unit_price) for line in quote.lines] == [(90.0, 100.0), (100.0, 100.0)]
+
+
+def test_quote_reports_unavailable_lines():
+    products = [
+        product("ariselu", available_cities=["Vijayawada"]),
+        product("boondi", out_of_stock=True),
+        product("chakralu", inventory_count=3),
+        product("kajjikayalu", inventory_count=1, flash_sale=True),
+    ]
+    items = [item("missing"), item("ariselu"), item("boondi"), item("boondi", weight="1kg"),
+             item("chakralu", 2), item("chakralu", 2, "500g"), item("kajjikayalu", 5)]
+
+    quote = quote_cart(items, "Guntur", "Andhra Pradesh", False, snapshot(products, [GUNTUR]), NOW)
+
+    assert [line.reason for line in quote.lines] == [
+        NOT_FOUND, NOT_IN_CITY, OUT_OF_STOCK, WEIGHT_UNAVAILABLE,
+        INSUFFICIENT_INVENTORY, INSUFFICIENT_INVENTORY, None,
+    ]
+    assert quote.lines[4].available_quantity == 3
+    # Flash-sale stock is only known when it is reserved, so it is priced
+    assert quote.subtotal == 500.0
+    assert not quote.all_available
+    assert len(quote.unavailable) == 6
+
+
+def test_quote_unknown_city_is_a_custom_request():
+    catalog = snapshot([product("ariselu")], [GUNTUR])
+
+    unknown = quote_cart([item("ariselu")], "Tenali", "Andhra Pradesh", False, catalog, NOW)
+    custom = quote_cart([item("ariselu")], "Tenali", "Andhra Pradesh", True, catalog, NOW)
+    wrong_state = quote_cart([item("ariselu")], "Guntur", "Telangana", False, catalog, NOW)
+
+    assert unknown.custom_city_request and not unknown.location_found and unknown.delivery_charge == 0.0
+    assert not custom.custom_city_request
+    assert wrong_state.custom_city_request
+
+
+def test_catalog_cache_reloads_when_version_moves():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+    cache = CatalogCache("locations_version", check_interval=0, max_age=60)
+    cache.start(db)
+
+    async def run():
+        await db.products.insert_one(product("ariselu"))
+        first = await cache.snapshot()
+        await db.products.insert_one(product("boondi"))
+        unchanged = await cache.snapshot()
+        await db.settings.insert_one({"key": "products_version", "version": 1})
+        reloaded = await cache.snapshot()
+        return first, unchanged, reloaded
+
+    first, unchanged, reloaded = asyncio.run(run())
+
+    assert unchanged is first
+    assert set(reloaded.products_by_id) == {"ariselu", "boondi"}
+    assert cache.stats["reloads"] == 2
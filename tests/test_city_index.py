@@ -0,0 +1,106 @@
+import pytest
+
+from utils.city_index import CityIndex, city_keys, city_match_key, max_typos, normalize_city
+
+LOCATIONS = [
+    {"name": "Guntur", "state": "Andhra Pradesh"},
+    {"name": "Gudivada", "state": "Andhra Pradesh"},
+    {"name": "Gudur", "state": "Andhra Pradesh"},
+    {"name": "Tenali", "state": "Andhra Pradesh"},
+    {"name": "Tenali", "state": "Andhra Pradesh"},
+    {"name": "Vijayawada", "state": "Andhra Pradesh"},
+    {"name": "Sadashivpet", "state": "Telangana"},
+    {"name": "Sadasivpet", "state": "Telangana"},
+    {"name": "Zaheerabad", "state": "Telangana"},
+]
+
+
+@pytest.fixture
+def index():
+    city_index = CityIndex()
+    city_index.build(LOCATIONS, alias_names=["Zahirabad", "Vijayavada", "Guntur"])
+    return city_index
+
+
+def names(results):
+    return [result["name"] for result in results]
+
+
+def test_normalize_and_keys():
+    assert normalize_city("  Sri  Kalahasti-2 ") == "sri kalahasti"
+    assert city_keys("Zaheerabad") == ["zaheerabad", "zahirabad"]
+    assert city_keys("Guntur") == ["guntur"]
+    assert city_keys("!!") == []
+    assert [max_typos(length) for length in (3, 4, 7, 8)] == [0, 1, 1, 2]
+
+
+def test_search_exact_then_prefix(index):
+    assert [(r["name"], r["match"]) for r in index.search("Guntur")] == [("Guntur", "exact")]
+    assert names(index.search("gu")) == ["Gudur", "Guntur", "Gudivada"]
+    assert all(result["match"] == "prefix" for result in index.search("gu"))
+    assert index.search("") == []
+    assert index.search("xyz") == []
+
+
+def test_search_fuzzy_within_typo_budget(index):
+    [result] = index.search("guntru")
+    assert (result["name"], result["match"], result["distance"]) == ("Guntur", "fuzzy", 1)
+    assert names(index.search("vijyawada")) == ["Vijayawada"]
+    # Too short for a typo
+    assert index.search("gnu") == []
+
+
+def test_search_spelling_variants_and_aliases(index):
+    [result] = index.search("zahirabad")
+    assert result["name"] == "Zaheerabad"
+    assert result["match"] == "exact"
+    assert result["aliases"] == ["Zahirabad"]
+    # Two stored spellings of one town are listed once
+    assert len(index.search("sadashiv")) == 1
+    # Duplicate locations are indexed once
+    assert names(index.search("tenali")) == ["Tenali"]
+    assert index.status() == {"locations": 8}
+
+
+def test_search_state_filter(index):
+    assert index.search("gu", state="telangana") == []
+    assert names(index.search("za", state="TELANGANA")) == ["Zaheerabad"]
+
+
+def test_sync_rebuilds_only_for_a_new_source():
+    city_index = CityIndex()
+    source = object()
+    city_index.sync(source, lambda: LOCATIONS[:1])
+    city_index.sync(source, lambda: LOCATIONS)
+    assert city_index.status() == {"locations": 1}
+    city_index.sync(object(), lambda: LOCATIONS)
+    assert city_index.status() == {"locations": 8}
+
+
+@pytest.mark.parametrize("name, state, expected", [
+    ("Guntur", None, "Guntur"),
+    ("guntoor", "Andhra Pradesh", "Guntur"),
+    ("Zahirabad", "Telangana", "Zaheerabad"),
+    ("Tenaly", "Andhra Pradesh", "Tenali"),
+    ("Vijaywada", "Andhra Pradesh", "Vijayawada"),
+    # Wrong state, too short for a typo, or nothing close
+    ("Vijaywada", "Telangana", None),
+    ("Gudr", "Andhra Pradesh", None),
+    ("Hyderabad", None, None),
+])
+def test_resolve(index, name, state, expected):
+    resolved = index.resolve(name, state)
+    assert (resolved["name"] if resolved else None) == expected
+
+
+def test_resolve_refuses_ambiguous_typos():
+    city_index = CityIndex()
+    city_index.build([{"name": "Bapatla", "state": "Andhra Pradesh"}, {"name": "Bapatna", "state": "Andhra Pradesh"}])
+    assert city_index.resolve("Bapatma", "Andhra Pradesh") is None
+    assert city_index.resolve("Bapatla", "Andhra Pradesh")["name"] == "Bapatla"
+
+
+def test_city_match_key():
+    assert city_match_key("Sadashivpet", "Telangana ") == city_match_key("Sadasivpet", "telangana")
+    assert city_match_key("Guntur", "Andhra Pradesh") != city_match_key("Guntur", "Telangana")
+    assert city_match_key("", None) == "|"
@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.jobs import CronSchedule, IntervalSchedule, JobScheduler, _parse_cron_field
+
+
+def at(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("text, low, high, expected", [
+    ("*", 0, 5, {0, 1, 2, 3, 4, 5}),
+    ("*/15", 0, 59, {0, 15, 30, 45}),
+    ("1-5", 0, 7, {1, 2, 3, 4, 5}),
+    ("1-10/3", 0, 59, {1, 4, 7, 10}),
+    ("50/5", 0, 59, {50, 55}),
+    ("1,3,5-6", 0, 7, {1, 3, 5, 6}),
+])
+def test_parse_cron_field(text, low, high, expected):
+    assert _parse_cron_field(text, low, high) == expected
+
+
+@pytest.mark.parametrize("text", ["60", "5-1", "*/0", "x", "-1"])
+def test_parse_cron_field_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        _parse_cron_field(text, 0, 59)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "* * * * * *", "0 24 * * *", "0 0 0 * *", "0 0 * 13 *"])
+def test_cron_schedule_rejects_invalid(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_cron_next_after_steps_and_rollover():
+    every_five = CronSchedule("*/5 * * * *")
+    assert every_five.next_after(at(2025, 1, 1, 10, 2, 30)) == at(2025, 1, 1, 10, 5)
+    assert every_five.next_after(at(2025, 1, 1, 10, 5)) == at(2025, 1, 1, 10, 10)
+
+    nightly = CronSchedule("30 2 * * *")
+    assert nightly.next_after(at(2025, 12, 31, 3, 0)) == at(2026, 1, 1, 2, 30)
+
+    leap_day = CronSchedule("0 0 29 2 *")
+    assert leap_day.next_after(at(2025, 3, 1)) == at(2028, 2, 29)
+
+
+def test_cron_weekday_numbers():
+    # 2025-01-01 is a Wednesday; both 0 and 7 mean Sunday
+    assert CronSchedule("0 9 * * 0").next_after(at(2025, 1, 1)) == at(2025, 1, 5, 9, 0)
+    assert CronSchedule("0 9 * * 7").next_after(at(2025, 1, 1)) == at(2025, 1, 5, 9, 0)
+    assert CronSchedule("0 9 * * 1-5").next_after(at(2025, 1, 3, 10, 0)) == at(2025, 1, 6, 9, 0)
+
+
+def test_cron_day_of_month_or_weekday_when_both_restricted():
+    # Like cron: the 15th of the month OR any Monday
+    schedule = CronSchedule("0 0 15 * 1")
+    assert schedule.next_after(at(2025, 1, 1)) == at(2025, 1, 6)
+    assert schedule.next_after(at(2025, 1, 13, 1, 0)) == at(2025, 1, 15)
+
+    # Only one day field restricted: the other one does not widen the match
+    assert CronSchedule("0 0 15 * *").next_after(at(2025, 1, 1)) == at(2025, 1, 15)
+
+
+def test_cron_never_matching_expression():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(at(2025, 1, 1))
+
+
+def test_interval_schedule_and_add():
+    assert IntervalSchedule(90).next_after(at(2025, 1, 1)) == at(2025, 1, 1, 0, 1, 30)
+    with pytest.raises(ValueError):
+        IntervalSchedule(0)
+
+    scheduler = JobScheduler()
+    scheduler.add("cron", lambda: None, "*/5 * * * *")
+    scheduler.add("interval", lambda: None, 60)
+    assert isinstance(scheduler.jobs["cron"].schedule, CronSchedule)
+    assert str(scheduler.jobs["interval"].schedule) == "every 60s"
@@ -0,0 +1,74 @@
+import csv
+import io
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.order_export import (
+    ORDER_EXPORT_FIELDNAMES,
+    ParquetStreamWriter,
+    encode_order_rows_csv,
+    flatten_order,
+)
+
+ORDER = {
+    "order_id": "AL-1",
+    "created_at": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    "customer_name": "Lakshmi",
+    "city": "Guntur",
+    "subtotal": "250",
+    "delivery_charge": 49,
+    "total": 299,
+    "items": [
+        {"product_id": "p1", "name": "Ariselu", "weight": "250g", "price": 100, "quantity": 2},
+        {"product_id": "p2", "name": "Boondi", "weight": "250g", "price": "50", "quantity": "1"},
+    ],
+}
+
+
+def test_flatten_order_one_row_per_item():
+    rows = flatten_order(ORDER)
+
+    assert [row["item_index"] for row in rows] == [0, 1]
+    assert [row["line_total"] for row in rows] == [200.0, 50.0]
+    assert rows[1]["quantity"] == 1
+    assert all(row["order_id"] == "AL-1" and row["order_total"] == 299.0 for row in rows)
+    assert rows[0]["created_at"] == "2025-01-02T03:04:05+00:00"
+    assert rows[0]["subtotal"] == 250.0
+    assert rows[0]["cancelled"] is False
+
+
+def test_flatten_order_without_items_keeps_the_order():
+    rows = flatten_order({"order_id": "AL-2", "total": "not a number"})
+
+    assert len(rows) == 1
+    assert rows[0]["item_index"] is None
+    assert rows[0]["order_total"] is None
+    assert set(rows[0]) == set(ORDER_EXPORT_FIELDNAMES)
+
+
+def test_encode_order_rows_csv_header_once():
+    rows = flatten_order(ORDER)
+    text = encode_order_rows_csv(rows[:1], include_header=True) + encode_order_rows_csv(rows[1:])
+
+    parsed = list(csv.DictReader(io.StringIO(text)))
+
+    assert [row["item_name"] for row in parsed] == ["Ariselu", "Boondi"]
+
+
+def test_parquet_stream_writer_streams_row_groups():
+    pq = pytest.importorskip("pyarrow.parquet")
+    writer = ParquetStreamWriter()
+
+    chunks = [writer.write_rows(flatten_order(ORDER)), writer.write_rows([]),
+              writer.write_rows(flatten_order({**ORDER, "order_id": "AL-3"})), writer.close()]
+
+    assert chunks[0].startswith(b"PAR1")
+    assert chunks[1] == b""
+    assert chunks[3].endswith(b"PAR1")
+    parquet_file = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column_names == ORDER_EXPORT_FIELDNAMES
+    assert table.column("order_id").to_pylist() == ["AL-1", "AL-1", "AL-3", "AL-3"]
+    assert table.column("line_total").to_pylist() == [200.0, 50.0, 200.0, 50.0]
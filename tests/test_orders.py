@@ -0,0 +1,110 @@
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def db(api):
+    import server
+    return server.db
+
+
+@pytest.fixture
+def product_id(api, db):
+    import server
+    product_id = f"p-{uuid.uuid4().hex[:8]}"
+    api.portal.call(db.products.insert_one, {
+        "id": product_id, "name": "Ariselu", "inventory_count": 10, "prices": [{"weight": "250g", "price": 100}]
+    })
+    api.portal.call(server.bump_products_version)
+    return product_id
+
+
+@pytest.fixture
+def place(api, product_id):
+    body = {
+        "customer_name": "Lakshmi", "email": "", "phone": "9876543210", "whatsapp_number": "9876543210",
+        "city": "Tenali", "state": "Andhra Pradesh", "location": "Tenali",
+        "items": [{"product_id": product_id, "name": "Ariselu", "image": "x", "weight": "250g", "price": 100,
+                   "quantity": 2}],
+        "subtotal": 200, "delivery_charge": 0, "total": 200,
+    }
+
+    def place(key, **changes):
+        return api.post("/api/orders", json={**body, **changes}, headers={"Idempotency-Key": key})
+    return place
+
+
+def stored_orders(api, db, key):
+    return api.portal.call(db.orders.count_documents, {"idempotency_key": key})
+
+
+def inventory(api, db, product_id):
+    return api.portal.call(db.products.find_one, {"id": product_id})["inventory_count"]
+
+
+def test_retry_replays_the_same_order(api, db, product_id, place):
+    key = uuid.uuid4().hex
+
+    first = place(key)
+    retry = place(key)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["order_id"] == first.json()["order_id"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert stored_orders(api, db, key) == 1
+    assert inventory(api, db, product_id) == 8
+
+
+def test_key_reused_for_another_request_is_refused(api, db, place):
+    key = uuid.uuid4().hex
+
+    assert place(key).status_code == 200
+    assert place(key, customer_name="Someone else").status_code == 409
+    assert stored_orders(api, db, key) == 1
+
+
+def test_failure_after_the_insert_keeps_the_order_for_the_retry(api, db, product_id, place, monkeypatch):
+    import server
+    key = uuid.uuid4().hex
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("failed after the order was stored")
+    with monkeypatch.context() as patch:
+        patch.setattr(server.order_pipeline, "submit", fail)
+        assert place(key).status_code == 500
+    retry = place(key)
+
+    assert retry.status_code == 200
+    assert retry.json()["order_id"]
+    assert stored_orders(api, db, key) == 1
+    assert inventory(api, db, product_id) == 8
+
+
+def test_unrecorded_response_does_not_place_a_second_order(api, db, product_id, place, monkeypatch):
+    import server
+    key = uuid.uuid4().hex
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("idempotency store unavailable")
+    with monkeypatch.context() as patch:
+        patch.setattr(server.idempotency_store, "complete", fail)
+        first = place(key)
+    # The key is still claimed; once its lease runs out a retry takes it over
+    monkeypatch.setattr(server.idempotency_store, "lease_seconds", 0)
+    retry = place(key)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["order_id"] == first.json()["order_id"]
+    assert stored_orders(api, db, key) == 1
+    assert inventory(api, db, product_id) == 8
+
+
+def test_failure_before_the_insert_releases_the_key(api, db, place):
+    key = uuid.uuid4().hex
+
+    missing = {"product_id": "no-such-product", "name": "Gone", "image": "x", "weight": "250g", "price": 100,
+               "quantity": 1}
+    assert place(key, items=[missing]).status_code == 400
+    assert stored_orders(api, db, key) == 0
+    assert api.portal.call(db.idempotency_keys.find_one, {"_id": f"orders:{key}"}) is None
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.pagination import (
+    MAX_PAGE_SIZE,
+    InvalidCursor,
+    date_range_filter,
+    decode_cursor,
+    encode_cursor,
+    fetch_page,
+    page_query,
+    page_size,
+)
+
+
+def test_cursor_round_trip():
+    when = datetime(2025, 3, 4, 5, 6, 7, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor({"created_at": when, "id": "b"}, "created_at")) == (when, "b")
+    assert decode_cursor(encode_cursor({"created_at": "2025-03-04T05:06:07", "id": "a"}, "created_at")) == (
+        "2025-03-04T05:06:07", "a")
+    assert decode_cursor(encode_cursor({"id": None}, "created_at")) == (None, None)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({"created_at": "x" * 40, "id": "ü?/+"}, "created_at")
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "e30", encode_cursor({"id": 1}, "x")[:-3]])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_page_query_and_size():
+    assert page_query({"status": "New"}, "created_at", None) == {"status": "New"}
+    cursor = encode_cursor({"created_at": "2025-01-01", "id": "a"}, "created_at")
+    assert page_query({}, "created_at", cursor) == {"$or": [
+        {"created_at": {"$lt": "2025-01-01"}},
+        {"created_at": "2025-01-01", "id": {"$lt": "a"}},
+    ]}
+    assert list(page_query({"status": "New"}, "created_at", cursor)) == ["$and"]
+    assert [page_size(limit) for limit in (None, -5, 10, 10_000)] == [50, 1, 10, MAX_PAGE_SIZE]
+
+
+def test_date_range_filter_matches_strings_and_dates():
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2025, 2, 1, tzinfo=timezone.utc)
+
+    assert date_range_filter("created_at", None, None) == {}
+    assert date_range_filter("created_at", "2025-01-01", "2025-01-31") == {"$or": [
+        {"created_at": {"$gte": start.isoformat(), "$lt": end.isoformat()}},
+        {"created_at": {"$gte": start, "$lt": end}},
+    ]}
+    # A full timestamp as date_to is an exact bound
+    assert date_range_filter("created_at", None, "2025-02-01T00:00:00Z")["$or"][1] == {"created_at": {"$lt": end}}
+    with pytest.raises(ValueError):
+        date_range_filter("created_at", "yesterday", None)
+
+
+def test_fetch_page_walks_every_document_once():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    collection = mongomock_motor.AsyncMongoMockClient()["test"]["reports"]
+    # Ties on created_at are split by id
+    documents = [{"id": f"r{n:02d}", "created_at": f"2025-01-{n // 3 + 1:02d}T00:00:00"} for n in range(10)]
+
+    async def run():
+        await collection.insert_many([dict(document) for document in documents])
+        pages, cursor = [], None
+        while True:
+            page, cursor = await fetch_page(collection, {}, "created_at", cursor, 4)
+            pages.append([document["id"] for document in page])
+            if cursor is None:
+                return pages
+
+    pages = asyncio.run(run())
+
+    assert [len(page) for page in pages] == [4, 4, 2]
+    assert sum(pages, []) == [document["id"] for document in reversed(documents)]
@@ -0,0 +1,167 @@
+import hashlib
+import hmac
+import json
+import uuid
+
+import httpx
+import pytest
+
+VERIFY_URL = "/api/payment/verify-razorpay-payment"
+
+
+def signature(razorpay_order_id, razorpay_payment_id):
+    import server
+    message = f"{razorpay_order_id}|{razorpay_payment_id}".encode()
+    return hmac.new(server.payment_gateway.key_secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def gateway(fake_razorpay_url):
+    """Direct calls to the fake gateway, standing in for the customer's browser"""
+    with httpx.Client(base_url=fake_razorpay_url, auth=("rzp_test_key", "")) as client:
+        yield client
+
+
+@pytest.fixture
+def db(api):
+    import server
+    return server.db
+
+
+@pytest.fixture
+def order_id(api, db):
+    order_id = f"AL-{uuid.uuid4().hex[:8]}"
+    api.portal.call(db.orders.insert_one, {
+        "order_id": order_id, "payment_status": "pending", "order_status": "pending", "total": 150.5, "email": ""
+    })
+    return order_id
+
+
+def find_order(api, db, order_id):
+    return api.portal.call(db.orders.find_one, {"order_id": order_id}, {"_id": 0})
+
+
+def pay(api, gateway, order_id):
+    """Create the gateway order for order_id and capture a payment on it"""
+    response = api.post("/api/payment/create-razorpay-order", json={"order_id": order_id})
+    assert response.status_code == 200
+    razorpay_order_id = response.json()["razorpay_order_id"]
+    payment = gateway.post(f"/orders/{razorpay_order_id}/pay").json()
+    return razorpay_order_id, payment["id"]
+
+
+def verify(api, order_id, razorpay_order_id, razorpay_payment_id):
+    return api.post(VERIFY_URL, json={
+        "order_id": order_id,
+        "razorpay_order_id": razorpay_order_id,
+        "razorpay_payment_id": razorpay_payment_id,
+        "razorpay_signature": signature(razorpay_order_id, razorpay_payment_id),
+    })
+
+
+def test_gateway_order_is_for_the_order_total(api, db, gateway, order_id):
+    razorpay_order_id, _ = pay(api, gateway, order_id)
+
+    assert gateway.get(f"/orders/{razorpay_order_id}").json()["amount"] == 15050
+    stored = find_order(api, db, order_id)
+    assert stored["razorpay_order_id"] == razorpay_order_id
+    assert stored["payment_amount"] == 15050
+
+
+def test_payment_is_applied_once(api, db, gateway, order_id):
+    razorpay_order_id, payment_id = pay(api, gateway, order_id)
+
+    first = verify(api, order_id, razorpay_order_id, payment_id)
+    retry = verify(api, order_id, razorpay_order_id, payment_id)
+
+    assert first.status_code == 200 and first.json()["message"] == "Payment verified successfully"
+    assert retry.status_code == 200 and retry.json()["message"] == "Payment already verified"
+    stored = find_order(api, db, order_id)
+    assert stored["payment_status"] == "completed"
+    assert stored["razorpay_payment_id"] == payment_id
+    event = api.portal.call(db.payment_events.find_one, {"_id": payment_id})
+    assert event["status"] == "applied"
+
+
+def test_second_payment_for_a_paid_order_needs_a_refund(api, db, gateway, order_id):
+    verify(api, order_id, *pay(api, gateway, order_id))
+    razorpay_order_id = gateway.post("/orders", json={"amount": 15050, "notes": {"order_id": order_id}}).json()["id"]
+    second_payment = gateway.post(f"/orders/{razorpay_order_id}/pay").json()["id"]
+
+    response = verify(api, order_id, razorpay_order_id, second_payment)
+    repeat = verify(api, order_id, razorpay_order_id, second_payment)
+
+    assert response.status_code == 409
+    assert repeat.status_code == 409
+    stored = find_order(api, db, order_id)
+    assert stored["refund_required"] is True
+    assert stored["late_payment_ids"] == [second_payment]
+
+
+def test_payment_for_another_amount_is_rejected(api, db, gateway, order_id):
+    response = api.post("/api/payment/create-razorpay-order", json={"amount": 1})
+    razorpay_order_id = response.json()["razorpay_order_id"]
+    payment_id = gateway.post(f"/orders/{razorpay_order_id}/pay").json()["id"]
+
+    assert verify(api, order_id, razorpay_order_id, payment_id).status_code == 400
+    assert find_order(api, db, order_id)["payment_status"] == "pending"
+
+
+def test_gateway_order_pays_for_one_order_only(api, db, gateway, order_id):
+    razorpay_order_id, payment_id = pay(api, gateway, order_id)
+    other_order_id = f"AL-{uuid.uuid4().hex[:8]}"
+    api.portal.call(db.orders.insert_one, {
+        "order_id": other_order_id, "payment_status": "pending", "order_status": "pending", "total": 150.5
+    })
+
+    assert verify(api, other_order_id, razorpay_order_id, payment_id).status_code == 400
+    assert find_order(api, db, other_order_id)["payment_status"] == "pending"
+    assert verify(api, order_id, razorpay_order_id, payment_id).status_code == 200
+
+
+def test_payment_for_a_cancelled_order_needs_a_refund(api, db, gateway, order_id):
+    razorpay_order_id, payment_id = pay(api, gateway, order_id)
+    api.portal.call(db.orders.update_one, {"order_id": order_id},
+                    {"$set": {"cancelled": True, "payment_status": "cancelled"}})
+
+    assert verify(api, order_id, razorpay_order_id, payment_id).status_code == 409
+    assert find_order(api, db, order_id)["late_payment_ids"] == [payment_id]
+
+
+def test_bad_signature_and_unknown_order(api, gateway, order_id):
+    razorpay_order_id, payment_id = pay(api, gateway, order_id)
+
+    forged = api.post(VERIFY_URL, json={
+        "order_id": order_id, "razorpay_order_id": razorpay_order_id,
+        "razorpay_payment_id": payment_id, "razorpay_signature": "0" * 64,
+    })
+    assert forged.status_code == 400
+    assert verify(api, "AL-missing", razorpay_order_id, payment_id).status_code == 404
+    # Neither attempt used up the payment
+    assert verify(api, order_id, razorpay_order_id, payment_id).status_code == 200
+
+
+def test_gateway_order_created_elsewhere_is_fetched(api, db, gateway, order_id):
+    # Not created through our endpoint: the record comes from the gateway and its notes
+    razorpay_order_id = gateway.post("/orders", json={"amount": 15050, "notes": {"order_id": order_id}}).json()["id"]
+    payment_id = gateway.post(f"/orders/{razorpay_order_id}/pay").json()["id"]
+
+    assert verify(api, order_id, razorpay_order_id, payment_id).status_code == 200
+    record = api.portal.call(db.razorpay_orders.find_one, {"_id": razorpay_order_id})
+    assert record["order_id"] == order_id and record["amount"] == 15050
+
+
+def test_webhook_applies_the_payment_of_its_gateway_order(api, db, gateway, order_id, monkeypatch):
+    monkeypatch.setenv("RAZORPAY_WEBHOOK_SECRET", "webhook_secret")
+    razorpay_order_id, payment_id = pay(api, gateway, order_id)
+    # Checkout-created gateway orders carry no notes: the order is found through the stored binding
+    body = json.dumps({"event": "payment.captured", "payload": {"payment": {"entity": {
+        "id": payment_id, "order_id": razorpay_order_id, "notes": []}}}}).encode()
+    headers = {"X-Razorpay-Signature": hmac.new(b"webhook_secret", body, hashlib.sha256).hexdigest()}
+
+    assert api.post("/api/payment/razorpay-webhook", content=body, headers=headers).json() == {"status": "applied"}
+    assert api.post("/api/payment/razorpay-webhook", content=body, headers=headers).json() == {"status": "duplicate"}
+    assert verify(api, order_id, razorpay_order_id, payment_id).json()["message"] == "Payment already verified"
+    assert find_order(api, db, order_id)["payment_source"] == "webhook"
+    forged = api.post("/api/payment/razorpay-webhook", content=body, headers={"X-Razorpay-Signature": "0" * 64})
+    assert forged.status_code == 400
@@ -0,0 +1,90 @@
+import pytest
+
+from utils.product_search import ProductSearchIndex, index_terms, phonetic_key, tokenize, transliterate_telugu
+
+
+@pytest.mark.parametrize("telugu, latin", [
+    ("లడ్డు", "laddu"),
+    ("అరిసెలు", "ariselu"),
+    ("చెక్కలు", "chekkalu"),
+    ("కజ్జికాయలు", "kajjikaayalu"),
+    # Anusvara: n before most consonants, m before labials
+    ("సున్నుండలు", "sunnundalu"),
+    ("కారంపొడి", "kaarampodi"),
+    # Long e and o stay e and o
+    ("పూతరేకులు", "puutarekulu"),
+    ("కోవా", "kovaa"),
+    ("౧౨", "12"),
+])
+def test_transliterate_telugu(telugu, latin):
+    assert transliterate_telugu(telugu) == latin
+
+
+@pytest.mark.parametrize("spellings", [
+    ("laddu", "ladoo", "ladu"),
+    ("chekkalu", "chekalu"),
+    ("pootharekulu", "putarekulu"),
+    ("kajjikayalu", "kajjikaayalu"),
+    ("bhel", "bel"),
+])
+def test_phonetic_key_folds_spelling_variants(spellings):
+    assert len({phonetic_key(spelling) for spelling in spellings}) == 1
+
+
+def test_telugu_and_latin_spellings_share_a_term():
+    for telugu, latin in [("లడ్డు", "ladoo"), ("పూతరేకులు", "pootharekulu"), ("చెక్కలు", "chekalu")]:
+        assert index_terms(telugu) & index_terms(latin)
+
+
+def test_tokenize_normalizes():
+    assert tokenize("Ariselu‌ (అరిసెలు)") == ["ariselu", "అరిసెలు"]
+    assert tokenize(None) == []
+
+
+PRODUCTS = {
+    "p1": {"id": "p1", "name": "Besan Laddu", "name_telugu": "శనగపిండి లడ్డు", "category": "sweets"},
+    "p2": {"id": "p2", "name": "Pootharekulu", "name_telugu": "పూతరేకులు", "category": "sweets"},
+    "p3": {"id": "p3", "name": "Chekkalu", "category": "snacks", "description": "Crisp rice crackers"},
+    "p4": {"id": "p4", "name": "Kaju Barfi", "category": "sweets", "description": "Cashew laddu alternative"},
+}
+
+
+def ids(results):
+    return [product_id for product_id, _ in results]
+
+
+def test_search_matches_across_scripts_and_spellings():
+    index = ProductSearchIndex()
+    index.sync(PRODUCTS)
+
+    assert ids(index.search("ladoo")) == ["p1", "p4"]
+    assert ids(index.search("లడ్డు"))[0] == "p1"
+    assert ids(index.search("పూతరేకులు")) == ["p2"]
+    assert ids(index.search("chekalu")) == ["p3"]
+
+
+def test_search_prefix_on_last_word_and_best_partial_match():
+    index = ProductSearchIndex()
+    index.sync(PRODUCTS)
+
+    assert ids(index.search("poothar")) == ["p2"]
+    assert ids(index.search("besan lad")) == ["p1"]
+    # No product has both words: fall back to the ones matching the most words
+    assert set(ids(index.search("besan cashew"))) == {"p1", "p4"}
+    assert index.search("   ") == []
+
+
+def test_sync_reindexes_only_changes():
+    index = ProductSearchIndex()
+    index.sync(PRODUCTS)
+    reindexed = index.stats["reindexed"]
+
+    changed = {**PRODUCTS, "p3": {**PRODUCTS["p3"], "name": "Murukulu"}}
+    del changed["p4"]
+    index.sync(changed)
+
+    assert index.stats["reindexed"] == reindexed + 1
+    assert index.stats["removed"] == 1
+    assert index.search("chekkalu") == []
+    assert ids(index.search("murukulu")) == ["p3"]
+    assert "p4" not in ids(index.search("cashew"))
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from pymongo import UpdateOne
+
+from utils.seeding import build_mongodb_operations, plan_seed, seed_mongodb
+
+
+def test_plan_seed_inserts_updates_and_leaves_unchanged():
+    existing = [
+        {"id": "a", "name": "Ariselu", "price": 100},
+        {"id": "b", "name": "Boondi", "price": 80},
+    ]
+    desired = [
+        {"id": "a", "name": "Ariselu", "price": 100},
+        {"id": "b", "name": "Boondi", "price": 90},
+        {"id": "c", "name": "Chakralu", "price": 60},
+    ]
+
+    plan = plan_seed(existing, desired, ["id"])
+
+    assert plan["inserts"] == [{"id": "c", "name": "Chakralu", "price": 60}]
+    assert plan["updates"] == [(("b",), {"price": 90})]
+    assert plan["deletes"] == []
+    assert plan["unchanged"] == 1
+
+
+def test_plan_seed_keeps_insert_only_fields():
+    existing = [{"id": "a", "price": 100, "inventory_count": 3}]
+    desired = [{"id": "a", "price": 100, "inventory_count": 50}]
+
+    plan = plan_seed(existing, desired, ["id"], insert_only_fields=["inventory_count"])
+
+    assert plan["updates"] == []
+    assert plan["unchanged"] == 1
+
+
+def test_plan_seed_prunes_only_when_asked():
+    existing = [{"id": "a"}, {"id": "old"}]
+    desired = [{"id": "a"}]
+
+    assert plan_seed(existing, desired, ["id"])["deletes"] == []
+    assert plan_seed(existing, desired, ["id"], prune=True)["deletes"] == [("old",)]
+
+
+def test_plan_seed_last_duplicate_wins_and_compound_keys():
+    desired = [
+        {"name": "Guntur", "state": "Andhra Pradesh", "charge": 49},
+        {"name": "Guntur", "state": "Andhra Pradesh", "charge": 29},
+        {"name": "Guntur", "state": "Telangana", "charge": 99},
+    ]
+
+    plan = plan_seed([], desired, ["name", "state"])
+
+    assert [doc["charge"] for doc in plan["inserts"]] == [29, 99]
+
+
+def test_build_mongodb_operations_upserts_new_documents():
+    plan = plan_seed([{"id": "a", "price": 1}], [{"id": "a", "price": 2}, {"id": "b", "price": 3}], ["id"])
+
+    operations = build_mongodb_operations(plan, ["id"])
+
+    assert operations == [
+        UpdateOne({"id": "b"}, {"$setOnInsert": {"price": 3}}, upsert=True),
+        UpdateOne({"id": "a"}, {"$set": {"price": 2}}),
+    ]
+
+def test_seed_mongodb_is_idempotent():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    collection = mongomock_motor.AsyncMongoMockClient()["test"]["products"]
+    desired = [{"id": "a", "price": 1, "inventory_count": 5}, {"id": "b", "price": 2, "inventory_count": 5}]
+
+    async def run():
+        first = await seed_mongodb(collection, desired, ["id"], insert_only_fields=["inventory_count"])
+        await collection.update_one({"id": "a"}, {"$set": {"inventory_count": 1}})
+        second = await seed_mongodb(collection, desired, ["id"], insert_only_fields=["inventory_count"])
+        stored = await collection.find({}, {"_id": 0}).sort("id", 1).to_list(None)
+        return first, second, stored
+
+    first, second, stored = asyncio.run(run())
+
+    assert first == {"inserted": 2, "updated": 0, "deleted": 0, "unchanged": 0}
+    assert second == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 2}
+    assert stored[0] == {"id": "a", "price": 1, "inventory_count": 1}